@@ -6,6 +6,7 @@ Interface 60+ friendly com Supabase como backend
 import streamlit as st
 from utils.auth import init_supabase, login, logout, get_current_user, get_user_profile
 from utils.layout import render_centered_logo, render_sidebar, render_top_logo
+from utils.metricas import medir_rerun
 
 # Configuração da página
 st.set_page_config(
@@ -289,4 +290,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    with medir_rerun('Inicio'):
+        main()
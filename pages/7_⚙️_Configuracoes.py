@@ -3,244 +3,412 @@ Página de Configurações - Usuários e Auditoria (ADMIN only)
 """
 
 import streamlit as st
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 from utils.auth import require_admin
 from utils.db import (
-    get_usuarios_app, update_usuario_app, get_auditoria,
+    get_usuarios_app, update_usuario_app, get_auditoria_pagina, get_auditoria_registro_em,
     get_servicos, create_servico, update_servico
 )
-from utils.auditoria import audit_update, audit_insert
-from utils.layout import render_sidebar, render_top_logo
+from utils.auditoria import audit_update, audit_insert, ENTIDADES_COM_TRIGGER
+from utils.layout import render_sidebar, render_top_logo, carregar_paginas, render_carregar_mais
+from utils.metricas import (
+    medir_rerun, get_metricas, get_profiler, set_profiler,
+    get_reruns_lentos, limpar_reruns_lentos, limpar_metricas
+)
+
+with medir_rerun('Configuracoes'):
 
-# Requer ADMIN
-profile = require_admin()
-render_sidebar(profile)
-render_top_logo()
+    # Requer ADMIN
+    profile = require_admin()
+    render_sidebar(profile)
+    render_top_logo()
 
-st.title("⚙️ Configurações")
+    st.title("⚙️ Configurações")
 
-tab1, tab2, tab3 = st.tabs(["👥 Usuários", "📋 Auditoria", "🔧 Serviços"])
+    tab1, tab2, tab3, tab4 = st.tabs(["👥 Usuários", "📋 Auditoria", "🔧 Serviços", "⏱️ Desempenho"])
 
-# ============================================
-# USUÁRIOS
-# ============================================
+    # ============================================
+    # USUÁRIOS
+    # ============================================
 
-with tab1:
-    st.markdown("### 👥 Usuários do Sistema")
+    with tab1:
+        st.markdown("### 👥 Usuários do Sistema")
     
-    col1, col2 = st.columns([2, 1])
-    with col1:
-        busca_usuario = st.text_input(
-            "🔍 Buscar",
-            placeholder="Usuário ou perfil...",
-            key="busca_usuario_app"
-        )
-    with col2:
-        filtro_ativo = st.selectbox(
-            "Situação",
-            options=[None, True, False],
-            format_func=lambda x: 'Todos' if x is None else ('Ativos' if x else 'Inativos'),
-            key="filtro_ativo_usuario"
-        )
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            busca_usuario = st.text_input(
+                "🔍 Buscar",
+                placeholder="Usuário ou perfil...",
+                key="busca_usuario_app"
+            )
+        with col2:
+            filtro_ativo = st.selectbox(
+                "Situação",
+                options=[None, True, False],
+                format_func=lambda x: 'Todos' if x is None else ('Ativos' if x else 'Inativos'),
+                key="filtro_ativo_usuario"
+            )
 
-    usuarios = get_usuarios_app()
-    if filtro_ativo is not None:
-        usuarios = [u for u in usuarios if u.get('ativo') == filtro_ativo]
-    if busca_usuario:
-        busca_lower = busca_usuario.lower()
-        usuarios = [
-            u for u in usuarios
-            if busca_lower in (u.get('usuario', '') or '').lower()
-            or busca_lower in (u.get('perfil', '') or '').lower()
-            or busca_lower in (u.get('auth_user_id', '') or '').lower()
-        ]
-    
-    if not usuarios:
-        st.info("📋 Nenhum usuário cadastrado.")
-    else:
-        for user in usuarios:
-            status_icon = "🟢" if user.get('ativo', True) else "🔴"
-            perfil_emoji = "👑" if user.get('perfil') == 'ADMIN' else "👷"
+        usuarios = get_usuarios_app()
+        if filtro_ativo is not None:
+            usuarios = [u for u in usuarios if u.get('ativo') == filtro_ativo]
+        if busca_usuario:
+            busca_lower = busca_usuario.lower()
+            usuarios = [
+                u for u in usuarios
+                if busca_lower in (u.get('usuario', '') or '').lower()
+                or busca_lower in (u.get('perfil', '') or '').lower()
+                or busca_lower in (u.get('auth_user_id', '') or '').lower()
+            ]
+    
+        if not usuarios:
+            st.info("📋 Nenhum usuário cadastrado.")
+        else:
+            for user in usuarios:
+                status_icon = "🟢" if user.get('ativo', True) else "🔴"
+                perfil_emoji = "👑" if user.get('perfil') == 'ADMIN' else "👷"
             
-            with st.expander(f"{status_icon} {user['usuario']} {perfil_emoji}"):
-                st.markdown(f"**Perfil:** {user.get('perfil', '-')}")
-                st.markdown(f"**Ativo:** {'Sim' if user.get('ativo') else 'Não'}")
-                st.markdown(f"**Auth ID:** `{user.get('auth_user_id', '-')}`")
+                with st.expander(f"{status_icon} {user['usuario']} {perfil_emoji}"):
+                    st.markdown(f"**Perfil:** {user.get('perfil', '-')}")
+                    st.markdown(f"**Ativo:** {'Sim' if user.get('ativo') else 'Não'}")
+                    st.markdown(f"**Auth ID:** `{user.get('auth_user_id', '-')}`")
                 
-                st.markdown("---")
+                    st.markdown("---")
                 
-                col1, col2 = st.columns(2)
+                    col1, col2 = st.columns(2)
                 
-                with col1:
-                    novo_perfil = st.selectbox(
-                        "Alterar Perfil",
-                        options=['ADMIN', 'OPERACAO'],
-                        index=0 if user.get('perfil') == 'ADMIN' else 1,
-                        key=f"perfil_{user['id']}"
-                    )
+                    with col1:
+                        novo_perfil = st.selectbox(
+                            "Alterar Perfil",
+                            options=['ADMIN', 'OPERACAO'],
+                            index=0 if user.get('perfil') == 'ADMIN' else 1,
+                            key=f"perfil_{user['id']}"
+                        )
                 
-                with col2:
-                    novo_ativo = st.checkbox("Ativo", value=user.get('ativo', True), key=f"ativo_{user['id']}")
+                    with col2:
+                        novo_ativo = st.checkbox("Ativo", value=user.get('ativo', True), key=f"ativo_{user['id']}")
                 
-                if st.button("💾 Salvar Alterações", key=f"save_{user['id']}"):
-                    antes = {'perfil': user.get('perfil'), 'ativo': user.get('ativo')}
-                    novos_dados = {'perfil': novo_perfil, 'ativo': novo_ativo}
+                    if st.button("💾 Salvar Alterações", key=f"save_{user['id']}"):
+                        antes = {'perfil': user.get('perfil'), 'ativo': user.get('ativo')}
+                        novos_dados = {'perfil': novo_perfil, 'ativo': novo_ativo}
                     
-                    success, msg = update_usuario_app(user['id'], novos_dados)
+                        success, msg = update_usuario_app(user['id'], novos_dados)
                     
-                    if success:
-                        audit_update('usuarios_app', user['id'], antes, novos_dados)
-                        st.success(msg)
-                        st.rerun()
-                    else:
-                        st.error(msg)
+                        if success:
+                            audit_update('usuarios_app', user['id'], antes, novos_dados)
+                            st.success(msg)
+                            st.rerun()
+                        else:
+                            st.error(msg)
     
-    st.markdown("---")
-    st.info("""
+        st.markdown("---")
+        st.info("""
     💡 **Para criar novos usuários:**
     1. Crie o usuário no Supabase Auth (Dashboard > Authentication > Users)
     2. Insira um registro em `public.usuarios_app` com o `auth_user_id` correspondente
     """)
 
-# ============================================
-# AUDITORIA
-# ============================================
+    # ============================================
+    # AUDITORIA
+    # ============================================
 
-with tab2:
-    st.markdown("### 📋 Logs de Auditoria")
+    with tab2:
+        st.markdown("### 📋 Logs de Auditoria")
     
-    # Filtros
-    col1, col2, col3 = st.columns(3)
+        # Filtros
+        col1, col2, col3 = st.columns(3)
     
-    with col1:
-        entidade_filter = st.selectbox(
-            "Entidade",
-            options=['', 'clientes', 'pessoas', 'obras', 'orcamentos', 'alocacoes', 'apontamentos', 'recebimentos', 'pagamentos'],
-            format_func=lambda x: 'Todas' if x == '' else x.title()
+        with col1:
+            entidade_filter = st.selectbox(
+                "Entidade",
+                options=[''] + sorted(ENTIDADES_COM_TRIGGER | {'usuarios_app'}),
+                format_func=lambda x: 'Todas' if x == '' else x.title()
+            )
+    
+        with col2:
+            data_inicio = st.date_input("De", value=date.today() - timedelta(days=7))
+    
+        with col3:
+            data_fim = st.date_input("Até", value=date.today())
+    
+        todo_periodo = st.checkbox("Todo o histórico (ignora as datas)", key="audit_todo_periodo")
+    
+        col1, col2, col3, col4 = st.columns(4)
+    
+        with col1:
+            entidade_id_filter = st.text_input("# ID do registro", placeholder="Ex: 123")
+    
+        with col2:
+            acao_filter = st.selectbox(
+                "Ação",
+                options=['', 'INSERT', 'UPDATE', 'DELETE', 'STATUS_CHANGE'],
+                format_func=lambda x: 'Todas' if x == '' else x
+            )
+    
+        with col3:
+            campo_filter = st.text_input("Campo alterado", placeholder="Ex: valor_total")
+    
+        with col4:
+            busca_usuario = st.text_input("🔍 Usuário")
+    
+        busca_log = st.text_input(
+            "🔎 Buscar no log",
+            placeholder="Palavras do conteúdo (antes/depois), ex: PAGO -cancelado"
         )
     
-    with col2:
-        data_inicio = st.date_input("De", value=date.today() - timedelta(days=7))
-    
-    with col3:
-        data_fim = st.date_input("Até", value=date.today())
-    
-    busca_usuario = st.text_input("🔍 Buscar por usuário")
-    busca_log = st.text_input("🔎 Buscar no log")
-    
-    # Lista de logs
-    logs = get_auditoria(
-        entidade=entidade_filter if entidade_filter else None,
-        data_inicio=data_inicio,
-        data_fim=data_fim,
-        busca=busca_usuario if busca_usuario else None,
-        busca_texto=busca_log if busca_log else None,
-        limite=10
-    )
-    
-    if not logs:
-        st.info("📋 Nenhum registro encontrado.")
-    else:
-        st.markdown(f"**{len(logs)} registro(s) encontrado(s)** (máx. 10)")
+        # Lista de logs (keyset: criado_em, id)
+        logs, tem_mais_logs = carregar_paginas(
+            'auditoria_lista', get_auditoria_pagina,
+            texto=busca_log.strip() or None,
+            entidade=entidade_filter or None,
+            entidade_id=entidade_id_filter.strip() or None,
+            usuario=busca_usuario.strip() or None,
+            acao=acao_filter or None,
+            campo=campo_filter.strip() or None,
+            data_inicio=None if todo_periodo else data_inicio,
+            data_fim=None if todo_periodo else data_fim
+        )
+    
+        if not logs:
+            st.info("📋 Nenhum registro encontrado.")
+        else:
+            st.markdown(f"**{len(logs)}{'+' if tem_mais_logs else ''} registro(s) encontrado(s)**")
         
-        for log in logs:
-            acao_emoji = {
-                'INSERT': '➕',
-                'UPDATE': '✏️',
-                'DELETE': '🗑️',
-                'STATUS_CHANGE': '🔄'
-            }.get(log.get('acao', ''), '📋')
+            for log in logs:
+                acao_emoji = {
+                    'INSERT': '➕',
+                    'UPDATE': '✏️',
+                    'DELETE': '🗑️',
+                    'STATUS_CHANGE': '🔄'
+                }.get(log.get('acao', ''), '📋')
             
-            with st.expander(f"{acao_emoji} {log.get('entidade', '-')} #{log.get('entidade_id', '-')} por {log.get('usuario', '-')}"):
-                st.markdown(f"**Data:** {log.get('criado_em', '-')}")
-                st.markdown(f"**Ação:** {log.get('acao', '-')}")
+                with st.expander(f"{acao_emoji} {log.get('entidade', '-')} #{log.get('entidade_id', '-')} por {log.get('usuario', '-')}"):
+                    st.markdown(f"**Data:** {log.get('criado_em', '-')}")
+                    st.markdown(f"**Ação:** {log.get('acao', '-')}")
                 
-                if log.get('antes_json'):
-                    st.markdown("**Antes:**")
-                    st.json(log['antes_json'])
+                    if log.get('antes_json'):
+                        st.markdown("**Antes:**")
+                        st.json(log['antes_json'])
                 
-                if log.get('depois_json'):
-                    st.markdown("**Depois:**")
-                    st.json(log['depois_json'])
-
-# ============================================
-# SERVIÇOS (CATÁLOGO)
-# ============================================
-
-with tab3:
-    st.markdown("### 🔧 Catálogo de Serviços")
-    
-    col1, col2 = st.columns([2, 1])
-    with col1:
-        busca_servico = st.text_input(
-            "🔍 Buscar",
-            placeholder="Nome ou unidade...",
-            key="busca_servico"
-        )
-    with col2:
-        filtro_servico_ativo = st.selectbox(
-            "Situação",
-            options=[None, True, False],
-            format_func=lambda x: 'Todos' if x is None else ('Ativos' if x else 'Inativos'),
-            key="filtro_servico_ativo"
-        )
+                    if log.get('depois_json'):
+                        st.markdown("**Depois:**")
+                        st.json(log['depois_json'])
+        
+            render_carregar_mais('auditoria_lista', tem_mais_logs)
     
-    servicos = get_servicos(ativo=filtro_servico_ativo)
-    if busca_servico:
-        busca_lower = busca_servico.lower()
-        servicos = [
-            s for s in servicos
-            if busca_lower in (s.get('nome', '') or '').lower()
-            or busca_lower in (s.get('unidade', '') or '').lower()
-        ]
-    
-    if servicos:
-        for serv in servicos:
-            status_icon = "🟢" if serv.get('ativo', True) else "🔴"
-            with st.expander(f"{status_icon} {serv['nome']} ({serv.get('unidade', '-')})"):
-                ativo_atual = serv.get('ativo', True)
-                ativo_novo = st.toggle(
-                    "Ativo",
-                    value=ativo_atual,
-                    key=f"serv_ativo_{serv['id']}"
+        # Reconstrução de um registro a partir do histórico
+        with st.expander("🕓 Ver registro em uma data"):
+            col1, col2, col3, col4 = st.columns(4)
+        
+            with col1:
+                rec_entidade = st.selectbox(
+                    "Entidade",
+                    options=sorted(ENTIDADES_COM_TRIGGER | {'usuarios_app'}),
+                    format_func=lambda x: x.title(),
+                    key="audit_rec_entidade"
                 )
+        
+            with col2:
+                rec_id = st.text_input("# ID do registro", placeholder="Ex: 123", key="audit_rec_id")
+        
+            with col3:
+                rec_data = st.date_input("Data", value=date.today(), key="audit_rec_data")
+        
+            with col4:
+                rec_hora = st.time_input("Hora (UTC)", value=time(23, 59), key="audit_rec_hora")
+        
+            if rec_id.strip():
+                registro = get_auditoria_registro_em(
+                    rec_entidade, rec_id.strip(), datetime.combine(rec_data, rec_hora)
+                )
+                if registro:
+                    st.json(registro)
+                else:
+                    st.info("📋 O registro não existia (ou estava excluído) nessa data.")
 
-                if st.button("💾 Atualizar Serviço", key=f"serv_update_{serv['id']}"):
-                    if ativo_novo == ativo_atual:
-                        st.info("Nenhuma alteração para salvar.")
-                    else:
-                        antes = {'ativo': ativo_atual}
-                        success, msg, atualizado = update_servico(
-                            serv['id'],
-                            {'ativo': ativo_novo}
-                        )
+    # ============================================
+    # SERVIÇOS (CATÁLOGO)
+    # ============================================
 
-                        if success:
-                            audit_update('servicos', serv['id'], antes, {'ativo': ativo_novo})
-                            st.success(msg)
-                            st.rerun()
+    with tab3:
+        st.markdown("### 🔧 Catálogo de Serviços")
+    
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            busca_servico = st.text_input(
+                "🔍 Buscar",
+                placeholder="Nome ou unidade...",
+                key="busca_servico"
+            )
+        with col2:
+            filtro_servico_ativo = st.selectbox(
+                "Situação",
+                options=[None, True, False],
+                format_func=lambda x: 'Todos' if x is None else ('Ativos' if x else 'Inativos'),
+                key="filtro_servico_ativo"
+            )
+    
+        servicos = get_servicos(ativo=filtro_servico_ativo)
+        if busca_servico:
+            busca_lower = busca_servico.lower()
+            servicos = [
+                s for s in servicos
+                if busca_lower in (s.get('nome', '') or '').lower()
+                or busca_lower in (s.get('unidade', '') or '').lower()
+            ]
+    
+        if servicos:
+            for serv in servicos:
+                status_icon = "🟢" if serv.get('ativo', True) else "🔴"
+                with st.expander(f"{status_icon} {serv['nome']} ({serv.get('unidade', '-')})"):
+                    ativo_atual = serv.get('ativo', True)
+                    ativo_novo = st.toggle(
+                        "Ativo",
+                        value=ativo_atual,
+                        key=f"serv_ativo_{serv['id']}"
+                    )
+
+                    if st.button("💾 Atualizar Serviço", key=f"serv_update_{serv['id']}"):
+                        if ativo_novo == ativo_atual:
+                            st.info("Nenhuma alteração para salvar.")
                         else:
-                            st.error(msg)
-    else:
-        st.info("📋 Nenhum serviço cadastrado.")
+                            antes = {'ativo': ativo_atual}
+                            success, msg, atualizado = update_servico(
+                                serv['id'],
+                                {'ativo': ativo_novo}
+                            )
+
+                            if success:
+                                audit_update('servicos', serv['id'], antes, {'ativo': ativo_novo})
+                                st.success(msg)
+                                st.rerun()
+                            else:
+                                st.error(msg)
+        else:
+            st.info("📋 Nenhum serviço cadastrado.")
     
-    st.markdown("---")
-    st.markdown("### ➕ Novo Serviço")
+        st.markdown("---")
+        st.markdown("### ➕ Novo Serviço")
     
-    with st.form("form_novo_servico"):
-        nome = st.text_input("Nome do Serviço *", placeholder="Ex: Pintura de parede")
+        with st.form("form_novo_servico"):
+            nome = st.text_input("Nome do Serviço *", placeholder="Ex: Pintura de parede")
         
-        unidade = st.selectbox("Unidade", options=['UN', 'M2', 'ML', 'H', 'DIA'])
+            unidade = st.selectbox("Unidade", options=['UN', 'M2', 'ML', 'H', 'DIA'])
         
-        if st.form_submit_button("✅ Criar Serviço", type="primary"):
-            if not nome:
-                st.error("⚠️ Informe o nome do serviço!")
-            else:
-                success, msg, novo = create_servico(nome, unidade)
-                
-                if success:
-                    audit_insert('servicos', novo)
-                    st.success(msg)
-                    st.rerun()
+            if st.form_submit_button("✅ Criar Serviço", type="primary"):
+                if not nome:
+                    st.error("⚠️ Informe o nome do serviço!")
                 else:
-                    st.error(msg)
+                    success, msg, novo = create_servico(nome, unidade)
+                
+                    if success:
+                        audit_insert('servicos', novo)
+                        st.success(msg)
+                        st.rerun()
+                    else:
+                        st.error(msg)
+
+    # ============================================
+    # DESEMPENHO (profiler de reruns)
+    # ============================================
+
+    with tab4:
+        st.markdown("### ⏱️ Desempenho das Páginas")
+        st.caption("Métricas deste processo do servidor (zeradas ao reiniciar o app).")
+    
+        # Configuração do processo: os widgets mostram o valor atual e só a
+        # sessão que mexeu neles grava (outra aba aberta não desfaz a troca)
+        profiler = get_profiler()
+        st.session_state['profiler_ativo'] = profiler['ativo']
+        st.session_state['profiler_limite_ms'] = int(profiler['limite_ms'])
+
+        def _alterar_profiler() -> None:
+            set_profiler(
+                ativo=st.session_state['profiler_ativo'],
+                limite_ms=st.session_state['profiler_limite_ms']
+            )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.toggle(
+                "Profiler de reruns ativo",
+                help="Separa banco, PDF e renderização e registra os reruns lentos",
+                key="profiler_ativo",
+                on_change=_alterar_profiler
+            )
+        with col2:
+            st.number_input(
+                "Rerun lento a partir de (ms)",
+                min_value=0,
+                step=100,
+                key="profiler_limite_ms",
+                on_change=_alterar_profiler
+            )
+    
+        metricas = get_metricas()
+    
+        st.markdown("#### 📄 Por página")
+        if not metricas['paginas']:
+            st.info("📋 Nenhum rerun registrado ainda.")
+        else:
+            st.dataframe(
+                [
+                    {
+                        'Página': p['pagina'],
+                        'Reruns': p['reruns'],
+                        'Total médio (ms)': p['rerun_ms']['media'],
+                        'Total p95 (ms)': p['rerun_ms']['p95'],
+                        'Banco médio (ms)': p['rerun_db_ms']['media'],
+                        'Consultas/rerun': p['rerun_consultas']['media'],
+                        'PDF médio (ms)': p.get('rerun_pdf_ms', {}).get('media'),
+                        'Renderização média (ms)': p.get('rerun_render_ms', {}).get('media'),
+                    }
+                    for p in metricas['paginas']
+                ],
+                use_container_width=True,
+                hide_index=True
+            )
+    
+        st.markdown("#### 🐢 Reruns lentos")
+        reruns_lentos = get_reruns_lentos()
+        if not profiler['ativo'] and not reruns_lentos:
+            st.info("Ative o profiler para registrar os reruns lentos.")
+        elif not reruns_lentos:
+            st.info(f"📋 Nenhum rerun acima de {int(profiler['limite_ms'])} ms.")
+        else:
+            st.dataframe(reruns_lentos, use_container_width=True, hide_index=True)
+    
+        st.markdown("#### 🗄️ Consultas que mais somam tempo")
+        if not metricas['consultas']:
+            st.info("📋 Nenhuma consulta registrada ainda.")
+        else:
+            st.dataframe(
+                [
+                    {
+                        'Página': c['pagina'],
+                        'Tabela': c['tabela'],
+                        'Operação': c['operacao'],
+                        'Filtros': c['filtros'],
+                        'Chamadas': c['total'],
+                        'Total (ms)': c['tempo_total_ms'],
+                        'Média (ms)': c['media'],
+                        'p95 (ms)': c['p95'],
+                        'Linhas': c['linhas'],
+                        'KB recebidos': round(c['bytes_recebidos'] / 1024, 1),
+                        'Erros': c['erros'],
+                    }
+                    for c in metricas['consultas'][:20]
+                ],
+                use_container_width=True,
+                hide_index=True
+            )
+    
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🧹 Limpar reruns lentos", use_container_width=True):
+                limpar_reruns_lentos()
+                st.rerun()
+        with col2:
+            if st.button("🔄 Zerar métricas", use_container_width=True):
+                limpar_metricas()
+                st.rerun()
@@ -0,0 +1,196 @@
+"""
+Retenção da auditoria particionada (sql/017_auditoria_particionada.sql)
+
+Comandos:
+    particoes  garante as partições do mês atual e dos próximos meses
+    arquivar   exporta meses antigos para JSONL.gz e remove as partições
+    restaurar  recarrega um arquivo exportado (recria a partição do mês)
+
+Usa a service role (SUPABASE_SERVICE_ROLE_KEY): rode no servidor, nunca no app.
+
+Exemplos:
+    python scripts/auditoria_arquivo.py particoes --meses 3
+    python scripts/auditoria_arquivo.py arquivar --reter-meses 12 --destino arquivo_auditoria
+    python scripts/auditoria_arquivo.py restaurar arquivo_auditoria/auditoria_2025_01.jsonl.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+from datetime import date
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+load_dotenv()
+
+AUDITORIA_RETENCAO_MESES = int(os.getenv('AUDITORIA_RETENCAO_MESES', '12'))
+AUDITORIA_ARQUIVO_DIR = os.getenv('AUDITORIA_ARQUIVO_DIR', 'arquivo_auditoria')
+
+PAGINA_EXPORTACAO = 500  # limite máximo de fn_auditoria_buscar
+LOTE_RESTAURACAO = 500
+COLUNAS = ('id', 'usuario', 'entidade', 'entidade_id', 'acao', 'antes_json', 'depois_json', 'criado_em')
+
+
+def get_cliente_servico() -> Client:
+    """Cliente com a service role (ignora RLS)"""
+    url = os.getenv('SUPABASE_URL')
+    chave = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+    if not url or not chave:
+        raise SystemExit('Configure SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY no .env')
+    return create_client(url, chave)
+
+
+def _primeiro_dia(mes: date) -> date:
+    return mes.replace(day=1)
+
+
+def _somar_meses(mes: date, meses: int) -> date:
+    total = mes.year * 12 + (mes.month - 1) + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _nome_arquivo(mes: date) -> str:
+    return f"auditoria_{mes.year:04d}_{mes.month:02d}.jsonl.gz"
+
+
+def criar_particoes(supabase: Client, meses: int) -> list:
+    """Partições do mês atual + `meses` meses à frente"""
+    response = supabase.rpc('fn_auditoria_criar_particoes', {'p_meses_a_frente': meses}).execute()
+    return response.data or []
+
+
+def listar_particoes(supabase: Client) -> list:
+    """Partições mensais existentes (mais antigas primeiro)"""
+    response = supabase.rpc('fn_auditoria_particoes', {}).execute()
+    return response.data or []
+
+
+def exportar_mes(supabase: Client, mes: date, destino: str) -> tuple[str, int]:
+    """
+    Exporta um mês para JSONL.gz (ordem criado_em desc, id desc)
+
+    Grava em arquivo temporário e renomeia no fim: um arquivo com o nome
+    final está sempre completo.
+    """
+    inicio = _primeiro_dia(mes)
+    fim = _somar_meses(inicio, 1)
+    os.makedirs(destino, exist_ok=True)
+    caminho = os.path.join(destino, _nome_arquivo(inicio))
+    temporario = caminho + '.parcial'
+
+    total = 0
+    cursor_criado_em = None
+    cursor_id = None
+    with gzip.open(temporario, 'wt', encoding='utf-8') as f:
+        while True:
+            response = supabase.rpc('fn_auditoria_buscar', {
+                'p_inicio': inicio.isoformat(),
+                'p_fim': fim.isoformat(),
+                'p_cursor_criado_em': cursor_criado_em,
+                'p_cursor_id': cursor_id,
+                'p_limite': PAGINA_EXPORTACAO,
+            }).execute()
+            linhas = response.data or []
+            for linha in linhas:
+                f.write(json.dumps({c: linha.get(c) for c in COLUNAS}, default=str) + '\n')
+            total += len(linhas)
+            if len(linhas) < PAGINA_EXPORTACAO:
+                break
+            cursor_criado_em = linhas[-1]['criado_em']
+            cursor_id = linhas[-1]['id']
+
+    os.replace(temporario, caminho)
+    return caminho, total
+
+
+def arquivar(supabase: Client, reter_meses: int, destino: str) -> list:
+    """
+    Exporta e remove as partições anteriores à janela de retenção
+
+    A partição só é removida se o banco contar exatamente as linhas exportadas.
+    """
+    limite = _somar_meses(_primeiro_dia(date.today()), -max(reter_meses, 1))
+    resultado = []
+    for particao in listar_particoes(supabase):
+        mes = date.fromisoformat(particao['inicio'])
+        if mes >= limite:
+            continue
+        caminho, total = exportar_mes(supabase, mes, destino)
+        supabase.rpc('fn_auditoria_remover_particao', {
+            'p_mes': mes.isoformat(),
+            'p_registros_exportados': total,
+        }).execute()
+        resultado.append((particao['particao'], caminho, total))
+    return resultado
+
+
+def restaurar(supabase: Client, caminho: str) -> int:
+    """
+    Recarrega um arquivo exportado
+
+    Recria a partição do mês (se foi removida) e insere em lotes; linhas que
+    já existem (mesmo id/criado_em) são ignoradas, então pode ser repetido.
+    """
+    with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+        linhas = [json.loads(l) for l in f if l.strip()]
+    if not linhas:
+        return 0
+
+    meses = {date.fromisoformat(l['criado_em'][:10]).replace(day=1) for l in linhas}
+    for mes in sorted(meses):
+        supabase.rpc('fn_auditoria_criar_particao', {'p_mes': mes.isoformat()}).execute()
+
+    for i in range(0, len(linhas), LOTE_RESTAURACAO):
+        supabase.table('auditoria').upsert(
+            linhas[i:i + LOTE_RESTAURACAO],
+            on_conflict='id,criado_em',
+            ignore_duplicates=True
+        ).execute()
+    return len(linhas)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Partições, arquivamento e restauração da auditoria')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_particoes = sub.add_parser('particoes', help='Cria as partições dos próximos meses')
+    p_particoes.add_argument('--meses', type=int, default=3, help='Meses à frente (padrão: 3)')
+
+    p_arquivar = sub.add_parser('arquivar', help='Exporta e remove meses fora da retenção')
+    p_arquivar.add_argument('--reter-meses', type=int, default=AUDITORIA_RETENCAO_MESES,
+                            help=f'Meses mantidos no banco (padrão: {AUDITORIA_RETENCAO_MESES})')
+    p_arquivar.add_argument('--destino', default=AUDITORIA_ARQUIVO_DIR,
+                            help=f'Pasta dos arquivos (padrão: {AUDITORIA_ARQUIVO_DIR})')
+
+    p_restaurar = sub.add_parser('restaurar', help='Recarrega um arquivo .jsonl.gz exportado')
+    p_restaurar.add_argument('arquivo')
+
+    args = parser.parse_args(argv)
+    supabase = get_cliente_servico()
+
+    try:
+        if args.comando == 'particoes':
+            for nome in criar_particoes(supabase, args.meses):
+                print(f"✅ {nome}")
+
+        elif args.comando == 'arquivar':
+            arquivados = arquivar(supabase, args.reter_meses, args.destino)
+            if not arquivados:
+                print('Nenhuma partição fora da janela de retenção.')
+            for nome, caminho, total in arquivados:
+                print(f"✅ {nome}: {total} registros → {caminho}")
+
+        elif args.comando == 'restaurar':
+            total = restaurar(supabase, args.arquivo)
+            print(f"✅ {total} registros restaurados de {args.arquivo}")
+
+    except Exception as e:
+        print(f"❌ Erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,538 @@
+"""
+Benchmark ponta a ponta dos fluxos mais usados (backend local, sem rede)
+
+Roda as páginas de verdade com o AppTest do Streamlit (sem navegador) contra o
+backend em memória (utils/supabase_local.py). Fluxos:
+
+    home               painel da página inicial
+    obra_detalhe       abrir o detalhe de uma obra (todas as abas)
+    editar_servico     salvar um item de serviço no editor de orçamento
+    gerar_pdf          gerar o PDF do orçamento
+    agenda_confirmar   confirmar as alocações de um dia na Agenda
+    pagamento_semanal  criar o pagamento semanal (com itens)
+    relatorio_mensal   trocar o mês do relatório financeiro
+
+Cada repetição começa com o cache de leituras vazio; fluxos que escrevem
+recarregam o banco antes. O tempo é o relógio de parede das execuções medidas
+do script (inclui o AppTest); consultas, tempo de banco e reruns vêm de
+utils/metricas.py.
+
+Comandos:
+    rodar     executa os fluxos e grava o resultado em JSON
+    comparar  compara dois resultados e aponta regressões acima do limite
+              (sai com código 1 se houver regressão)
+
+Sem --dados, gera o conjunto em memória com scripts/gerar_dados.py (mesmos
+parâmetros: --seed, --obras, --pintores...).
+
+Exemplos:
+    python scripts/benchmark.py rodar --saida benchmarks/base.json
+    python scripts/benchmark.py rodar --dados dados_local.json.gz --fluxos home,obra_detalhe --repeticoes 10
+    python scripts/benchmark.py comparar benchmarks/base.json benchmarks/atual.json --limite 15
+"""
+
+import argparse
+import gc
+import gzip
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+os.environ['SUPABASE_LOCAL'] = '1'
+
+from scripts import gerar_dados  # noqa: E402
+
+PAGINA_INICIO = 'Inicio.py'
+PAGINA_OBRAS = 'pages/1_🏠_Obras.py'
+PAGINA_AGENDA = 'pages/5_📅_Agenda.py'
+PAGINA_FINANCEIRO = 'pages/6_💰_Financeiro.py'
+
+
+class ErroFluxo(Exception):
+    """Fluxo não pôde ser medido (dados sem alvo, erro na página)"""
+
+
+# =========================================================
+# SESSÃO (AppTest com login)
+# =========================================================
+
+class Sessao:
+    """Uma página no AppTest, logada como o usuário do benchmark"""
+
+    def __init__(self, pagina: str, alvos: dict, timeout: float):
+        from streamlit.testing.v1 import AppTest
+        from utils.supabase_local import criar_cliente_local
+
+        self.pagina = pagina
+        self.timeout = timeout
+        self.at = AppTest.from_file(str(RAIZ / pagina), default_timeout=timeout)
+
+        cliente = criar_cliente_local()
+        resposta = cliente.auth.sign_in_with_password({'email': alvos['email'], 'password': alvos['senha']})
+        self.at.session_state['supabase'] = cliente
+        self.at.session_state['user'] = {'id': resposta.user.id, 'email': resposta.user.email}
+        self.at.session_state['user_profile'] = dict(alvos['perfil'])
+
+        self.tempo_ms = 0.0
+        self.consultas = 0
+        self.db_ms = 0.0
+        self.reruns = 0
+
+    def executar(self, acao=None, medir: bool = True):
+        """
+        Roda o script (ou a ação pendente: click, set_value) e confere erros
+
+        Só as execuções com medir=True entram no resultado; as outras
+        preparam o estado (ex.: abrir o formulário antes de salvar).
+        """
+        from utils.metricas import get_metricas, limpar_metricas
+
+        if medir:
+            limpar_metricas()
+        inicio = time.perf_counter()
+        (acao or self.at).run(timeout=self.timeout)
+        ms = (time.perf_counter() - inicio) * 1000
+
+        if self.at.exception:
+            raise ErroFluxo(f"{self.pagina}: {self.at.exception[0].message}")
+        erros = [e.value for e in self.at.error]
+        if erros:
+            raise ErroFluxo(f"{self.pagina}: {erros[0]}")
+
+        if medir:
+            metricas = get_metricas()
+            self.tempo_ms += ms
+            self.consultas += sum(c['total'] for c in metricas['consultas'])
+            self.db_ms += sum(c['tempo_total_ms'] for c in metricas['consultas'])
+            self.reruns += sum(p['reruns'] for p in metricas['paginas'])
+
+    def widget(self, tipo: str, label: str, form: str):
+        """Widget sem key, pelo rótulo e pelo formulário"""
+        for w in getattr(self.at, tipo):
+            if w.label == label and w.form_id == form:
+                return w
+        raise ErroFluxo(f"{self.pagina}: {tipo} '{label}' não encontrado em {form}")
+
+
+# =========================================================
+# ALVOS (escolhidos dos dados, determinísticos)
+# =========================================================
+
+def escolher_alvos(dados: dict, email: str, senha: str) -> dict:
+    """Obra/orçamento/item/dia/semana/mês usados pelos fluxos"""
+    tabelas = dados['tabelas']
+    usuario = (dados.get('usuarios_auth') or {}).get(email.lower())
+    if not usuario:
+        raise ErroFluxo(f"Usuário {email} não existe nos dados")
+    perfil = next((u for u in tabelas.get('usuarios_app', []) if u['auth_user_id'] == usuario['id']), None)
+    if not perfil or perfil.get('perfil') != 'ADMIN':
+        raise ErroFluxo(f"{email} precisa ser ADMIN (Financeiro)")
+
+    orcamentos = {o['id']: o for o in tabelas.get('orcamentos', [])}
+    fase_orcamento = {f['id']: f['orcamento_id'] for f in tabelas.get('obra_fases', [])}
+    itens = Counter()
+    primeiro_item = {}
+    for item in sorted(tabelas.get('orcamento_fase_servicos', []), key=lambda i: i['id']):
+        orc_id = fase_orcamento.get(item['obra_fase_id'])
+        itens[orc_id] += 1
+        primeiro_item.setdefault(orc_id, item)
+
+    # Orçamento editável com mais itens (RASCUNHO/EMITIDO); senão, o maior
+    def maior(candidatos):
+        return min(candidatos, key=lambda o: (-itens[o['id']], o['id']), default=None)
+
+    editavel = maior(o for o in orcamentos.values() if o['status'] in ('RASCUNHO', 'EMITIDO') and itens[o['id']])
+    orcamento = editavel or maior(o for o in orcamentos.values() if itens[o['id']])
+    if not orcamento:
+        raise ErroFluxo('Dados sem orçamentos com itens')
+
+    aprovados = {o['id'] for o in orcamentos.values() if o['status'] == 'APROVADO'}
+    pendentes = {}
+    obra_da_alocacao = {}
+    for aloc in tabelas.get('alocacoes', []):
+        if not aloc.get('confirmada') and aloc.get('obra_fase_id') and aloc.get('orcamento_id') in aprovados:
+            pendentes.setdefault(aloc['data'], []).append(aloc['id'])
+            obra_da_alocacao[aloc['id']] = aloc['obra_id']
+    dia = min(pendentes, key=lambda d: (-len(pendentes[d]), d), default=None)
+
+    datas = [a['data'] for a in tabelas.get('apontamentos', [])]
+    referencia = date.fromisoformat(max(datas)) if datas else date.today()
+    segunda = referencia - timedelta(days=referencia.weekday() + 7)
+
+    return {
+        'email': email,
+        'senha': senha,
+        'perfil': perfil,
+        'obra_id': orcamento['obra_id'],
+        'orcamento_id': orcamento['id'],
+        'orcamento_editavel': editavel is not None,
+        'item_id': primeiro_item[orcamento['id']]['id'],
+        'agenda_dia': date.fromisoformat(dia) if dia else None,
+        'agenda_ids': sorted(pendentes.get(dia, [])),
+        # Obra do formulário "Nova alocação" (o selectbox começa sem valor)
+        'agenda_obra_id': obra_da_alocacao[min(pendentes[dia])] if dia else orcamento['obra_id'],
+        'semana': (segunda, segunda + timedelta(days=5)),
+        'mes': (referencia.replace(day=1) - timedelta(days=1)).replace(day=1),
+    }
+
+
+def _descrever_alvos(alvos: dict) -> dict:
+    return {
+        'obra_id': alvos['obra_id'],
+        'orcamento_id': alvos['orcamento_id'],
+        'item_id': alvos['item_id'],
+        'agenda_dia': alvos['agenda_dia'].isoformat() if alvos['agenda_dia'] else None,
+        'agenda_alocacoes': len(alvos['agenda_ids']),
+        'semana': [d.isoformat() for d in alvos['semana']],
+        'mes': alvos['mes'].isoformat(),
+    }
+
+
+# =========================================================
+# FLUXOS
+# =========================================================
+
+def _sessao_obra(alvos: dict, timeout: float) -> Sessao:
+    sessao = Sessao(PAGINA_OBRAS, alvos, timeout)
+    sessao.at.session_state['obra_view'] = 'detalhe'
+    sessao.at.session_state['obra_id'] = alvos['obra_id']
+    sessao.at.session_state['obra_orc_manage_id'] = alvos['orcamento_id']
+    return sessao
+
+
+def fluxo_home(alvos: dict, timeout: float) -> Sessao:
+    sessao = Sessao(PAGINA_INICIO, alvos, timeout)
+    sessao.executar()
+    return sessao
+
+
+def fluxo_obra_detalhe(alvos: dict, timeout: float) -> Sessao:
+    sessao = _sessao_obra(alvos, timeout)
+    sessao.executar()
+    return sessao
+
+
+def fluxo_editar_servico(alvos: dict, timeout: float) -> Sessao:
+    from utils.supabase_local import get_banco_local
+
+    if not alvos['orcamento_editavel']:
+        raise ErroFluxo('Dados sem orçamento RASCUNHO/EMITIDO com itens')
+    sessao = _sessao_obra(alvos, timeout)
+    sessao.at.session_state['obra_servico_edit_id'] = alvos['item_id']
+    sessao.executar(medir=False)
+
+    form = f"form_edit_serv_obra_{alvos['item_id']}"
+    quantidade = sessao.widget('number_input', 'Quantidade', form)
+    nova = round(float(quantidade.value) + 1, 2)
+    quantidade.set_value(nova)
+    sessao.executar(sessao.widget('button', '💾 Salvar Serviço', form).click())
+
+    item = get_banco_local().linha('orcamento_fase_servicos', alvos['item_id'])
+    if not item or float(item['quantidade']) != nova:
+        raise ErroFluxo('Item de serviço não foi atualizado')
+    return sessao
+
+
+def fluxo_gerar_pdf(alvos: dict, timeout: float) -> Sessao:
+    sessao = _sessao_obra(alvos, timeout)
+    sessao.executar(medir=False)
+    sessao.executar(sessao.at.button(key='obra_orc_pdf').click())
+    try:
+        sessao.at.session_state[f"obra_pdf_bytes_{alvos['orcamento_id']}"]
+    except KeyError:
+        raise ErroFluxo('PDF não foi gerado')
+    return sessao
+
+
+def fluxo_agenda_confirmar(alvos: dict, timeout: float) -> Sessao:
+    from utils.supabase_local import get_banco_local
+
+    if not alvos['agenda_ids']:
+        raise ErroFluxo('Dados sem alocações pendentes de orçamento APROVADO')
+    sessao = Sessao(PAGINA_AGENDA, alvos, timeout)
+    sessao.at.session_state['data_agenda'] = alvos['agenda_dia']
+    sessao.at.session_state['nova_obra_id'] = alvos['agenda_obra_id']
+    sessao.executar(medir=False)
+    for aloc_id in alvos['agenda_ids']:
+        sessao.executar(sessao.at.button(key=f'confirm_{aloc_id}').click())
+
+    banco = get_banco_local()
+    if not all(banco.linha('alocacoes', aloc_id)['confirmada'] for aloc_id in alvos['agenda_ids']):
+        raise ErroFluxo('Alocações do dia não foram confirmadas')
+    return sessao
+
+
+def fluxo_pagamento_semanal(alvos: dict, timeout: float) -> Sessao:
+    from utils.supabase_local import get_banco_local
+
+    sessao = Sessao(PAGINA_FINANCEIRO, alvos, timeout)
+    sessao.executar(medir=False)
+    inicio, fim = alvos['semana']
+    sessao.at.selectbox(key='pag_novo_tipo').set_value('SEMANAL')
+    sessao.at.date_input(key='pag_ref_ini').set_value(inicio)
+    sessao.at.date_input(key='pag_ref_fim').set_value(fim)
+    sessao.executar(medir=False)
+
+    antes = get_banco_local().contagens()['pagamentos']
+    sessao.executar(sessao.at.button(key='pag_novo_submit').click())
+    if get_banco_local().contagens()['pagamentos'] != antes + 1:
+        raise ErroFluxo('Pagamento semanal não foi criado')
+    return sessao
+
+
+def fluxo_relatorio_mensal(alvos: dict, timeout: float) -> Sessao:
+    sessao = Sessao(PAGINA_FINANCEIRO, alvos, timeout)
+    sessao.executar(medir=False)
+    sessao.executar(sessao.at.date_input(key='financeiro_relatorio_mes').set_value(alvos['mes']))
+    return sessao
+
+
+# nome -> (função, descrição, escreve no banco)
+FLUXOS = {
+    'home': (fluxo_home, 'Painel da página inicial', False),
+    'obra_detalhe': (fluxo_obra_detalhe, 'Abrir o detalhe da obra', False),
+    'editar_servico': (fluxo_editar_servico, 'Salvar item no editor de orçamento', True),
+    'gerar_pdf': (fluxo_gerar_pdf, 'Gerar PDF do orçamento', True),
+    'agenda_confirmar': (fluxo_agenda_confirmar, 'Confirmar as alocações do dia', True),
+    'pagamento_semanal': (fluxo_pagamento_semanal, 'Criar pagamento semanal', True),
+    'relatorio_mensal': (fluxo_relatorio_mensal, 'Carregar o relatório do mês', False),
+}
+
+
+# =========================================================
+# EXECUÇÃO
+# =========================================================
+
+def _percentil(valores: list, p: float) -> float:
+    """Percentil por posição (nearest rank)"""
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def resumir(amostras: list) -> dict:
+    return {
+        'mediana_ms': round(statistics.median(amostras), 2),
+        'p95_ms': round(_percentil(amostras, 95), 2),
+        'min_ms': round(min(amostras), 2),
+        'max_ms': round(max(amostras), 2),
+        'media_ms': round(statistics.fmean(amostras), 2),
+        'desvio_ms': round(statistics.stdev(amostras), 2) if len(amostras) > 1 else 0.0,
+    }
+
+
+def medir_fluxo(nome: str, dados: dict, alvos: dict, args) -> dict:
+    from utils.auth import invalidar_perfil
+    from utils.cache import limpar_cache
+    from utils.supabase_local import reiniciar_banco_local
+
+    funcao, descricao, escreve = FLUXOS[nome]
+    amostras, consultas, db_ms, reruns = [], [], [], []
+    for repeticao in range(args.aquecimento + args.repeticoes):
+        if escreve or repeticao == 0:
+            reiniciar_banco_local(dados=dados)
+        limpar_cache()
+        invalidar_perfil()
+        gc.collect()
+
+        sessao = funcao(alvos, args.timeout)
+        if repeticao < args.aquecimento:
+            continue
+        amostras.append(sessao.tempo_ms)
+        consultas.append(sessao.consultas)
+        db_ms.append(sessao.db_ms)
+        reruns.append(sessao.reruns)
+
+    return {
+        'descricao': descricao,
+        **resumir(amostras),
+        'consultas': int(statistics.median(consultas)),
+        'db_ms': round(statistics.median(db_ms), 2),
+        'reruns': int(statistics.median(reruns)),
+        'amostras_ms': [round(a, 2) for a in amostras],
+        'erro': None,
+    }
+
+
+def _git(*comando: str) -> str | None:
+    try:
+        return subprocess.run(['git', *comando], cwd=RAIZ, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _carregar_dados(args) -> tuple[dict, str]:
+    if args.dados:
+        abrir = gzip.open if args.dados.endswith('.gz') else open
+        with abrir(args.dados, 'rt', encoding='utf-8') as f:
+            return json.load(f), args.dados
+    parametros = argparse.ArgumentParser(add_help=False)
+    gerar_dados.adicionar_parametros(parametros)
+    chaves = vars(parametros.parse_args([]))
+    config = argparse.Namespace(**{k: getattr(args, k) for k in chaves})
+    return gerar_dados.gerar_dados(config), 'gerado'
+
+
+def rodar(args) -> int:
+    import streamlit
+    from utils.supabase_local import SUPABASE_LOCAL_LATENCIA_MS
+
+    nomes = [n.strip() for n in args.fluxos.split(',') if n.strip()] if args.fluxos else list(FLUXOS)
+    desconhecidos = [n for n in nomes if n not in FLUXOS]
+    if desconhecidos:
+        print(f"❌ Fluxos desconhecidos: {', '.join(desconhecidos)} (disponíveis: {', '.join(FLUXOS)})")
+        return 2
+
+    os.chdir(RAIZ)
+    inicio = time.perf_counter()
+    dados, origem = _carregar_dados(args)
+    alvos = escolher_alvos(dados, args.email, args.senha)
+    print(f"📦 Dados ({origem}) prontos em {time.perf_counter() - inicio:.1f}s")
+
+    fluxos = {}
+    for nome in nomes:
+        try:
+            fluxos[nome] = medir_fluxo(nome, dados, alvos, args)
+            r = fluxos[nome]
+            print(f"✅ {nome:<20}{r['mediana_ms']:>10.1f} ms (p95 {r['p95_ms']:.1f}, "
+                  f"{r['consultas']} consultas, {r['db_ms']:.1f} ms de banco)")
+        except Exception as e:
+            fluxos[nome] = {'descricao': FLUXOS[nome][1], 'erro': str(e)}
+            print(f"❌ {nome:<20}{e}")
+
+    resultado = {
+        'meta': {
+            'quando': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git('rev-parse', '--short', 'HEAD'),
+            'alteracoes_locais': bool(_git('status', '--porcelain', '--untracked-files=no')),
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeticoes': args.repeticoes,
+            'aquecimento': args.aquecimento,
+            'latencia_ms': SUPABASE_LOCAL_LATENCIA_MS,
+            'dados': {
+                'origem': origem,
+                'parametros': (dados.get('meta') or {}).get('parametros'),
+                'contagens': {t: len(l) for t, l in dados['tabelas'].items()},
+            },
+            'alvos': _descrever_alvos(alvos),
+        },
+        'fluxos': fluxos,
+    }
+
+    saida = Path(args.saida or f"benchmarks/benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultado, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"💾 {saida}")
+    return 1 if any(r.get('erro') for r in fluxos.values()) else 0
+
+
+# =========================================================
+# COMPARAÇÃO
+# =========================================================
+
+def comparar_resultados(base: dict, atual: dict, limite_pct: float, minimo_ms: float) -> list:
+    """
+    Linhas da comparação por fluxo: (nome, base_ms, atual_ms, delta_pct, consultas, situação)
+
+    Regressão: mediana acima de limite_pct e de minimo_ms, mais consultas que
+    na base, ou fluxo que passou a falhar.
+    """
+    linhas = []
+    for nome in list(base['fluxos']) + [n for n in atual['fluxos'] if n not in base['fluxos']]:
+        b, a = base['fluxos'].get(nome), atual['fluxos'].get(nome)
+        if not b or b.get('erro'):
+            linhas.append((nome, None, a and a.get('mediana_ms'), None, '-', 'sem base'))
+            continue
+        if not a:
+            linhas.append((nome, b['mediana_ms'], None, None, '-', 'não medido'))
+            continue
+        if a.get('erro'):
+            linhas.append((nome, b['mediana_ms'], None, None, '-', f"REGRESSÃO (falhou: {a['erro']})"))
+            continue
+
+        diferenca = a['mediana_ms'] - b['mediana_ms']
+        delta = diferenca / b['mediana_ms'] * 100 if b['mediana_ms'] else 0.0
+        consultas = f"{b['consultas']}→{a['consultas']}"
+        if a['consultas'] > b['consultas']:
+            situacao = 'REGRESSÃO (consultas)'
+        elif delta > limite_pct and diferenca >= minimo_ms:
+            situacao = 'REGRESSÃO'
+        elif delta < -limite_pct and -diferenca >= minimo_ms:
+            situacao = 'melhora'
+        else:
+            situacao = 'ok'
+        linhas.append((nome, b['mediana_ms'], a['mediana_ms'], delta, consultas, situacao))
+    return linhas
+
+
+def comparar(args) -> int:
+    base = json.loads(Path(args.base).read_text(encoding='utf-8'))
+    atual = json.loads(Path(args.atual).read_text(encoding='utf-8'))
+
+    dados_base, dados_atual = base['meta']['dados'], atual['meta']['dados']
+    if dados_base.get('contagens') != dados_atual.get('contagens'):
+        print('⚠️ Os conjuntos de dados são diferentes: a comparação pode não valer.')
+    if base['meta'].get('latencia_ms') != atual['meta'].get('latencia_ms'):
+        print('⚠️ Latência simulada diferente entre as execuções.')
+
+    print(f"Base:  {base['meta'].get('commit') or '-'} ({base['meta']['quando']})")
+    print(f"Atual: {atual['meta'].get('commit') or '-'} ({atual['meta']['quando']})")
+    print(f"Limite: +{args.limite:g}% e +{args.minimo_ms:g} ms na mediana\n")
+    print(f"{'fluxo':<20}{'base ms':>10}{'atual ms':>10}{'Δ':>9}  {'consultas':<11}situação")
+
+    linhas = comparar_resultados(base, atual, args.limite, args.minimo_ms)
+    for nome, b, a, delta, consultas, situacao in linhas:
+        print(f"{nome:<20}{b if b is not None else '-':>10}{a if a is not None else '-':>10}"
+              f"{f'{delta:+.1f}%' if delta is not None else '-':>9}  {consultas:<11}{situacao}")
+
+    regressoes = [linha[0] for linha in linhas if linha[5].startswith('REGRESSÃO')]
+    if regressoes:
+        print(f"\n❌ {len(regressoes)} regressão(ões): {', '.join(regressoes)}")
+        return 1
+    print('\n✅ Sem regressões')
+    return 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark ponta a ponta dos fluxos do app (backend local)')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_rodar = sub.add_parser('rodar', help='Executa os fluxos e grava o resultado em JSON')
+    p_rodar.add_argument('--saida', help='Arquivo JSON (padrão: benchmarks/benchmark_<data>.json)')
+    p_rodar.add_argument('--dados', help='.json/.json.gz de scripts/gerar_dados.py (padrão: gera em memória)')
+    p_rodar.add_argument('--fluxos', help=f"Lista separada por vírgula (padrão: todos: {','.join(FLUXOS)})")
+    p_rodar.add_argument('--repeticoes', type=int, default=5, help='Repetições medidas por fluxo (padrão: 5)')
+    p_rodar.add_argument('--aquecimento', type=int, default=1, help='Repetições descartadas por fluxo (padrão: 1)')
+    p_rodar.add_argument('--timeout', type=float, default=120, help='Tempo máximo por execução, em s (padrão: 120)')
+    p_rodar.add_argument('--email', default='admin@sepol.local', help='Usuário ADMIN dos dados')
+    p_rodar.add_argument('--senha', default='admin', help='Senha do usuário')
+    gerar_dados.adicionar_parametros(p_rodar.add_argument_group('dados gerados (sem --dados)'))
+
+    p_comparar = sub.add_parser('comparar', help='Compara dois resultados e aponta regressões')
+    p_comparar.add_argument('base', help='Resultado de referência')
+    p_comparar.add_argument('atual', help='Resultado a comparar')
+    p_comparar.add_argument('--limite', type=float, default=20, help='Regressão: %% acima da mediana da base (padrão: 20)')
+    p_comparar.add_argument('--minimo-ms', type=float, default=5,
+                            help='Ignora diferenças menores que isso, em ms (padrão: 5)')
+
+    args = parser.parse_args(argv)
+    if args.comando == 'rodar':
+        return rodar(args)
+    return comparar(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,601 @@
+"""
+Teste de carga: N sessões simultâneas contra um servidor Streamlit de verdade
+
+Sobe `streamlit run Inicio.py` com o backend local (SUPABASE_LOCAL=1) e abre N
+conexões WebSocket que falam o protocolo do Streamlit como o navegador
+(BackMsg/ForwardMsg): cada sessão faz login e repete um roteiro de cliques.
+
+Roteiros:
+    campo       Agenda (dia seguinte/anterior, confirmar alocação), Obras
+                (lista, detalhe) — usuário OPERACAO
+    escritorio  Financeiro, Obras (lista, detalhe, PDF), painel inicial — ADMIN
+
+Relata, por nível de usuários simultâneos:
+- latência das interações (do clique até o fim do rerun): p50/p95/p99 geral
+  e por passo
+- requisições ao backend por segundo (endpoint /metrics do servidor)
+- memória por sessão: (RSS de pico - RSS com o servidor aquecido) / N
+  (lido em /proc; só Linux)
+
+Não usa o AppTest: ele troca um Runtime global a cada execução e não roda
+sessões em paralelo. Com --url, usa um servidor já no ar (memória só com --pid,
+requisições só com --metricas-url).
+
+Exemplos:
+    python scripts/carga.py --usuarios 1,10,30 --duracao 60 --saida carga.json
+    python scripts/carga.py --usuarios 30 --dados dados_local.json.gz --escritorio 0.2
+    python scripts/carga.py --usuarios 1,10,30 --base carga.json --limite 25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+from scripts import gerar_dados  # noqa: E402
+
+PAGINAS = {'inicio': '', 'obras': 'Obras', 'agenda': 'Agenda', 'financeiro': 'Financeiro'}
+
+
+class ErroSessao(Exception):
+    """Sessão não conseguiu seguir o roteiro (conexão, login, página)"""
+
+
+# =========================================================
+# SERVIDOR
+# =========================================================
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int | None) -> float | None:
+    """Memória residente do processo (Linux: /proc/<pid>/status)"""
+    if not pid:
+        return None
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _ler_metricas(url: str | None) -> dict | None:
+    """Totais do /metrics do servidor (requisições ao backend, erros, reruns)"""
+    if not url:
+        return None
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resposta:
+            texto = resposta.read().decode('utf-8')
+    except (urllib.error.URLError, OSError):
+        # O endpoint só sobe na primeira consulta ao banco
+        return {'consultas': 0, 'erros': 0, 'reruns': 0}
+    totais = {'consultas': 0, 'erros': 0, 'reruns': 0}
+    for linha in texto.splitlines():
+        for prefixo, campo in (
+            ('sepol_db_consulta_ms_count{', 'consultas'),
+            ('sepol_db_erros_total{', 'erros'),
+            ('sepol_rerun_ms_count{', 'reruns'),
+        ):
+            if linha.startswith(prefixo):
+                totais[campo] += float(linha.rsplit(' ', 1)[1])
+    return totais
+
+
+class Servidor:
+    """streamlit run Inicio.py com o backend local e /metrics ligado"""
+
+    def __init__(self, dados: str, log: str):
+        self.porta = _porta_livre()
+        self.porta_metricas = _porta_livre()
+        self.url = f'http://127.0.0.1:{self.porta}'
+        self.metricas_url = f'http://127.0.0.1:{self.porta_metricas}/metrics'
+        self.dados = dados
+        self.log = log
+        self.processo = None
+
+    @property
+    def pid(self) -> int | None:
+        return self.processo.pid if self.processo else None
+
+    def iniciar(self, timeout: float = 120):
+        env = dict(
+            os.environ,
+            SUPABASE_LOCAL='1',
+            SUPABASE_LOCAL_DADOS=self.dados,
+            METRICAS_ATIVAS='1',
+            METRICAS_PORTA=str(self.porta_metricas),
+            METRICAS_HOST='127.0.0.1',
+        )
+        comando = [
+            sys.executable, '-m', 'streamlit', 'run', 'Inicio.py',
+            '--server.headless', 'true',
+            '--server.port', str(self.porta),
+            '--server.address', '127.0.0.1',
+            '--server.fileWatcherType', 'none',
+            '--browser.gatherUsageStats', 'false',
+        ]
+        with open(self.log, 'ab') as log:
+            self.processo = subprocess.Popen(comando, cwd=RAIZ, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            if self.processo.poll() is not None:
+                raise ErroSessao(f"Servidor saiu com código {self.processo.returncode} (veja {self.log})")
+            try:
+                with urllib.request.urlopen(f'{self.url}/_stcore/health', timeout=2) as resposta:
+                    if resposta.status == 200:
+                        return
+            except (urllib.error.URLError, OSError):
+                pass
+            time.sleep(0.5)
+        self.parar()
+        raise ErroSessao(f"Servidor não respondeu em {timeout:.0f}s (veja {self.log})")
+
+    def parar(self):
+        if self.processo and self.processo.poll() is None:
+            self.processo.terminate()
+            try:
+                self.processo.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.processo.kill()
+        self.processo = None
+
+
+# =========================================================
+# SESSÃO (cliente WebSocket do protocolo do Streamlit)
+# =========================================================
+
+class Sessao:
+    """Uma aba do navegador: conexão, rerun com estados de widget e navegação"""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url.rstrip('/').replace('http', 'ws', 1) + '/_stcore/stream'
+        self.timeout = timeout
+        self.ws = None
+        self.paginas = {}          # nome da página -> page_script_hash
+        self.pagina_hash = ''
+        self.elementos = []        # (tipo, proto) dos widgets do último rerun
+        self.erros_app = 0
+
+    async def conectar(self):
+        import websockets
+        # Mesmo subprotocolo do navegador; sem Origin (aceito pelo servidor)
+        self.ws = await websockets.connect(
+            self.url, subprotocols=['streamlit'], max_size=256 * 1024 * 1024,
+            open_timeout=self.timeout, ping_interval=None,
+        )
+
+    async def fechar(self):
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+
+    async def rerun(self, widgets: list = (), pagina: str | None = None) -> float:
+        """Envia rerun_script e espera o fim do script (seguindo st.rerun); retorna ms"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        mensagem = BackMsg()
+        estado = mensagem.rerun_script
+        estado.query_string = ''
+        if pagina is None:
+            estado.page_script_hash = self.pagina_hash
+        elif pagina in self.paginas:
+            estado.page_script_hash = self.paginas[pagina]
+        else:
+            estado.page_name = pagina
+        for widget in widgets:
+            estado.widget_states.widgets.append(widget)
+
+        inicio = time.perf_counter()
+        await self.ws.send(mensagem.SerializeToString())
+        await asyncio.wait_for(self._ate_fim_do_script(), self.timeout)
+        return (time.perf_counter() - inicio) * 1000
+
+    async def _ate_fim_do_script(self):
+        from streamlit.proto.Alert_pb2 import Alert
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        from websockets.exceptions import ConnectionClosed
+
+        while True:
+            try:
+                dado = await self.ws.recv()
+            except ConnectionClosed as e:
+                raise ErroSessao(f'Conexão fechada pelo servidor ({e})')
+            if isinstance(dado, str):
+                continue
+            msg = ForwardMsg()
+            msg.ParseFromString(dado)
+            tipo = msg.WhichOneof('type')
+
+            if tipo == 'new_session':
+                self.elementos = []
+                self.pagina_hash = msg.new_session.page_script_hash or self.pagina_hash
+                self._registrar_paginas(msg.new_session.app_pages)
+            elif tipo == 'navigation':
+                # Versões novas mandam as páginas (e a atual) nesta mensagem
+                self.pagina_hash = msg.navigation.page_script_hash or self.pagina_hash
+                self._registrar_paginas(msg.navigation.app_pages)
+            elif tipo == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                elemento = msg.delta.new_element
+                tipo_elemento = elemento.WhichOneof('type')
+                if tipo_elemento == 'exception' or (
+                    tipo_elemento == 'alert' and elemento.alert.format == Alert.ERROR
+                ):
+                    self.erros_app += 1
+                proto = getattr(elemento, tipo_elemento) if tipo_elemento else None
+                if getattr(proto, 'id', None):
+                    self.elementos.append((tipo_elemento, proto))
+            elif tipo == 'script_finished':
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue  # st.rerun(): o próximo script já vem
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise ErroSessao('Erro de compilação na página')
+                return
+
+    def _registrar_paginas(self, paginas):
+        for pagina in paginas:
+            self.paginas[pagina.page_name] = pagina.page_script_hash
+            if pagina.url_pathname:
+                self.paginas[pagina.url_pathname] = pagina.page_script_hash
+
+    def widgets(self, tipo: str, key: str | None = None, prefixo: str | None = None, label: str | None = None) -> list:
+        """Widgets do último rerun (o id termina com -<key> quando há key)"""
+        encontrados = []
+        for tipo_elemento, proto in self.elementos:
+            if tipo_elemento != tipo:
+                continue
+            if key is not None and not proto.id.endswith(f'-{key}'):
+                continue
+            if prefixo is not None and f'-{prefixo}' not in proto.id:
+                continue
+            if label is not None and proto.label != label:
+                continue
+            encontrados.append(proto)
+        return encontrados
+
+    async def clicar(self, botao) -> float:
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        return await self.rerun([WidgetState(id=botao.id, trigger_value=True)])
+
+    async def login(self, email: str, senha: str) -> float:
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        await self.rerun(pagina=PAGINAS['inicio'])
+        campo_email = self.widgets('text_input', key='login_email')
+        campo_senha = self.widgets('text_input', key='login_password')
+        entrar = [b for b in self.widgets('button') if b.is_form_submitter]
+        if not (campo_email and campo_senha and entrar):
+            raise ErroSessao('Tela de login não encontrada')
+        ms = await self.rerun([
+            WidgetState(id=campo_email[0].id, string_value=email),
+            WidgetState(id=campo_senha[0].id, string_value=senha),
+            WidgetState(id=entrar[0].id, trigger_value=True),
+        ])
+        if self.widgets('text_input', key='login_email'):
+            raise ErroSessao(f'Login recusado para {email}')
+        return ms
+
+
+# =========================================================
+# ROTEIROS
+# =========================================================
+
+async def _obras_lista(sessao: Sessao, rng: random.Random) -> float:
+    ms = await sessao.rerun(pagina=PAGINAS['obras'])
+    voltar = sessao.widgets('button', label='⬅️ Voltar à Lista')
+    if voltar and not sessao.widgets('button', prefixo='ver_'):
+        ms += await sessao.clicar(voltar[0])
+    return ms
+
+
+async def _obra_detalhe(sessao: Sessao, rng: random.Random) -> float | None:
+    obras = sessao.widgets('button', prefixo='ver_')
+    return await sessao.clicar(rng.choice(obras)) if obras else None
+
+
+async def _gerar_pdf(sessao: Sessao, rng: random.Random) -> float | None:
+    botao = sessao.widgets('button', key='obra_orc_pdf')
+    return await sessao.clicar(botao[0]) if botao else None
+
+
+async def _agenda(sessao: Sessao, rng: random.Random) -> float:
+    return await sessao.rerun(pagina=PAGINAS['agenda'])
+
+
+async def _agenda_navegar(sessao: Sessao, rng: random.Random) -> float | None:
+    # Alterna para não sair da janela de dias com alocações
+    sessao.avancar = not getattr(sessao, 'avancar', False)
+    botao = sessao.widgets('button', label='➡️ Próximo Dia' if sessao.avancar else '⬅️ Dia Anterior')
+    return await sessao.clicar(botao[0]) if botao else None
+
+
+async def _agenda_confirmar(sessao: Sessao, rng: random.Random) -> float | None:
+    pendentes = sessao.widgets('button', prefixo='confirm_')
+    return await sessao.clicar(rng.choice(pendentes)) if pendentes else None
+
+
+async def _financeiro(sessao: Sessao, rng: random.Random) -> float:
+    return await sessao.rerun(pagina=PAGINAS['financeiro'])
+
+
+async def _inicio(sessao: Sessao, rng: random.Random) -> float:
+    return await sessao.rerun(pagina=PAGINAS['inicio'])
+
+
+# roteiro -> passos (nome, ação); ação retorna ms ou None (nada a clicar)
+ROTEIROS = {
+    'campo': (
+        ('agenda', _agenda),
+        ('agenda_navegar', _agenda_navegar),
+        ('agenda_confirmar', _agenda_confirmar),
+        ('obras_lista', _obras_lista),
+        ('obra_detalhe', _obra_detalhe),
+    ),
+    'escritorio': (
+        ('financeiro', _financeiro),
+        ('obras_lista', _obras_lista),
+        ('obra_detalhe', _obra_detalhe),
+        ('gerar_pdf', _gerar_pdf),
+        ('inicio', _inicio),
+    ),
+}
+
+
+# =========================================================
+# EXECUÇÃO
+# =========================================================
+
+async def _usuario(indice: int, roteiro: str, credenciais: tuple, args, url: str,
+                   inicio_em: float, fim_em: float, resultado: dict):
+    rng = random.Random(args.seed * 1000 + indice)
+    await asyncio.sleep(max(0.0, inicio_em - time.monotonic()))
+    sessao = Sessao(url, args.timeout)
+    try:
+        await sessao.conectar()
+        resultado['login'].append(await sessao.login(*credenciais))
+        while time.monotonic() < fim_em:
+            for nome, acao in ROTEIROS[roteiro]:
+                if time.monotonic() >= fim_em:
+                    break
+                ms = await acao(sessao, rng)
+                if ms is not None:
+                    resultado['passos'].setdefault(nome, []).append(ms)
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * args.pausa)
+    except Exception as e:
+        resultado['falhas'].append(f"sessão {indice} ({roteiro}): {e}")
+    finally:
+        resultado['erros_app'] += sessao.erros_app
+        await sessao.fechar()
+
+
+async def _amostrar_memoria(pid: int | None, fim_em: float, amostras: list):
+    while time.monotonic() < fim_em:
+        rss = _rss_mb(pid)
+        if rss is not None:
+            amostras.append(rss)
+        await asyncio.sleep(0.5)
+
+
+async def _aquecer(url: str, credenciais: dict, args):
+    """Uma sessão de cada roteiro antes de medir (imports, caches do processo)"""
+    for roteiro in ROTEIROS:
+        sessao = Sessao(url, args.timeout)
+        try:
+            await sessao.conectar()
+            await sessao.login(*credenciais[roteiro])
+            rng = random.Random(args.seed)
+            for _, acao in ROTEIROS[roteiro]:
+                await acao(sessao, rng)
+        finally:
+            await sessao.fechar()
+
+
+def _percentis(valores: list) -> dict:
+    if not valores:
+        return {'n': 0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    if len(valores) == 1:
+        cortes = valores * 99
+    else:
+        cortes = statistics.quantiles(valores, n=100, method='inclusive')
+    return {
+        'n': len(valores),
+        'p50_ms': round(cortes[49], 1),
+        'p95_ms': round(cortes[94], 1),
+        'p99_ms': round(cortes[98], 1),
+        'max_ms': round(max(valores), 1),
+    }
+
+
+async def medir_nivel(usuarios: int, url: str, pid: int | None, metricas_url: str | None,
+                      credenciais: dict, args) -> dict:
+    """Roda N sessões pelo tempo pedido e resume latência, vazão e memória"""
+    await _aquecer(url, credenciais, args)
+    rss_base = _rss_mb(pid)
+    antes = _ler_metricas(metricas_url)
+
+    escritorio = min(usuarios, round(usuarios * args.escritorio))
+    resultado = {'login': [], 'passos': {}, 'falhas': [], 'erros_app': 0}
+    inicio = time.monotonic()
+    fim_em = inicio + args.rampa + args.duracao
+    memoria = []
+    tarefas = [
+        _usuario(
+            i, 'escritorio' if i < escritorio else 'campo',
+            credenciais['escritorio' if i < escritorio else 'campo'],
+            args, url, inicio + args.rampa * i / usuarios, fim_em, resultado,
+        )
+        for i in range(usuarios)
+    ]
+    await asyncio.gather(_amostrar_memoria(pid, fim_em, memoria), *tarefas)
+    duracao = time.monotonic() - inicio
+
+    depois = _ler_metricas(metricas_url)
+    interacoes = [ms for valores in resultado['passos'].values() for ms in valores]
+    rss_pico = max(memoria) if memoria else None
+    return {
+        'usuarios': usuarios,
+        'escritorio': escritorio,
+        'duracao_s': round(duracao, 1),
+        'interacoes': _percentis(interacoes),
+        'interacoes_por_s': round(len(interacoes) / duracao, 2) if duracao else None,
+        'passos': {nome: _percentis(valores) for nome, valores in sorted(resultado['passos'].items())},
+        'login': _percentis(resultado['login']),
+        'backend_req_por_s': round((depois['consultas'] - antes['consultas']) / duracao, 1) if antes else None,
+        'backend_erros': int(depois['erros'] - antes['erros']) if antes else None,
+        'reruns_servidor': int(depois['reruns'] - antes['reruns']) if antes else None,
+        'memoria': {
+            'rss_base_mb': round(rss_base, 1) if rss_base is not None else None,
+            'rss_pico_mb': round(rss_pico, 1) if rss_pico is not None else None,
+            'por_sessao_mb': round((rss_pico - rss_base) / usuarios, 2)
+            if rss_pico is not None and rss_base is not None else None,
+        },
+        'erros_app': resultado['erros_app'],
+        'falhas': resultado['falhas'],
+    }
+
+
+def _imprimir_nivel(r: dict):
+    i, m = r['interacoes'], r['memoria']
+    print(f"👥 {r['usuarios']:>3} usuários ({r['escritorio']} escritório) — {i['n']} interações em {r['duracao_s']}s")
+    print(f"   latência p50 {i['p50_ms']} | p95 {i['p95_ms']} | p99 {i['p99_ms']} ms"
+          f" — {r['interacoes_por_s']} interações/s, {r['backend_req_por_s']} req/s no backend")
+    print(f"   memória: base {m['rss_base_mb']} MB, pico {m['rss_pico_mb']} MB, {m['por_sessao_mb']} MB/sessão"
+          f" — erros na tela: {r['erros_app']}, sessões com falha: {len(r['falhas'])}")
+    for nome, p in r['passos'].items():
+        print(f"     {nome:<18}{p['n']:>6}  p50 {p['p50_ms']:>8}  p95 {p['p95_ms']:>8}  p99 {p['p99_ms']:>8}")
+    for falha in r['falhas'][:5]:
+        print(f"   ❌ {falha}")
+
+
+def comparar_niveis(base: dict, atual: dict, limite_pct: float) -> list:
+    """Níveis cujo p95 piorou além do limite (ou que passaram a ter sessões com falha)"""
+    por_usuarios = {n['usuarios']: n for n in base['niveis']}
+    regressoes = []
+    for nivel in atual['niveis']:
+        anterior = por_usuarios.get(nivel['usuarios'])
+        if not anterior:
+            continue
+        p95_base, p95_atual = anterior['interacoes']['p95_ms'], nivel['interacoes']['p95_ms']
+        if p95_base and p95_atual and p95_atual > p95_base * (1 + limite_pct / 100):
+            regressoes.append(f"{nivel['usuarios']} usuários: p95 {p95_base} → {p95_atual} ms")
+        if nivel['falhas'] and not anterior['falhas']:
+            regressoes.append(f"{nivel['usuarios']} usuários: {len(nivel['falhas'])} sessões com falha")
+    return regressoes
+
+
+def _dados_servidor(args, pasta: str) -> str:
+    if args.dados:
+        return str(Path(args.dados).resolve())
+    parametros = argparse.ArgumentParser(add_help=False)
+    gerar_dados.adicionar_parametros(parametros)
+    config = argparse.Namespace(**{k: getattr(args, k) for k in vars(parametros.parse_args([]))})
+    caminho = os.path.join(pasta, 'dados_carga.json.gz')
+    gerar_dados.salvar_json(gerar_dados.gerar_dados(config), caminho)
+    return caminho
+
+
+def executar(args) -> int:
+    niveis = [int(n) for n in str(args.usuarios).split(',') if n.strip()]
+    credenciais = {
+        'escritorio': (args.email, args.senha),
+        'campo': (args.email_campo, args.senha_campo),
+    }
+    resultados = []
+
+    with tempfile.TemporaryDirectory(prefix='sepol_carga_') as pasta:
+        dados = None if args.url else _dados_servidor(args, pasta)
+        for usuarios in niveis:
+            servidor = None
+            if args.url:
+                url, pid, metricas_url = args.url, args.pid, args.metricas_url
+            else:
+                # Servidor novo por nível: memória e métricas não se misturam
+                servidor = Servidor(dados, args.log or os.path.join(pasta, 'streamlit.log'))
+                servidor.iniciar()
+                url, pid, metricas_url = servidor.url, servidor.pid, servidor.metricas_url
+            try:
+                resultado = asyncio.run(medir_nivel(usuarios, url, pid, metricas_url, credenciais, args))
+            finally:
+                if servidor:
+                    servidor.parar()
+            resultados.append(resultado)
+            _imprimir_nivel(resultado)
+
+    saida = {
+        'meta': {
+            'quando': datetime.now().isoformat(timespec='seconds'),
+            'duracao_s': args.duracao,
+            'rampa_s': args.rampa,
+            'pausa_s': args.pausa,
+            'escritorio': args.escritorio,
+            'dados': args.url or args.dados or 'gerado',
+            'cpus': os.cpu_count(),
+        },
+        'niveis': resultados,
+    }
+    if args.saida:
+        Path(args.saida).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.saida).write_text(json.dumps(saida, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"💾 {args.saida}")
+
+    codigo = 1 if any(r['falhas'] for r in resultados) else 0
+    if args.base:
+        base = json.loads(Path(args.base).read_text(encoding='utf-8'))
+        regressoes = comparar_niveis(base, saida, args.limite)
+        for regressao in regressoes:
+            print(f"❌ Regressão: {regressao}")
+        if regressoes:
+            codigo = 1
+        else:
+            print(f"✅ Sem regressões de p95 acima de {args.limite:g}% em relação a {args.base}")
+    return codigo
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Teste de carga com sessões simultâneas (servidor Streamlit + backend local)')
+    parser.add_argument('--usuarios', default='10', help='Sessões simultâneas; vários níveis separados por vírgula (padrão: 10)')
+    parser.add_argument('--duracao', type=float, default=60, help='Segundos de carga por nível, depois da rampa (padrão: 60)')
+    parser.add_argument('--rampa', type=float, default=10, help='Segundos para abrir todas as sessões (padrão: 10)')
+    parser.add_argument('--pausa', type=float, default=1.0, help='Pausa média entre cliques, em s (padrão: 1.0)')
+    parser.add_argument('--escritorio', type=float, default=0.25, help='Fração de sessões no roteiro escritório (padrão: 0.25)')
+    parser.add_argument('--timeout', type=float, default=120, help='Tempo máximo por rerun, em s (padrão: 120)')
+    parser.add_argument('--saida', help='Grava o resultado em JSON')
+    parser.add_argument('--base', help='Resultado anterior para comparar o p95 por nível')
+    parser.add_argument('--limite', type=float, default=25, help='Regressão: %% acima do p95 da base (padrão: 25)')
+    parser.add_argument('--dados', help='.json/.json.gz de scripts/gerar_dados.py (padrão: gera com os parâmetros abaixo)')
+    parser.add_argument('--log', help='Log do servidor Streamlit (padrão: pasta temporária)')
+    parser.add_argument('--email', default='admin@sepol.local', help='Usuário ADMIN (roteiro escritório)')
+    parser.add_argument('--senha', default='admin', help='Senha do ADMIN')
+    parser.add_argument('--email-campo', default='operacao@sepol.local', help='Usuário do roteiro campo')
+    parser.add_argument('--senha-campo', default='operacao', help='Senha do usuário de campo')
+    parser.add_argument('--url', help='Servidor já no ar (não sobe outro)')
+    parser.add_argument('--pid', type=int, help='Com --url: PID do servidor, para medir memória')
+    parser.add_argument('--metricas-url', help='Com --url: endpoint /metrics do servidor (METRICAS_PORTA)')
+    gerar_dados.adicionar_parametros(parser.add_argument_group('dados gerados (sem --dados)'))
+    args = parser.parse_args(argv)
+    return executar(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
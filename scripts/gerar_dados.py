@@ -0,0 +1,579 @@
+"""
+Gerador de dados sintéticos (volume de produção) para benchmarks
+
+Preenche o esquema do sql/ com clientes, pessoas, serviços, obras, orçamentos
+(com versões), fases, itens de serviço, alocações diárias, apontamentos,
+recebimentos, pagamentos semanais e itens de pagamento. Mesma semente e mesmos
+parâmetros = mesmos dados.
+
+Os valores derivados (totais de fase/orçamento, bruto/rateio/final dos
+apontamentos, total dos pagamentos) são calculados aqui com as mesmas regras
+dos triggers, porque a carga entra com os triggers desligados.
+
+Destinos (pela extensão de --saida ou por --formato):
+    .json / .json.gz  backend local (SUPABASE_LOCAL_DADOS=arquivo)
+    .sql / .sql.gz    Postgres local (psql -f arquivo; precisa de superusuário
+                      para desligar os triggers durante o COPY)
+
+Exemplos:
+    python scripts/gerar_dados.py --saida dados_local.json.gz
+    python scripts/gerar_dados.py --anos 5 --pintores 40 --obras 2000 --saida carga.sql.gz --limpar
+    gunzip -c carga.sql.gz | psql "$DATABASE_URL"
+"""
+
+import argparse
+import gzip
+import json
+import random
+import sys
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal, ROUND_HALF_UP
+
+NOMES = (
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduardo', 'Fernanda', 'Gabriel', 'Helena', 'Igor', 'Juliana',
+    'Karina', 'Lucas', 'Marcos', 'Natália', 'Otávio', 'Patrícia', 'Rafael', 'Sandra', 'Thiago', 'Vanessa',
+    'Wagner', 'Yara', 'José', 'Maria', 'João', 'Antônio', 'Francisca', 'Paulo', 'Adriana', 'Márcio',
+)
+SOBRENOMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas',
+)
+RUAS = (
+    'Rua das Flores', 'Av. Brasil', 'Rua XV de Novembro', 'Rua São João', 'Av. Paulista', 'Rua do Comércio',
+    'Rua Sete de Setembro', 'Av. Getúlio Vargas', 'Rua Santa Catarina', 'Rua Dom Pedro II', 'Rua das Palmeiras',
+    'Av. Independência', 'Rua Tiradentes', 'Rua Marechal Deodoro', 'Rua Bela Vista',
+)
+BAIRROS = ('Centro', 'Jardim América', 'Vila Nova', 'Boa Vista', 'Santa Cruz', 'São José', 'Industrial', 'Alvorada')
+TIPOS_OBRA = ('Residência', 'Apartamento', 'Sobrado', 'Loja', 'Escritório', 'Galpão', 'Condomínio', 'Clínica', 'Escola')
+
+# (nome, unidade, faixa de quantidade, faixa de valor unitário)
+SERVICOS = (
+    ('Lixamento de paredes', 'M2', (20, 300), (4, 9)),
+    ('Massa corrida PVA', 'M2', (20, 300), (12, 22)),
+    ('Massa acrílica', 'M2', (20, 250), (15, 28)),
+    ('Selador acrílico', 'M2', (20, 300), (5, 10)),
+    ('Pintura látex PVA', 'M2', (20, 300), (10, 18)),
+    ('Pintura acrílica fosca', 'M2', (20, 300), (14, 25)),
+    ('Pintura acrílica semibrilho', 'M2', (20, 250), (16, 28)),
+    ('Textura projetada', 'M2', (20, 200), (22, 40)),
+    ('Grafiato', 'M2', (20, 150), (28, 48)),
+    ('Pintura de teto', 'M2', (10, 150), (14, 24)),
+    ('Pintura de fachada', 'M2', (30, 400), (20, 38)),
+    ('Impermeabilização de laje', 'M2', (10, 120), (35, 70)),
+    ('Verniz em madeira', 'M2', (2, 40), (25, 45)),
+    ('Esmalte sintético em grades', 'M2', (5, 60), (30, 55)),
+    ('Pintura epóxi de piso', 'M2', (20, 300), (40, 80)),
+    ('Pintura de rodapé', 'ML', (10, 120), (6, 12)),
+    ('Pintura de faixa/barrado', 'ML', (5, 80), (10, 20)),
+    ('Tratamento de trincas', 'ML', (2, 40), (18, 35)),
+    ('Rejunte e calafetação', 'ML', (5, 60), (8, 16)),
+    ('Pintura de portas', 'UN', (1, 20), (90, 180)),
+    ('Pintura de janelas', 'UN', (1, 20), (70, 150)),
+    ('Pintura de portões', 'UN', (1, 4), (250, 600)),
+    ('Remoção de papel de parede', 'M2', (5, 80), (10, 20)),
+    ('Proteção e limpeza final', 'UN', (1, 1), (150, 600)),
+    ('Mão de obra por hora', 'H', (4, 40), (35, 60)),
+    ('Diária de equipe', 'DIA', (1, 10), (350, 650)),
+    ('Pintura de estrutura metálica', 'M2', (10, 200), (30, 60)),
+    ('Aplicação de cimento queimado', 'M2', (5, 80), (60, 110)),
+    ('Efeito marmorizado', 'M2', (5, 40), (70, 130)),
+    ('Pintura de quadra esportiva', 'M2', (100, 600), (18, 30)),
+)
+
+FASES = ('Preparação', 'Massa corrida', 'Pintura interna', 'Pintura externa', 'Textura', 'Esquadrias', 'Acabamento', 'Limpeza')
+
+DIARIAS = {'PINTOR': (180, 300), 'AJUDANTE': (110, 170), 'TERCEIRO': (250, 420)}
+
+TABELAS = (
+    'usuarios_app', 'clientes', 'pessoas', 'servicos', 'obras', 'orcamentos', 'obra_fases',
+    'orcamento_fase_servicos', 'alocacoes', 'apontamentos', 'recebimentos', 'pagamentos', 'pagamento_itens',
+)
+
+
+def _dinheiro(valor) -> float:
+    return float(Decimal(str(valor)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def _instante(dia: date, rng: random.Random, hora_min: int = 8, hora_max: int = 18) -> str:
+    momento = datetime.combine(dia, time(rng.randint(hora_min, hora_max - 1), rng.randint(0, 59),
+                                         rng.randint(0, 59), rng.randint(0, 999999)), tzinfo=timezone.utc)
+    return momento.isoformat(timespec='microseconds')
+
+
+def _dias_uteis(inicio: date, quantidade: int) -> list:
+    """Segunda a sábado (domingo não tem obra)"""
+    dias, dia = [], inicio
+    while len(dias) < quantidade:
+        if dia.weekday() != 6:
+            dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+
+class Gerador:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.fim = args.ate
+        self.inicio = self.fim - timedelta(days=round(365.25 * args.anos))
+        self.tabelas = {t: [] for t in TABELAS}
+        self.ids = defaultdict(int)
+
+    def _novo(self, tabela: str, linha: dict) -> dict:
+        self.ids[tabela] += 1
+        linha = {'id': self.ids[tabela], **linha}
+        self.tabelas[tabela].append(linha)
+        return linha
+
+    def _nome(self) -> str:
+        r = self.rng
+        return f"{r.choice(NOMES)} {r.choice(SOBRENOMES)} {r.choice(SOBRENOMES)}"
+
+    def _telefone(self) -> str:
+        return f"({self.rng.randint(11, 99)}) 9{self.rng.randint(1000, 9999)}-{self.rng.randint(1000, 9999)}"
+
+    def _endereco(self) -> str:
+        r = self.rng
+        return f"{r.choice(RUAS)}, {r.randint(10, 3000)} - {r.choice(BAIRROS)}"
+
+    # ---------- cadastros ----------
+
+    def gerar_cadastros(self):
+        a, r = self.args, self.rng
+        for _ in range(a.clientes):
+            self._novo('clientes', {
+                'nome': self._nome(),
+                'telefone': self._telefone() if r.random() < 0.9 else None,
+                'endereco': self._endereco() if r.random() < 0.7 else None,
+                'ativo': r.random() < 0.95,
+                'criado_em': _instante(self.inicio + timedelta(days=r.randint(0, 60)), r),
+            })
+
+        for tipo, quantidade in (('PINTOR', a.pintores), ('AJUDANTE', a.ajudantes), ('TERCEIRO', a.terceiros)):
+            for _ in range(quantidade):
+                self._novo('pessoas', {
+                    'nome': self._nome(),
+                    'tipo': tipo,
+                    'telefone': self._telefone(),
+                    'diaria_base': _dinheiro(r.randint(*DIARIAS[tipo])),
+                    'observacao': None,
+                    'ativo': r.random() < 0.92,
+                    'criado_em': _instante(self.inicio, r),
+                })
+
+        for nome, unidade, _, _ in SERVICOS[:a.servicos]:
+            self._novo('servicos', {
+                'nome': nome, 'unidade': unidade, 'ativo': r.random() < 0.95,
+                'criado_em': _instante(self.inicio, r),
+            })
+
+    # ---------- obras ----------
+
+    def gerar_obras(self):
+        a, r = self.args, self.rng
+        clientes = self.tabelas['clientes']
+        # clientes recorrentes: poucos clientes concentram muitas obras
+        pesos = [1 / (i + 1) ** 0.6 for i in range(len(clientes))]
+        periodo = (self.fim - self.inicio).days
+        inicios = sorted(self.inicio + timedelta(days=r.randint(0, periodo)) for _ in range(a.obras))
+
+        self.agenda = defaultdict(set)  # dia -> pessoas ocupadas (período integral)
+        self.meio = defaultdict(set)    # dia -> pessoas com 2ª alocação (meio período)
+        self.execucao = []              # (obra, orçamento, fases com dias)
+        for criado in inicios:
+            cliente = r.choices(clientes, weights=pesos)[0]
+            obra = self._novo('obras', {
+                'cliente_id': cliente['id'],
+                'titulo': f"{r.choice(TIPOS_OBRA)} {cliente['nome'].split()[1]} {self.ids['obras'] + 1}",
+                'endereco_obra': self._endereco(),
+                'status': 'AGUARDANDO',
+                'ativo': True,
+                'criado_em': _instante(criado, r),
+            })
+            self._gerar_orcamentos(obra, criado)
+
+    def _gerar_orcamentos(self, obra: dict, criado: date):
+        a, r = self.args, self.rng
+        versoes = r.choices(range(1, a.versoes_max + 1), weights=[0.6 / (v ** 1.5) for v in range(1, a.versoes_max + 1)])[0]
+        dia = criado + timedelta(days=r.randint(0, 5))
+        orcamentos = []
+        for versao in range(1, versoes + 1):
+            if dia > self.fim:
+                break
+            orcamentos.append(self._gerar_orcamento(obra, versao, dia))
+            dia += timedelta(days=r.randint(3, 12))
+        if not orcamentos:
+            orcamentos.append(self._gerar_orcamento(obra, 1, min(criado, self.fim)))
+
+        for anterior in orcamentos[:-1]:
+            anterior['status'] = r.choice(('REPROVADO', 'REPROVADO', 'CANCELADO'))
+            if anterior['status'] == 'CANCELADO':
+                anterior['cancelado_em'] = _instante(dia, r)
+
+        ultimo = orcamentos[-1]
+        emitido = date.fromisoformat(ultimo['criado_em'][:10])
+        decisao = emitido + timedelta(days=r.randint(2, 15))
+        if decisao > self.fim:
+            ultimo['status'] = r.choice(('RASCUNHO', 'EMITIDO', 'EMITIDO'))
+        elif r.random() < a.taxa_aprovacao:
+            ultimo['status'] = 'APROVADO'
+            ultimo['aprovado_em'] = _instante(decisao, r)
+            self._executar(obra, ultimo, decisao + timedelta(days=r.randint(3, 20)))
+            return
+        else:
+            ultimo['status'] = 'REPROVADO'
+            obra['status'] = 'CANCELADO'
+            obra['ativo'] = r.random() < 0.3
+
+        if ultimo['status'] in ('EMITIDO',):
+            ultimo['pdf_emitido_em'] = ultimo['criado_em']
+            ultimo['valido_ate'] = (emitido + timedelta(days=15)).isoformat()
+
+    def _gerar_orcamento(self, obra: dict, versao: int, dia: date) -> dict:
+        a, r = self.args, self.rng
+        orcamento = self._novo('orcamentos', {
+            'obra_id': obra['id'], 'versao': versao, 'status': 'RASCUNHO',
+            'valor_total': 0, 'desconto_valor': 0, 'valor_total_final': 0,
+            'aprovado_em': None, 'cancelado_em': None,
+            'observacao': None, 'pdf_url': None, 'pdf_emitido_em': None, 'valido_ate': None,
+            'criado_em': _instante(dia, r),
+        })
+        nomes = sorted(r.sample(range(len(FASES)), r.randint(a.fases_min, a.fases_max)))
+        servicos = self.tabelas['servicos']
+        total = Decimal(0)
+        for ordem, indice in enumerate(nomes, start=1):
+            fase = self._novo('obra_fases', {
+                'obra_id': obra['id'], 'orcamento_id': orcamento['id'], 'nome_fase': FASES[indice],
+                'ordem': ordem, 'status': 'PENDENTE', 'valor_fase': 0, 'criado_em': orcamento['criado_em'],
+            })
+            soma = Decimal(0)
+            for servico in r.sample(servicos, r.randint(1, min(a.itens_max, len(servicos)))):
+                _, _, faixa_qtd, faixa_valor = SERVICOS[servico['id'] - 1]
+                quantidade = _dinheiro(r.uniform(*faixa_qtd)) if servico['unidade'] in ('M2', 'ML') else r.randint(*faixa_qtd)
+                valor_unit = _dinheiro(r.uniform(*faixa_valor))
+                valor_total = _dinheiro(Decimal(str(quantidade)) * Decimal(str(valor_unit)))
+                self._novo('orcamento_fase_servicos', {
+                    'obra_fase_id': fase['id'], 'servico_id': servico['id'], 'quantidade': quantidade,
+                    'valor_unit': valor_unit, 'valor_total': valor_total, 'observacao': None,
+                    'criado_em': orcamento['criado_em'],
+                })
+                soma += Decimal(str(valor_total))
+            fase['valor_fase'] = _dinheiro(soma)
+            total += Decimal(str(fase['valor_fase']))
+
+        orcamento['valor_total'] = _dinheiro(total)
+        if r.random() < 0.25:
+            orcamento['desconto_valor'] = _dinheiro(total * Decimal(str(r.choice((0.03, 0.05, 0.1)))))
+        orcamento['valor_total_final'] = max(0.0, _dinheiro(total - Decimal(str(orcamento['desconto_valor']))))
+        return orcamento
+
+    # ---------- execução (agenda) ----------
+
+    def _executar(self, obra: dict, orcamento: dict, inicio: date):
+        """Distribui as fases em dias úteis e aloca a equipe da obra"""
+        a, r = self.args, self.rng
+        fases = [f for f in self.tabelas['obra_fases'][-a.fases_max:] if f['orcamento_id'] == orcamento['id']]
+        pintores = [p for p in self.tabelas['pessoas'] if p['tipo'] == 'PINTOR' and p['ativo']]
+        ajudantes = [p for p in self.tabelas['pessoas'] if p['tipo'] != 'PINTOR' and p['ativo']]
+        equipe = r.sample(pintores, min(len(pintores), r.randint(1, max(1, a.equipe_max - 1))))
+        if ajudantes and r.random() < 0.6:
+            equipe.append(r.choice(ajudantes))
+
+        dia = inicio
+        agenda_limite = self.fim + timedelta(days=a.agenda_dias)
+        em_andamento = False
+        for fase in fases:
+            duracao = max(1, min(15, round(fase['valor_fase'] / 2500) + r.randint(0, 2)))
+            dias = _dias_uteis(dia, duracao)
+            dia = dias[-1] + timedelta(days=1)
+            if dias[-1] <= self.fim:
+                fase['status'] = 'CONCLUIDA'
+            elif dias[0] <= self.fim:
+                fase['status'] = 'EM_ANDAMENTO'
+                em_andamento = True
+            fase['_dias'] = dias
+            for d in dias:
+                if d > agenda_limite:
+                    break
+                self._alocar(obra, orcamento, fase, equipe, d)
+
+        if inicio > self.fim:
+            obra['status'] = 'AGUARDANDO'
+        elif em_andamento or any(f['status'] != 'CONCLUIDA' for f in fases):
+            obra['status'] = 'PAUSADO' if r.random() < 0.05 else 'INICIADO'
+        else:
+            obra['status'] = 'CONCLUIDO'
+        self.execucao.append((obra, orcamento, fases))
+
+    def _alocar(self, obra: dict, orcamento: dict, fase: dict, equipe: list, dia: date):
+        r = self.rng
+        for pessoa in equipe:
+            periodo = 'INTEGRAL'
+            if pessoa['id'] in self.agenda[dia]:
+                # já está em outra obra: às vezes divide o dia (meio período, rateio)
+                if pessoa['id'] in self.meio[dia] or r.random() > self.args.taxa_meio_periodo:
+                    continue
+                self.meio[dia].add(pessoa['id'])
+                periodo = 'MEIO'
+            self.agenda[dia].add(pessoa['id'])
+            self._novo('alocacoes', {
+                'data': dia.isoformat(), 'pessoa_id': pessoa['id'], 'obra_id': obra['id'],
+                'orcamento_id': orcamento['id'], 'obra_fase_id': fase['id'], 'periodo': periodo,
+                'tipo': 'INTERNO' if pessoa['tipo'] != 'TERCEIRO' else 'EXTERNO', 'observacao': None,
+                'confirmada': dia < self.fim and r.random() < 0.98,
+                'criado_em': _instante(max(self.inicio, dia - timedelta(days=r.randint(1, 7))), r),
+            })
+
+    # ---------- produção e financeiro ----------
+
+    def gerar_apontamentos(self):
+        """Alocação confirmada => apontamento (trg_alocacao_confirmada_gera_apontamento)"""
+        r = self.rng
+        pessoas = {p['id']: p for p in self.tabelas['pessoas']}
+        por_chave = defaultdict(list)
+        for alocacao in self.tabelas['alocacoes']:
+            if not alocacao['confirmada']:
+                continue
+            dia = date.fromisoformat(alocacao['data'])
+            base = pessoas[alocacao['pessoa_id']]['diaria_base']
+            apontamento = self._novo('apontamentos', {
+                'obra_id': alocacao['obra_id'], 'orcamento_id': alocacao['orcamento_id'],
+                'obra_fase_id': alocacao['obra_fase_id'], 'pessoa_id': alocacao['pessoa_id'],
+                'data': alocacao['data'], 'tipo_dia': 'NORMAL', 'valor_base': base,
+                'acrescimo_pct': 0.0, 'desconto_valor': 0.0, 'valor_final': 0.0, 'observacao': None,
+                'criado_em': _instante(dia, r, 17, 23), 'valor_bruto': base, 'valor_rateado': 0.0,
+            })
+            por_chave[(apontamento['pessoa_id'], apontamento['data'])].append(apontamento)
+
+        # rateio (sql/011): bruto / n por pessoa e dia
+        for apontamentos in por_chave.values():
+            n = len(apontamentos)
+            for ap in apontamentos:
+                rateado = Decimal(str(ap['valor_bruto'])) / n
+                ap['valor_rateado'] = _dinheiro(rateado)
+                ap['valor_final'] = max(0.0, _dinheiro(rateado - Decimal(str(ap['desconto_valor']))))
+
+    def gerar_recebimentos(self):
+        """Um recebimento por fase concluída; PAGO depois do vencimento"""
+        r = self.rng
+        for obra, orcamento, fases in self.execucao:
+            fator = (
+                Decimal(str(orcamento['valor_total_final'])) / Decimal(str(orcamento['valor_total']))
+                if orcamento['valor_total'] else Decimal(1)
+            )
+            for fase in fases:
+                if fase['status'] != 'CONCLUIDA':
+                    continue
+                concluida = fase['_dias'][-1]
+                vencimento = concluida + timedelta(days=r.randint(5, 30))
+                status, recebido_em = 'ABERTO', None
+                if vencimento <= self.fim:
+                    if r.random() < 0.92:
+                        status = 'PAGO'
+                        recebido_em = min(self.fim, vencimento + timedelta(days=r.randint(-5, 10)))
+                    else:
+                        status = 'VENCIDO'
+                self._novo('recebimentos', {
+                    'obra_fase_id': fase['id'],
+                    'valor': _dinheiro(Decimal(str(fase['valor_fase'])) * fator),
+                    'vencimento': vencimento.isoformat(),
+                    'recebido_em': recebido_em.isoformat() if recebido_em else None,
+                    'status': status, 'observacao': None,
+                    'criado_em': _instante(concluida, r),
+                })
+
+    def gerar_pagamentos(self):
+        """Pagamento SEMANAL por pessoa com os apontamentos da semana + extras avulsos"""
+        r = self.rng
+        semanas = defaultdict(list)
+        for ap in self.tabelas['apontamentos']:
+            dia = date.fromisoformat(ap['data'])
+            semanas[(ap['pessoa_id'], dia - timedelta(days=dia.weekday()))].append(ap)
+
+        for (pessoa_id, segunda), apontamentos in sorted(semanas.items(), key=lambda x: (x[0][1], x[0][0])):
+            sabado = segunda + timedelta(days=5)
+            pago = sabado + timedelta(days=r.randint(0, 3))
+            quitado = pago < self.fim
+            pagamento = self._novo('pagamentos', {
+                'tipo': 'SEMANAL', 'referencia_inicio': segunda.isoformat(), 'referencia_fim': sabado.isoformat(),
+                'obra_fase_id': None, 'pessoa_id': pessoa_id, 'valor_total': 0,
+                'status': 'PAGO' if quitado else 'PENDENTE',
+                'pago_em': pago.isoformat() if quitado else None, 'observacao': None,
+                'criado_em': _instante(min(sabado, self.fim), r),
+            })
+            total = Decimal(0)
+            for ap in apontamentos:
+                self._novo('pagamento_itens', {
+                    'pagamento_id': pagamento['id'], 'apontamento_id': ap['id'], 'valor': ap['valor_final'],
+                    'observacao': None, 'criado_em': pagamento['criado_em'],
+                })
+                total += Decimal(str(ap['valor_final']))
+            pagamento['valor_total'] = _dinheiro(total)
+
+        pessoas = [p for p in self.tabelas['pessoas'] if p['ativo']]
+        mes = date(self.inicio.year, self.inicio.month, 1)
+        while mes <= self.fim and pessoas:
+            for _ in range(r.randint(0, 3)):
+                dia = min(self.fim, mes + timedelta(days=r.randint(0, 27)))
+                self._novo('pagamentos', {
+                    'tipo': 'EXTRA', 'referencia_inicio': None, 'referencia_fim': None,
+                    'obra_fase_id': None, 'pessoa_id': r.choice(pessoas)['id'],
+                    'valor_total': _dinheiro(r.randint(50, 400)), 'status': 'PAGO',
+                    'pago_em': dia.isoformat(), 'observacao': 'Ajuda de custo',
+                    'criado_em': _instante(dia, r),
+                })
+            mes = date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+    def gerar_usuarios(self) -> dict:
+        """Usuários do backend local (no Postgres, os usuários vêm do Supabase Auth)"""
+        usuarios_auth = {}
+        for email, usuario, perfil in (
+            ('admin@sepol.local', 'admin', 'ADMIN'),
+            ('operacao@sepol.local', 'operacao', 'OPERACAO'),
+        ):
+            auth_user_id = str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+            usuarios_auth[email] = {'id': auth_user_id, 'senha': usuario}
+            self._novo('usuarios_app', {
+                'auth_user_id': auth_user_id, 'usuario': usuario, 'perfil': perfil, 'ativo': True,
+                'criado_em': _instante(self.inicio, self.rng), 'atualizado_em': _instante(self.inicio, self.rng),
+            })
+        return usuarios_auth
+
+    def gerar(self) -> dict:
+        usuarios_auth = self.gerar_usuarios()
+        self.gerar_cadastros()
+        self.gerar_obras()
+        self.gerar_apontamentos()
+        self.gerar_recebimentos()
+        self.gerar_pagamentos()
+        for fase in self.tabelas['obra_fases']:
+            fase.pop('_dias', None)
+        return {
+            'meta': {
+                'gerado_por': 'scripts/gerar_dados.py',
+                'parametros': {k: (v.isoformat() if isinstance(v, date) else v)
+                               for k, v in vars(self.args).items() if k not in ('saida', 'formato', 'limpar')},
+                'contagens': {t: len(l) for t, l in self.tabelas.items()},
+            },
+            'usuarios_auth': usuarios_auth,
+            'tabelas': self.tabelas,
+        }
+
+
+# =========================================================
+# SAÍDA
+# =========================================================
+
+def _abrir(caminho: str):
+    return gzip.open(caminho, 'wt', encoding='utf-8') if caminho.endswith('.gz') else open(caminho, 'w', encoding='utf-8')
+
+
+def salvar_json(dados: dict, caminho: str):
+    """Formato do backend local (BancoLocal.carregar)"""
+    with _abrir(caminho) as f:
+        json.dump(dados, f, ensure_ascii=False)
+
+
+def _copy_valor(valor) -> str:
+    if valor is None:
+        return r'\N'
+    if isinstance(valor, bool):
+        return 't' if valor else 'f'
+    texto = json.dumps(valor, ensure_ascii=False) if isinstance(valor, (dict, list)) else str(valor)
+    return texto.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def salvar_sql(dados: dict, caminho: str, limpar: bool):
+    """
+    Script para psql: COPY com triggers desligados (session_replication_role),
+    sequências ajustadas e resumo financeiro reconstruído no fim
+    """
+    tabelas = [t for t in TABELAS if t != 'usuarios_app']
+    with _abrir(caminho) as f:
+        f.write('-- Gerado por scripts/gerar_dados.py\n')
+        f.write(f"-- {json.dumps(dados['meta']['parametros'], ensure_ascii=False)}\n")
+        f.write('begin;\n')
+        f.write('set local session_replication_role = replica;\n')
+        if limpar:
+            f.write(f"truncate {', '.join('public.' + t for t in reversed(tabelas))}, "
+                    'public.obra_financeiro_resumo restart identity cascade;\n')
+        for tabela in tabelas:
+            linhas = dados['tabelas'][tabela]
+            if not linhas:
+                continue
+            colunas = list(linhas[0])
+            f.write(f"copy public.{tabela} ({', '.join(colunas)}) from stdin;\n")
+            for linha in linhas:
+                f.write('\t'.join(_copy_valor(linha.get(c)) for c in colunas) + '\n')
+            f.write('\\.\n')
+        for tabela in tabelas:
+            f.write(f"select setval(pg_get_serial_sequence('public.{tabela}', 'id'), "
+                    f"coalesce((select max(id) from public.{tabela}), 1));\n")
+        f.write('set local session_replication_role = origin;\n')
+        f.write('select public.fn_obra_financeiro_reconstruir();\n')
+        f.write('commit;\n')
+        f.write('analyze;\n')
+
+
+def _data(texto: str) -> date:
+    return date.fromisoformat(texto)
+
+
+def adicionar_parametros(parser: argparse.ArgumentParser):
+    """Parâmetros das distribuições (também usados por scripts/benchmark.py)"""
+    parser.add_argument('--seed', type=int, default=42, help='Semente (padrão: 42)')
+    parser.add_argument('--ate', type=_data, default=date.today(), help='Último dia dos dados (padrão: hoje)')
+    parser.add_argument('--anos', type=float, default=5, help='Anos de histórico (padrão: 5)')
+    parser.add_argument('--obras', type=int, default=2000, help='Obras (padrão: 2000)')
+    parser.add_argument('--clientes', type=int, default=1200, help='Clientes (padrão: 1200)')
+    parser.add_argument('--pintores', type=int, default=40, help='Pintores (padrão: 40)')
+    parser.add_argument('--ajudantes', type=int, default=15, help='Ajudantes (padrão: 15)')
+    parser.add_argument('--terceiros', type=int, default=5, help='Terceiros (padrão: 5)')
+    parser.add_argument('--servicos', type=int, default=len(SERVICOS), help=f'Serviços no catálogo (máx. {len(SERVICOS)})')
+    parser.add_argument('--versoes-max', type=int, default=3, help='Versões de orçamento por obra (padrão: até 3)')
+    parser.add_argument('--fases-min', type=int, default=2, help='Fases por orçamento (mínimo, padrão: 2)')
+    parser.add_argument('--fases-max', type=int, default=6, help=f'Fases por orçamento (máximo, padrão: 6, até {len(FASES)})')
+    parser.add_argument('--itens-max', type=int, default=5, help='Serviços por fase (máximo, padrão: 5)')
+    parser.add_argument('--equipe-max', type=int, default=3, help='Pessoas por obra (máximo, padrão: 3)')
+    parser.add_argument('--taxa-aprovacao', type=float, default=0.75, help='Chance de aprovar a última versão (padrão: 0.75)')
+    parser.add_argument('--taxa-meio-periodo', type=float, default=0.05,
+                        help='Chance de dividir o dia entre duas obras (padrão: 0.05)')
+    parser.add_argument('--agenda-dias', type=int, default=14, help='Dias de agenda futura (padrão: 14)')
+
+
+def gerar_dados(args) -> dict:
+    """Gera os dados em memória (formato de BancoLocal.carregar + 'meta')"""
+    args.servicos = max(1, min(args.servicos, len(SERVICOS)))
+    args.fases_max = max(1, min(args.fases_max, len(FASES)))
+    args.fases_min = max(1, min(args.fases_min, args.fases_max))
+    return Gerador(args).gerar()
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos para benchmarks (backend local ou Postgres)')
+    parser.add_argument('--saida', required=True, help='.json/.json.gz (backend local) ou .sql/.sql.gz (Postgres)')
+    parser.add_argument('--formato', choices=('json', 'sql'), help='Padrão: pela extensão de --saida')
+    parser.add_argument('--limpar', action='store_true', help='SQL: trunca as tabelas antes da carga')
+    adicionar_parametros(parser)
+    args = parser.parse_args(argv)
+
+    formato = args.formato or ('sql' if args.saida.endswith(('.sql', '.sql.gz')) else 'json')
+
+    inicio = datetime.now()
+    dados = gerar_dados(args)
+    if formato == 'sql':
+        salvar_sql(dados, args.saida, args.limpar)
+    else:
+        salvar_json(dados, args.saida)
+
+    for tabela, total in dados['meta']['contagens'].items():
+        print(f"{tabela:<26}{total:>10}")
+    print(f"✅ {args.saida} ({formato}) em {(datetime.now() - inicio).total_seconds():.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
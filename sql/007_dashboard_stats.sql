@@ -0,0 +1,66 @@
+begin;
+
+-- =========================================================
+-- 1) DASHBOARD: estatísticas em uma única chamada
+-- - p_inicio: primeiro dia do período (inclusivo)
+-- - p_fim: primeiro dia após o período (exclusivo)
+-- - somas feitas no Postgres (sem trafegar linhas)
+-- - security invoker: RLS continua valendo (OPERACAO vê 0 no financeiro)
+-- =========================================================
+create or replace function public.fn_dashboard_stats(
+  p_inicio date,
+  p_fim date
+)
+returns jsonb
+language sql
+stable
+set search_path = public
+as $$
+  with receb as (
+    select coalesce(round(sum(r.valor), 2), 0) as total
+    from public.recebimentos r
+    where r.status = 'PAGO'
+      and r.recebido_em >= p_inicio
+      and r.recebido_em < p_fim
+  ),
+  pag as (
+    select coalesce(round(sum(p.valor_total), 2), 0) as total
+    from public.pagamentos p
+    where p.status = 'PAGO'
+      and p.pago_em >= p_inicio
+      and p.pago_em < p_fim
+  )
+  select jsonb_build_object(
+    'obras_ativas', (
+      select count(*)
+      from public.obras o
+      where o.ativo = true
+        and o.status in ('AGUARDANDO','INICIADO','PAUSADO')
+    ),
+    'orcamentos_pendentes', (
+      select count(*)
+      from public.orcamentos oc
+      where oc.status in ('RASCUNHO','EMITIDO')
+    ),
+    'pessoas_ativas', (
+      select count(*) from public.pessoas p where p.ativo = true
+    ),
+    'clientes_ativos', (
+      select count(*) from public.clientes c where c.ativo = true
+    ),
+    'recebimentos_mes', (select total from receb),
+    'pagamentos_mes', (select total from pag),
+    'resultado_mes', round((select total from receb) - (select total from pag), 2),
+    'fases_nao_concluidas', (
+      select count(*) from public.obra_fases f where f.status <> 'CONCLUIDA'
+    )
+  )
+$$;
+
+grant execute on function public.fn_dashboard_stats(date, date) to authenticated;
+
+-- Índices de apoio para os filtros por período
+create index if not exists idx_receb_status_recebido on public.recebimentos(status, recebido_em);
+create index if not exists idx_pag_status_pago on public.pagamentos(status, pago_em);
+
+commit;
@@ -0,0 +1,88 @@
+begin;
+
+-- =========================================================
+-- 1) ÍNDICES para o relatório por período
+-- - recebimentos: data de referência = recebido_em, senão vencimento
+-- - pagamentos: data de referência = pago_em, senão referencia_fim/inicio
+-- - parciais (só PAGO), pois o relatório só lista baixados
+-- =========================================================
+create index if not exists idx_receb_pago_data_ref
+on public.recebimentos ((coalesce(recebido_em, vencimento)))
+where status = 'PAGO';
+
+create index if not exists idx_pag_pago_data_ref
+on public.pagamentos ((coalesce(pago_em, referencia_fim, referencia_inicio)))
+where status = 'PAGO';
+
+-- =========================================================
+-- 2) RELATÓRIO FINANCEIRO do período
+-- - p_inicio e p_fim inclusivos
+-- - retorna só as linhas do período + totais já somados
+-- - security invoker: RLS (ADMIN only) continua valendo
+-- =========================================================
+create or replace function public.fn_relatorio_financeiro(
+  p_inicio date,
+  p_fim date
+)
+returns jsonb
+language sql
+stable
+set search_path = public
+as $$
+  with receb as (
+    select
+      coalesce(r.recebido_em, r.vencimento) as data_ref,
+      coalesce(o.titulo, '-') || ' - ' || coalesce(f.nome_fase, '-') as descricao,
+      coalesce(r.valor, 0) as valor,
+      r.vencimento
+    from public.recebimentos r
+    left join public.obra_fases f on f.id = r.obra_fase_id
+    left join public.obras o on o.id = f.obra_id
+    where r.status = 'PAGO'
+      and coalesce(r.recebido_em, r.vencimento) between p_inicio and p_fim
+  ),
+  pag as (
+    select
+      coalesce(p.pago_em, p.referencia_fim, p.referencia_inicio) as data_ref,
+      case
+        when p.referencia_inicio is not null or p.referencia_fim is not null then
+          p.tipo || ' (' || coalesce(p.referencia_inicio::text, '-')
+                 || ' a ' || coalesce(p.referencia_fim::text, '-') || ')'
+        else p.tipo
+      end as descricao,
+      coalesce(p.valor_total, 0) as valor,
+      p.criado_em
+    from public.pagamentos p
+    where p.status = 'PAGO'
+      and coalesce(p.pago_em, p.referencia_fim, p.referencia_inicio) between p_inicio and p_fim
+  ),
+  totais as (
+    select
+      (select coalesce(round(sum(valor), 2), 0) from receb) as total_recebimentos,
+      (select coalesce(round(sum(valor), 2), 0) from pag)   as total_pagamentos
+  )
+  select jsonb_build_object(
+    'recebimentos', coalesce((
+      select jsonb_agg(
+        jsonb_build_object('data_ref', data_ref, 'descricao', descricao, 'valor', valor)
+        order by vencimento desc nulls first
+      )
+      from receb
+    ), '[]'::jsonb),
+    'pagamentos', coalesce((
+      select jsonb_agg(
+        jsonb_build_object('data_ref', data_ref, 'descricao', descricao, 'valor', valor)
+        order by criado_em desc
+      )
+      from pag
+    ), '[]'::jsonb),
+    'total_recebimentos', t.total_recebimentos,
+    'total_pagamentos', t.total_pagamentos,
+    'saldo', round(t.total_recebimentos - t.total_pagamentos, 2)
+  )
+  from totais t
+$$;
+
+grant execute on function public.fn_relatorio_financeiro(date, date) to authenticated;
+
+commit;
@@ -0,0 +1,130 @@
+begin;
+
+-- =========================================================
+-- 1) PAGAMENTOS: recálculo de total em lote
+-- =========================================================
+create or replace function public.fn_pagamentos_recalc_total(p_pagamento_ids bigint[])
+returns void
+language plpgsql
+as $$
+begin
+  update public.pagamentos p
+     set valor_total = coalesce((
+       select round(sum(i.valor),2)
+       from public.pagamento_itens i
+       where i.pagamento_id = p.id
+     ), 0)
+   where p.id = any(p_pagamento_ids);
+end;
+$$;
+
+-- =========================================================
+-- 2) TRIGGER por statement (transition tables)
+-- - substitui o trigger FOR EACH ROW trg_pagamento_itens_recalc_total
+-- - cada pagamento afetado é recalculado uma vez por statement
+-- - um trigger por evento (transition tables não aceitam múltiplos eventos)
+-- =========================================================
+create or replace function public.trg_pagamento_itens_recalc_total_stmt()
+returns trigger
+language plpgsql
+as $$
+declare
+  v_ids bigint[];
+begin
+  if tg_op = 'INSERT' then
+    select array_agg(distinct n.pagamento_id) into v_ids
+    from itens_novos n;
+
+  elsif tg_op = 'DELETE' then
+    select array_agg(distinct o.pagamento_id) into v_ids
+    from itens_antigos o;
+
+  else
+    select array_agg(distinct x.pagamento_id) into v_ids
+    from (
+      select n.pagamento_id from itens_novos n
+      union
+      select o.pagamento_id from itens_antigos o
+    ) x;
+  end if;
+
+  if v_ids is not null then
+    perform public.fn_pagamentos_recalc_total(v_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_pagamento_itens_recalc_total on public.pagamento_itens;
+
+drop trigger if exists trg_pagamento_itens_recalc_total_ins on public.pagamento_itens;
+create trigger trg_pagamento_itens_recalc_total_ins
+after insert on public.pagamento_itens
+referencing new table as itens_novos
+for each statement execute function public.trg_pagamento_itens_recalc_total_stmt();
+
+drop trigger if exists trg_pagamento_itens_recalc_total_upd on public.pagamento_itens;
+create trigger trg_pagamento_itens_recalc_total_upd
+after update on public.pagamento_itens
+referencing old table as itens_antigos new table as itens_novos
+for each statement execute function public.trg_pagamento_itens_recalc_total_stmt();
+
+drop trigger if exists trg_pagamento_itens_recalc_total_del on public.pagamento_itens;
+create trigger trg_pagamento_itens_recalc_total_del
+after delete on public.pagamento_itens
+referencing old table as itens_antigos
+for each statement execute function public.trg_pagamento_itens_recalc_total_stmt();
+
+-- =========================================================
+-- 3) RPC: cria pagamento + itens em uma transação
+-- - p_pagamento: colunas de public.pagamentos (sem id)
+-- - p_itens: [{apontamento_id, valor, observacao}, ...]
+-- - itens entram em um único INSERT (total recalculado uma vez)
+-- - security invoker: RLS (ADMIN only) continua valendo
+-- =========================================================
+create or replace function public.fn_criar_pagamento_com_itens(
+  p_pagamento jsonb,
+  p_itens jsonb
+)
+returns jsonb
+language plpgsql
+set search_path = public
+as $$
+declare
+  v_pagamento_id bigint;
+  v_resultado jsonb;
+begin
+  insert into public.pagamentos (
+    tipo, referencia_inicio, referencia_fim, obra_fase_id, pessoa_id,
+    valor_total, status, pago_em, observacao
+  )
+  select
+    coalesce(r.tipo, 'SEMANAL'),
+    r.referencia_inicio,
+    r.referencia_fim,
+    r.obra_fase_id,
+    r.pessoa_id,
+    coalesce(r.valor_total, 0),
+    coalesce(r.status, 'PENDENTE'),
+    r.pago_em,
+    r.observacao
+  from jsonb_populate_record(null::public.pagamentos, p_pagamento) r
+  returning id into v_pagamento_id;
+
+  insert into public.pagamento_itens (pagamento_id, apontamento_id, valor, observacao)
+  select v_pagamento_id, i.apontamento_id, coalesce(i.valor, 0), i.observacao
+  from jsonb_to_recordset(coalesce(p_itens, '[]'::jsonb))
+    as i(apontamento_id bigint, valor numeric, observacao text);
+
+  select to_jsonb(p) into v_resultado
+  from public.pagamentos p
+  where p.id = v_pagamento_id;
+
+  return v_resultado;
+end;
+$$;
+
+grant execute on function public.fn_criar_pagamento_com_itens(jsonb, jsonb) to authenticated;
+
+commit;
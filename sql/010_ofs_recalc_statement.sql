@@ -0,0 +1,132 @@
+begin;
+
+-- =========================================================
+-- 1) Recálculo em lote: fases
+-- - soma os itens de cada fase informada
+-- - só grava quando o valor muda (evita UPDATE/auditoria à toa)
+-- =========================================================
+create or replace function public.fn_recalcular_fases(p_fase_ids bigint[])
+returns void
+language plpgsql
+as $$
+begin
+  update public.obra_fases f
+     set valor_fase = s.total
+    from (
+      select
+        ids.id,
+        coalesce((
+          select round(sum(ofs.valor_total),2)
+          from public.orcamento_fase_servicos ofs
+          where ofs.obra_fase_id = ids.id
+        ), 0) as total
+      from unnest(p_fase_ids) as ids(id)
+    ) s
+   where f.id = s.id
+     and f.valor_fase is distinct from s.total;
+end;
+$$;
+
+-- =========================================================
+-- 2) Recálculo em lote: orçamentos (soma das fases) + desconto
+-- - NÃO re-soma os itens de todas as fases (use fn_recalcular_fases antes)
+-- =========================================================
+create or replace function public.fn_recalcular_orcamentos_totais(p_orcamento_ids bigint[])
+returns void
+language plpgsql
+as $$
+begin
+  update public.orcamentos o
+     set valor_total = t.total,
+         valor_total_final = greatest(0, round(t.total - greatest(0, coalesce(o.desconto_valor,0)), 2))
+    from (
+      select
+        ids.id,
+        coalesce((
+          select round(sum(f.valor_fase),2)
+          from public.obra_fases f
+          where f.orcamento_id = ids.id
+        ), 0) as total
+      from unnest(p_orcamento_ids) as ids(id)
+    ) t
+   where o.id = t.id
+     and (o.valor_total, o.valor_total_final) is distinct from (
+       t.total,
+       greatest(0, round(t.total - greatest(0, coalesce(o.desconto_valor,0)), 2))
+     );
+end;
+$$;
+
+-- =========================================================
+-- 3) TRIGGER por statement (transition tables)
+-- - substitui trg_ofs_recalc_fase_orcamento (FOR EACH ROW)
+-- - cada fase e cada orçamento afetado é recalculado uma vez por statement
+-- - um trigger por evento (transition tables não aceitam múltiplos eventos)
+-- =========================================================
+create or replace function public.trg_ofs_recalc_stmt()
+returns trigger
+language plpgsql
+as $$
+declare
+  v_fase_ids bigint[];
+  v_orc_ids bigint[];
+begin
+  if tg_op = 'INSERT' then
+    select array_agg(distinct n.obra_fase_id) into v_fase_ids
+    from ofs_novos n;
+
+  elsif tg_op = 'DELETE' then
+    select array_agg(distinct o.obra_fase_id) into v_fase_ids
+    from ofs_antigos o;
+
+  else
+    select array_agg(distinct x.obra_fase_id) into v_fase_ids
+    from (
+      select n.obra_fase_id from ofs_novos n
+      union
+      select o.obra_fase_id from ofs_antigos o
+    ) x;
+  end if;
+
+  if v_fase_ids is null then
+    return null;
+  end if;
+
+  perform public.fn_recalcular_fases(v_fase_ids);
+
+  select array_agg(distinct f.orcamento_id) into v_orc_ids
+  from public.obra_fases f
+  where f.id = any(v_fase_ids);
+
+  if v_orc_ids is not null then
+    perform public.fn_recalcular_orcamentos_totais(v_orc_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_ofs_recalc_fase_orcamento on public.orcamento_fase_servicos;
+
+drop trigger if exists trg_ofs_recalc_stmt_ins on public.orcamento_fase_servicos;
+create trigger trg_ofs_recalc_stmt_ins
+after insert on public.orcamento_fase_servicos
+referencing new table as ofs_novos
+for each statement execute function public.trg_ofs_recalc_stmt();
+
+drop trigger if exists trg_ofs_recalc_stmt_upd on public.orcamento_fase_servicos;
+create trigger trg_ofs_recalc_stmt_upd
+after update on public.orcamento_fase_servicos
+referencing old table as ofs_antigos new table as ofs_novos
+for each statement execute function public.trg_ofs_recalc_stmt();
+
+drop trigger if exists trg_ofs_recalc_stmt_del on public.orcamento_fase_servicos;
+create trigger trg_ofs_recalc_stmt_del
+after delete on public.orcamento_fase_servicos
+referencing old table as ofs_antigos
+for each statement execute function public.trg_ofs_recalc_stmt();
+
+-- (trg_ofs_recalc_fase_orcamento() continua existindo apenas para
+--  comparação em sql/bench/ofs_bulk_insert.sql)
+
+commit;
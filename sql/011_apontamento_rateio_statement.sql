@@ -0,0 +1,142 @@
+begin;
+
+-- =========================================================
+-- 1) APONTAMENTOS: rateio em lote por (pessoa_id, data)
+-- Mesma regra do sql/002:
+-- n = total de apontamentos do mesmo profissional no mesmo dia
+-- valor_rateado = valor_bruto / n
+-- valor_final = max(0, valor_rateado - desconto_valor)
+-- - p_pessoa_ids[i] / p_datas[i] formam cada chave
+-- - um único UPDATE ... FROM com count() over (window)
+-- - só grava linhas cujo valor muda (sem UPDATE/auditoria à toa)
+-- =========================================================
+create or replace function public.fn_apontamentos_recalcular_rateio(
+  p_pessoa_ids bigint[],
+  p_datas date[]
+)
+returns void
+language plpgsql
+as $$
+begin
+  update public.apontamentos a
+     set valor_rateado = r.valor_rateado,
+         valor_final   = r.valor_final
+    from (
+      select
+        g.id,
+        round(g.valor_bruto / g.n, 2) as valor_rateado,
+        greatest(0, round((g.valor_bruto / g.n) - coalesce(g.desconto_valor,0), 2)) as valor_final
+      from (
+        select
+          x.id,
+          x.valor_bruto,
+          x.desconto_valor,
+          count(*) over (partition by x.pessoa_id, x.data) as n
+        from public.apontamentos x
+        join (
+          select distinct k.pessoa_id, k.data
+          from unnest(p_pessoa_ids, p_datas) as k(pessoa_id, data)
+        ) k on k.pessoa_id = x.pessoa_id
+           and k.data = x.data
+      ) g
+    ) r
+   where a.id = r.id
+     and (a.valor_rateado, a.valor_final) is distinct from (r.valor_rateado, r.valor_final);
+end;
+$$;
+
+-- Versão de uma chave (mantida para chamadas existentes)
+create or replace function public.fn_apontamento_recalcular_rateio(
+  p_pessoa_id bigint,
+  p_data date
+)
+returns void
+language plpgsql
+as $$
+begin
+  perform public.fn_apontamentos_recalcular_rateio(array[p_pessoa_id], array[p_data]);
+end;
+$$;
+
+-- =========================================================
+-- 2) TRIGGER por statement (transition tables)
+-- - substitui trg_apontamento_rateio_after (FOR EACH ROW)
+-- - junta as chaves (pessoa_id, data) distintas do statement
+-- - no UPDATE, só considera linhas em que pessoa/data/bruto/desconto
+--   mudaram: o próprio UPDATE do rateio (valor_rateado/valor_final)
+--   não gera novas chaves e a cascata para aí
+-- - um trigger por evento (transition tables não aceitam múltiplos eventos)
+-- =========================================================
+create or replace function public.trg_apontamentos_rateio_stmt()
+returns trigger
+language plpgsql
+as $$
+declare
+  v_pessoa_ids bigint[];
+  v_datas date[];
+begin
+  if tg_op = 'INSERT' then
+    select array_agg(k.pessoa_id), array_agg(k.data)
+      into v_pessoa_ids, v_datas
+    from (
+      select distinct n.pessoa_id, n.data
+      from apont_novos n
+      where n.pessoa_id is not null
+    ) k;
+
+  elsif tg_op = 'DELETE' then
+    select array_agg(k.pessoa_id), array_agg(k.data)
+      into v_pessoa_ids, v_datas
+    from (
+      select distinct o.pessoa_id, o.data
+      from apont_antigos o
+      where o.pessoa_id is not null
+    ) k;
+
+  else
+    select array_agg(k.pessoa_id), array_agg(k.data)
+      into v_pessoa_ids, v_datas
+    from (
+      select n.pessoa_id, n.data
+      from apont_novos n
+      join apont_antigos o on o.id = n.id
+      where (o.pessoa_id, o.data, o.valor_bruto, o.desconto_valor)
+            is distinct from (n.pessoa_id, n.data, n.valor_bruto, n.desconto_valor)
+      union
+      select o.pessoa_id, o.data
+      from apont_novos n
+      join apont_antigos o on o.id = n.id
+      where (o.pessoa_id, o.data) is distinct from (n.pessoa_id, n.data)
+    ) k
+    where k.pessoa_id is not null;
+  end if;
+
+  if v_pessoa_ids is not null then
+    perform public.fn_apontamentos_recalcular_rateio(v_pessoa_ids, v_datas);
+  end if;
+
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_apontamento_rateio_after on public.apontamentos;
+
+drop trigger if exists trg_apontamentos_rateio_ins on public.apontamentos;
+create trigger trg_apontamentos_rateio_ins
+after insert on public.apontamentos
+referencing new table as apont_novos
+for each statement execute function public.trg_apontamentos_rateio_stmt();
+
+drop trigger if exists trg_apontamentos_rateio_upd on public.apontamentos;
+create trigger trg_apontamentos_rateio_upd
+after update on public.apontamentos
+referencing old table as apont_antigos new table as apont_novos
+for each statement execute function public.trg_apontamentos_rateio_stmt();
+
+drop trigger if exists trg_apontamentos_rateio_del on public.apontamentos;
+create trigger trg_apontamentos_rateio_del
+after delete on public.apontamentos
+referencing old table as apont_antigos
+for each statement execute function public.trg_apontamentos_rateio_stmt();
+
+commit;
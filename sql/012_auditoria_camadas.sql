@@ -0,0 +1,103 @@
+begin;
+
+-- =========================================================
+-- 1) AUDITORIA: quem audita cada entidade
+-- - BANCO: fn_audit_trigger grava (jsonb antes/depois)
+-- - APP: utils/auditoria.py grava (em lote, em segundo plano)
+-- - cada entidade é auditada por UMA camada só
+-- =========================================================
+create table if not exists public.auditoria_camadas (
+  entidade varchar(50) primary key,
+  camada varchar(10) not null default 'BANCO' check (camada in ('BANCO','APP'))
+);
+
+insert into public.auditoria_camadas (entidade, camada) values
+  ('clientes', 'BANCO'),
+  ('pessoas', 'BANCO'),
+  ('obras', 'BANCO'),
+  ('orcamentos', 'BANCO'),
+  ('obra_fases', 'BANCO'),
+  ('servicos', 'BANCO'),
+  ('orcamento_fase_servicos', 'BANCO'),
+  ('alocacoes', 'BANCO'),
+  ('apontamentos', 'BANCO'),
+  ('recebimentos', 'BANCO'),
+  ('pagamentos', 'BANCO'),
+  ('pagamento_itens', 'BANCO'),
+  -- sem trigger de auditoria: fica com o app
+  ('usuarios_app', 'APP')
+on conflict (entidade) do nothing;
+
+alter table public.auditoria_camadas enable row level security;
+
+drop policy if exists auditoria_camadas_select on public.auditoria_camadas;
+create policy auditoria_camadas_select
+on public.auditoria_camadas for select
+using (public.fn_user_perfil() in ('ADMIN','OPERACAO'));
+
+drop policy if exists auditoria_camadas_admin_write on public.auditoria_camadas;
+create policy auditoria_camadas_admin_write
+on public.auditoria_camadas for all
+using (public.fn_is_admin())
+with check (public.fn_is_admin());
+
+-- =========================================================
+-- 2) fn_audit_trigger: respeita a camada configurada
+-- - entidade marcada como APP não é gravada pelo trigger
+-- - entidade sem linha em auditoria_camadas continua no BANCO
+-- =========================================================
+create or replace function public.fn_audit_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_usuario text;
+  v_entidade text;
+  v_id_text text;
+begin
+  v_entidade := tg_table_name;
+
+  if exists (
+    select 1 from public.auditoria_camadas c
+    where c.entidade = v_entidade
+      and c.camada = 'APP'
+  ) then
+    return coalesce(new, old);
+  end if;
+
+  -- Nome amigável, se existir
+  select u.usuario into v_usuario
+  from public.usuarios_app u
+  where u.auth_user_id = auth.uid()
+  limit 1;
+
+  if v_usuario is null then
+    v_usuario := coalesce(auth.uid()::text, 'SYSTEM');
+  end if;
+
+  if tg_op = 'INSERT' then
+    v_id_text := (to_jsonb(new)->>'id');
+    insert into public.auditoria(usuario, entidade, entidade_id, acao, antes_json, depois_json)
+    values (v_usuario, v_entidade, v_id_text, 'INSERT', null, to_jsonb(new));
+    return new;
+
+  elsif tg_op = 'UPDATE' then
+    v_id_text := coalesce((to_jsonb(new)->>'id'), (to_jsonb(old)->>'id'));
+    insert into public.auditoria(usuario, entidade, entidade_id, acao, antes_json, depois_json)
+    values (v_usuario, v_entidade, v_id_text, 'UPDATE', to_jsonb(old), to_jsonb(new));
+    return new;
+
+  elsif tg_op = 'DELETE' then
+    v_id_text := (to_jsonb(old)->>'id');
+    insert into public.auditoria(usuario, entidade, entidade_id, acao, antes_json, depois_json)
+    values (v_usuario, v_entidade, v_id_text, 'DELETE', to_jsonb(old), null);
+    return old;
+  end if;
+
+  return null;
+end;
+$$;
+
+commit;
@@ -0,0 +1,26 @@
+begin;
+
+-- =========================================================
+-- 1) USUÁRIOS DO APP: marca de alteração
+-- - o app guarda o perfil em cache e, ao expirar, só confere
+--   atualizado_em (consulta mínima) antes de buscar tudo de novo
+-- =========================================================
+alter table public.usuarios_app
+add column if not exists atualizado_em timestamptz not null default now();
+
+create or replace function public.fn_usuarios_app_atualizado_em()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.atualizado_em := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists trg_usuarios_app_atualizado_em on public.usuarios_app;
+create trigger trg_usuarios_app_atualizado_em
+before update on public.usuarios_app
+for each row execute function public.fn_usuarios_app_atualizado_em();
+
+commit;
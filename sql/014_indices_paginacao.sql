@@ -0,0 +1,29 @@
+begin;
+
+-- =========================================================
+-- 1) ÍNDICES para paginação keyset (coluna de ordem + id)
+-- - acompanham os get_*_pagina de utils/db.py
+-- - a ordem do índice é a mesma do ORDER BY da lista
+-- =========================================================
+create index if not exists idx_clientes_nome_id
+on public.clientes (nome, id);
+
+create index if not exists idx_pessoas_nome_id
+on public.pessoas (nome, id);
+
+create index if not exists idx_obras_criado_id
+on public.obras (criado_em desc, id desc);
+
+create index if not exists idx_apont_data_id
+on public.apontamentos (data desc, id desc);
+
+create index if not exists idx_apont_obra_data_id
+on public.apontamentos (obra_id, data desc, id desc);
+
+create index if not exists idx_receb_venc_id
+on public.recebimentos (vencimento desc, id desc);
+
+create index if not exists idx_pag_criado_id
+on public.pagamentos (criado_em desc, id desc);
+
+commit;
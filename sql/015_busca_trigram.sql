@@ -0,0 +1,122 @@
+begin;
+
+-- =========================================================
+-- 1) EXTENSÕES para busca aproximada
+-- =========================================================
+create extension if not exists pg_trgm;
+create extension if not exists unaccent;
+
+-- =========================================================
+-- 2) NORMALIZAÇÃO do texto de busca
+-- - minúsculas e sem acento ("João" = "joao")
+-- - immutable para poder ser usada em índice
+-- =========================================================
+create or replace function public.fn_busca_normalizar(p_texto text)
+returns text
+language sql
+immutable
+parallel safe
+set search_path = public, extensions
+as $$
+  select lower(unaccent('unaccent'::regdictionary, coalesce(p_texto, '')))
+$$;
+
+-- =========================================================
+-- 3) ÍNDICES GIN (trigramas) usados pela busca
+-- - atendem LIKE '%termo%' e word_similarity (<%)
+-- =========================================================
+create index if not exists idx_clientes_nome_trgm
+on public.clientes using gin (public.fn_busca_normalizar(nome) gin_trgm_ops);
+
+create index if not exists idx_clientes_telefone_trgm
+on public.clientes using gin (telefone gin_trgm_ops);
+
+create index if not exists idx_pessoas_nome_trgm
+on public.pessoas using gin (public.fn_busca_normalizar(nome) gin_trgm_ops);
+
+create index if not exists idx_obras_titulo_trgm
+on public.obras using gin (public.fn_busca_normalizar(titulo) gin_trgm_ops);
+
+create index if not exists idx_obras_endereco_trgm
+on public.obras using gin (public.fn_busca_normalizar(endereco_obra) gin_trgm_ops);
+
+-- =========================================================
+-- 4) RPC: busca ranqueada
+-- - p_entidade: 'clientes' | 'obras' | 'pessoas'
+-- - casa por trecho (LIKE) ou aproximado (tolera erro de digitação)
+-- - score: trecho exato primeiro, depois word_similarity
+-- - retorna só (id, score); filtros/colunas ficam com o app
+-- - "order by 2" = score (evita conflito com o parâmetro OUT)
+-- - security invoker: RLS continua valendo
+-- =========================================================
+create or replace function public.fn_buscar(
+  p_entidade text,
+  p_termo text,
+  p_limite int default 100
+)
+returns table (id bigint, score real)
+language plpgsql
+stable
+set search_path = public, extensions
+as $$
+declare
+  v_termo text := public.fn_busca_normalizar(trim(p_termo));
+  v_like text;
+  v_tel_like text;
+begin
+  if v_termo = '' then
+    return;
+  end if;
+
+  v_like := '%' || replace(replace(replace(v_termo, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+  v_tel_like := '%' || replace(replace(replace(trim(p_termo), '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+  if p_entidade = 'clientes' then
+    return query
+    select c.id,
+           ((public.fn_busca_normalizar(c.nome) like v_like)::int
+            + word_similarity(v_termo, public.fn_busca_normalizar(c.nome)))::real as score
+    from public.clientes c
+    where public.fn_busca_normalizar(c.nome) like v_like
+       or v_termo <% public.fn_busca_normalizar(c.nome)
+       or c.telefone like v_tel_like
+    order by 2 desc, c.nome
+    limit p_limite;
+
+  elsif p_entidade = 'pessoas' then
+    return query
+    select p.id,
+           ((public.fn_busca_normalizar(p.nome) like v_like)::int
+            + word_similarity(v_termo, public.fn_busca_normalizar(p.nome)))::real as score
+    from public.pessoas p
+    where public.fn_busca_normalizar(p.nome) like v_like
+       or v_termo <% public.fn_busca_normalizar(p.nome)
+    order by 2 desc, p.nome
+    limit p_limite;
+
+  elsif p_entidade = 'obras' then
+    return query
+    select o.id,
+           ((public.fn_busca_normalizar(o.titulo) like v_like
+             or public.fn_busca_normalizar(o.endereco_obra) like v_like)::int
+            + greatest(
+                word_similarity(v_termo, public.fn_busca_normalizar(o.titulo)),
+                word_similarity(v_termo, public.fn_busca_normalizar(o.endereco_obra))
+              ))::real as score
+    from public.obras o
+    where public.fn_busca_normalizar(o.titulo) like v_like
+       or public.fn_busca_normalizar(o.endereco_obra) like v_like
+       or v_termo <% public.fn_busca_normalizar(o.titulo)
+       or v_termo <% public.fn_busca_normalizar(o.endereco_obra)
+    order by 2 desc, o.criado_em desc
+    limit p_limite;
+
+  else
+    raise exception 'Entidade de busca inválida: %', p_entidade;
+  end if;
+end;
+$$;
+
+grant execute on function public.fn_buscar(text, text, int) to authenticated;
+
+commit;
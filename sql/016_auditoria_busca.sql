@@ -0,0 +1,87 @@
+begin;
+
+-- =========================================================
+-- 1) AUDITORIA: texto pesquisável
+-- - usuário, entidade, id, ação + chaves/valores do antes/depois
+-- - coluna gerada (mantida pelo Postgres, sem trigger)
+-- - obs.: em tabelas grandes o ALTER reescreve a tabela (rode fora do pico)
+-- =========================================================
+alter table public.auditoria
+add column if not exists busca_tsv tsvector
+generated always as (
+  to_tsvector('simple'::regconfig,
+    coalesce(usuario, '') || ' ' ||
+    coalesce(entidade, '') || ' ' ||
+    coalesce(entidade_id, '') || ' ' ||
+    coalesce(acao, '')
+  )
+  || jsonb_to_tsvector('simple'::regconfig, coalesce(antes_json, '{}'::jsonb), '["key","string","numeric"]')
+  || jsonb_to_tsvector('simple'::regconfig, coalesce(depois_json, '{}'::jsonb), '["key","string","numeric"]')
+) stored;
+
+-- =========================================================
+-- 2) ÍNDICES
+-- - GIN no texto (busca livre)
+-- - GIN jsonb_path_ops no depois_json (contém: {"status":"PAGO"})
+-- - btree para keyset (criado_em desc, id desc), geral e por registro
+-- =========================================================
+create index if not exists idx_auditoria_busca_tsv
+on public.auditoria using gin (busca_tsv);
+
+create index if not exists idx_auditoria_depois_json
+on public.auditoria using gin (depois_json jsonb_path_ops);
+
+create index if not exists idx_auditoria_criado_id
+on public.auditoria (criado_em desc, id desc);
+
+create index if not exists idx_auditoria_registro
+on public.auditoria (entidade, entidade_id, criado_em desc, id desc);
+
+-- =========================================================
+-- 3) RPC: busca paginada (keyset em criado_em, id)
+-- - todos os filtros são opcionais (null = sem filtro)
+-- - p_texto: sintaxe de busca web ("valor obra", "status -cancelado")
+-- - p_campo: só registros em que esse campo mudou (antes <> depois)
+-- - p_fim exclusivo
+-- - cursor: (criado_em, id) do último registro da página anterior
+-- - security invoker: RLS (ADMIN only) continua valendo
+-- - sem SET search_path: assim o Postgres "inlina" a função e os
+--   filtros nulos somem do plano (índices são usados)
+-- =========================================================
+create or replace function public.fn_auditoria_buscar(
+  p_texto text default null,
+  p_entidade text default null,
+  p_entidade_id text default null,
+  p_usuario text default null,
+  p_acao text default null,
+  p_campo text default null,
+  p_inicio timestamptz default null,
+  p_fim timestamptz default null,
+  p_cursor_criado_em timestamptz default null,
+  p_cursor_id bigint default null,
+  p_limite int default 50
+)
+returns setof public.auditoria
+language sql
+stable
+as $$
+  select a.*
+  from public.auditoria a
+  where (p_texto is null or a.busca_tsv @@ websearch_to_tsquery('simple'::regconfig, p_texto))
+    and (p_entidade is null or a.entidade = p_entidade)
+    and (p_entidade_id is null or a.entidade_id = p_entidade_id)
+    and (p_usuario is null or a.usuario ilike '%' || p_usuario || '%')
+    and (p_acao is null or a.acao = p_acao)
+    and (p_campo is null or (a.antes_json -> p_campo) is distinct from (a.depois_json -> p_campo))
+    and (p_inicio is null or a.criado_em >= p_inicio)
+    and (p_fim is null or a.criado_em < p_fim)
+    and (p_cursor_criado_em is null or (a.criado_em, a.id) < (p_cursor_criado_em, p_cursor_id))
+  order by a.criado_em desc, a.id desc
+  limit least(greatest(coalesce(p_limite, 50), 1), 500)
+$$;
+
+grant execute on function public.fn_auditoria_buscar(
+  text, text, text, text, text, text, timestamptz, timestamptz, timestamptz, bigint, int
+) to authenticated;
+
+commit;
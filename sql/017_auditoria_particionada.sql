@@ -0,0 +1,331 @@
+begin;
+
+-- =========================================================
+-- 0) AUDITORIA particionada por mês (criado_em)
+-- - a tabela atual é copiada para a nova e removida
+-- - rode fora do pico: a cópia reescreve todo o histórico
+-- - fn_auditoria_buscar depende do tipo da tabela: é recriada no fim
+-- =========================================================
+drop function if exists public.fn_auditoria_buscar(
+  text, text, text, text, text, text, timestamptz, timestamptz, timestamptz, bigint, int
+);
+
+alter table public.auditoria rename to auditoria_legado;
+
+create table public.auditoria (
+  id bigint not null default nextval('public.auditoria_id_seq'),
+  usuario varchar(100),
+  entidade varchar(50) not null,
+  entidade_id varchar(50),
+  acao varchar(50) not null,
+  antes_json jsonb,
+  depois_json jsonb,
+  criado_em timestamptz not null default now(),
+  busca_tsv tsvector generated always as (
+    to_tsvector('simple'::regconfig,
+      coalesce(usuario, '') || ' ' ||
+      coalesce(entidade, '') || ' ' ||
+      coalesce(entidade_id, '') || ' ' ||
+      coalesce(acao, '')
+    )
+    || jsonb_to_tsvector('simple'::regconfig, coalesce(antes_json, '{}'::jsonb), '["key","string","numeric"]')
+    || jsonb_to_tsvector('simple'::regconfig, coalesce(depois_json, '{}'::jsonb), '["key","string","numeric"]')
+  ) stored
+) partition by range (criado_em);
+
+-- a sequence passa a ser da nova tabela (senão some junto com a antiga)
+alter sequence public.auditoria_id_seq owned by public.auditoria.id;
+
+-- Partição padrão: nada se perde se faltar a partição do mês
+create table public.auditoria_padrao partition of public.auditoria default;
+alter table public.auditoria_padrao enable row level security;
+
+-- =========================================================
+-- 1) PARTIÇÕES mensais
+-- - auditoria_AAAA_MM, de [1º dia do mês, 1º dia do mês seguinte)
+-- - se a partição padrão já tiver linhas do mês, elas são movidas
+-- - RLS ligado em cada partição SEM policies: acesso só pela tabela pai
+-- - manutenção: ADMIN, service_role ou sessão sem JWT (SQL Editor/pg_cron)
+-- =========================================================
+create or replace function public.fn_auditoria_pode_manter()
+returns boolean
+language sql
+stable
+as $$
+  select auth.role() is null
+      or auth.role() = 'service_role'
+      or public.fn_is_admin();
+$$;
+
+create or replace function public.fn_auditoria_criar_particao(p_mes date)
+returns text
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_inicio date := date_trunc('month', p_mes)::date;
+  v_fim date := (date_trunc('month', p_mes) + interval '1 month')::date;
+  v_nome text := 'auditoria_' || to_char(date_trunc('month', p_mes), 'YYYY_MM');
+begin
+  if not public.fn_auditoria_pode_manter() then
+    raise exception 'Sem permissão para manter partições de auditoria.';
+  end if;
+
+  if to_regclass('public.' || v_nome) is not null then
+    return v_nome;
+  end if;
+
+  if exists (
+    select 1 from public.auditoria_padrao
+    where criado_em >= v_inicio and criado_em < v_fim
+  ) then
+    execute format(
+      'create table public.%I (like public.auditoria including defaults including generated)',
+      v_nome
+    );
+    execute format(
+      'with movidos as (
+         delete from public.auditoria_padrao
+         where criado_em >= %L and criado_em < %L
+         returning id, usuario, entidade, entidade_id, acao, antes_json, depois_json, criado_em
+       )
+       insert into public.%I (id, usuario, entidade, entidade_id, acao, antes_json, depois_json, criado_em)
+       select * from movidos',
+      v_inicio, v_fim, v_nome
+    );
+    execute format(
+      'alter table public.auditoria attach partition public.%I for values from (%L) to (%L)',
+      v_nome, v_inicio, v_fim
+    );
+  else
+    execute format(
+      'create table public.%I partition of public.auditoria for values from (%L) to (%L)',
+      v_nome, v_inicio, v_fim
+    );
+  end if;
+
+  execute format('alter table public.%I enable row level security', v_nome);
+
+  return v_nome;
+end;
+$$;
+
+-- Mês atual + p_meses_a_frente meses
+create or replace function public.fn_auditoria_criar_particoes(p_meses_a_frente int default 3)
+returns setof text
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  i int;
+begin
+  for i in 0..greatest(p_meses_a_frente, 0) loop
+    return next public.fn_auditoria_criar_particao((current_date + make_interval(months => i))::date);
+  end loop;
+end;
+$$;
+
+-- Partições do histórico atual + próximos meses
+do $$
+declare
+  v_mes date;
+begin
+  for v_mes in
+    select generate_series(
+      date_trunc('month', coalesce((select min(criado_em) from public.auditoria_legado), now())),
+      date_trunc('month', now()),
+      interval '1 month'
+    )::date
+  loop
+    perform public.fn_auditoria_criar_particao(v_mes);
+  end loop;
+
+  perform public.fn_auditoria_criar_particoes(3);
+end;
+$$;
+
+-- =========================================================
+-- 2) CÓPIA do histórico e remoção da tabela antiga
+-- =========================================================
+insert into public.auditoria (id, usuario, entidade, entidade_id, acao, antes_json, depois_json, criado_em)
+select id, usuario, entidade, entidade_id, acao, antes_json, depois_json, criado_em
+from public.auditoria_legado;
+
+drop table public.auditoria_legado;
+
+alter table public.auditoria add constraint auditoria_pkey primary key (id, criado_em);
+
+-- =========================================================
+-- 3) ÍNDICES (criados em cada partição automaticamente)
+-- =========================================================
+create index if not exists idx_auditoria_entidade on public.auditoria(entidade);
+create index if not exists idx_auditoria_data on public.auditoria(criado_em);
+
+create index if not exists idx_auditoria_busca_tsv
+on public.auditoria using gin (busca_tsv);
+
+create index if not exists idx_auditoria_depois_json
+on public.auditoria using gin (depois_json jsonb_path_ops);
+
+create index if not exists idx_auditoria_criado_id
+on public.auditoria (criado_em desc, id desc);
+
+create index if not exists idx_auditoria_registro
+on public.auditoria (entidade, entidade_id, criado_em desc, id desc);
+
+-- =========================================================
+-- 4) RLS (mesmas regras do sql/001)
+-- =========================================================
+alter table public.auditoria enable row level security;
+
+drop policy if exists auditoria_admin_select on public.auditoria;
+create policy auditoria_admin_select
+on public.auditoria for select
+using (public.fn_is_admin());
+
+drop policy if exists auditoria_admin_write on public.auditoria;
+create policy auditoria_admin_write
+on public.auditoria for insert
+with check (public.fn_is_admin());
+
+-- =========================================================
+-- 5) RETENÇÃO
+-- - fn_auditoria_particoes: lista as partições mensais (mais antigas primeiro)
+-- - fn_auditoria_remover_particao: desanexa e apaga um mês JÁ EXPORTADO
+--   (confere a quantidade exportada antes de apagar)
+-- - exportar/restaurar: scripts/auditoria_arquivo.py
+-- =========================================================
+create or replace function public.fn_auditoria_particoes()
+returns table (particao text, inicio date, fim date, registros_estimados bigint)
+language plpgsql
+stable
+security definer
+set search_path = public, pg_temp
+as $$
+begin
+  if not public.fn_auditoria_pode_manter() then
+    raise exception 'Sem permissão para consultar partições de auditoria.';
+  end if;
+
+  return query
+  select
+    c.relname::text,
+    to_date(substring(c.relname from 'auditoria_(\d{4}_\d{2})$'), 'YYYY_MM'),
+    (to_date(substring(c.relname from 'auditoria_(\d{4}_\d{2})$'), 'YYYY_MM') + interval '1 month')::date,
+    greatest(c.reltuples, 0)::bigint
+  from pg_inherits i
+  join pg_class c on c.oid = i.inhrelid
+  where i.inhparent = 'public.auditoria'::regclass
+    and c.relname ~ '^auditoria_\d{4}_\d{2}$'
+  order by 2;
+end;
+$$;
+
+create or replace function public.fn_auditoria_remover_particao(
+  p_mes date,
+  p_registros_exportados bigint
+)
+returns bigint
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_nome text := 'auditoria_' || to_char(date_trunc('month', p_mes), 'YYYY_MM');
+  v_total bigint;
+begin
+  if not public.fn_auditoria_pode_manter() then
+    raise exception 'Sem permissão para remover partições de auditoria.';
+  end if;
+
+  if date_trunc('month', p_mes) >= date_trunc('month', now()) then
+    raise exception 'Não é permitido remover a partição do mês atual ou futura: %', v_nome;
+  end if;
+
+  if to_regclass('public.' || v_nome) is null then
+    return 0;
+  end if;
+
+  execute format('select count(*) from public.%I', v_nome) into v_total;
+
+  if v_total <> coalesce(p_registros_exportados, -1) then
+    raise exception 'Partição % tem % registros, mas % foram exportados. Nada removido.',
+      v_nome, v_total, p_registros_exportados;
+  end if;
+
+  execute format('alter table public.auditoria detach partition public.%I', v_nome);
+  execute format('drop table public.%I', v_nome);
+
+  return v_total;
+end;
+$$;
+
+revoke all on function public.fn_auditoria_criar_particao(date) from public;
+revoke all on function public.fn_auditoria_criar_particoes(int) from public;
+revoke all on function public.fn_auditoria_particoes() from public;
+revoke all on function public.fn_auditoria_remover_particao(date, bigint) from public;
+
+grant execute on function public.fn_auditoria_criar_particao(date) to authenticated, service_role;
+grant execute on function public.fn_auditoria_criar_particoes(int) to authenticated, service_role;
+grant execute on function public.fn_auditoria_particoes() to authenticated, service_role;
+grant execute on function public.fn_auditoria_remover_particao(date, bigint) to authenticated, service_role;
+
+-- =========================================================
+-- 6) PARTIÇÕES FUTURAS automáticas (se pg_cron estiver instalado)
+-- - todo dia 1º às 03:00 garante o mês atual + 3
+-- - sem pg_cron: rode scripts/auditoria_arquivo.py particoes (ex.: cron do servidor)
+-- =========================================================
+do $$
+begin
+  if exists (select 1 from pg_extension where extname = 'pg_cron') then
+    perform cron.schedule(
+      'auditoria_particoes',
+      '0 3 1 * *',
+      'select public.fn_auditoria_criar_particoes(3)'
+    );
+  end if;
+end;
+$$;
+
+-- =========================================================
+-- 7) fn_auditoria_buscar (igual ao sql/016, sobre a tabela nova)
+-- =========================================================
+create or replace function public.fn_auditoria_buscar(
+  p_texto text default null,
+  p_entidade text default null,
+  p_entidade_id text default null,
+  p_usuario text default null,
+  p_acao text default null,
+  p_campo text default null,
+  p_inicio timestamptz default null,
+  p_fim timestamptz default null,
+  p_cursor_criado_em timestamptz default null,
+  p_cursor_id bigint default null,
+  p_limite int default 50
+)
+returns setof public.auditoria
+language sql
+stable
+as $$
+  select a.*
+  from public.auditoria a
+  where (p_texto is null or a.busca_tsv @@ websearch_to_tsquery('simple'::regconfig, p_texto))
+    and (p_entidade is null or a.entidade = p_entidade)
+    and (p_entidade_id is null or a.entidade_id = p_entidade_id)
+    and (p_usuario is null or a.usuario ilike '%' || p_usuario || '%')
+    and (p_acao is null or a.acao = p_acao)
+    and (p_campo is null or (a.antes_json -> p_campo) is distinct from (a.depois_json -> p_campo))
+    and (p_inicio is null or a.criado_em >= p_inicio)
+    and (p_fim is null or a.criado_em < p_fim)
+    and (p_cursor_criado_em is null or (a.criado_em, a.id) < (p_cursor_criado_em, p_cursor_id))
+  order by a.criado_em desc, a.id desc
+  limit least(greatest(coalesce(p_limite, 50), 1), 500)
+$$;
+
+grant execute on function public.fn_auditoria_buscar(
+  text, text, text, text, text, text, timestamptz, timestamptz, timestamptz, bigint, int
+) to authenticated;
+
+commit;
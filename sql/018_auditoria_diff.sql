@@ -0,0 +1,157 @@
+begin;
+
+-- =========================================================
+-- 1) AUDITORIA: modo de gravação por entidade
+-- - DIFF: UPDATE guarda só as chaves que mudaram (antes/depois)
+-- - COMPLETO: UPDATE guarda a linha inteira (comportamento antigo)
+-- - INSERT e DELETE guardam sempre a linha inteira
+-- - UPDATE sem mudança nenhuma não é gravado (nos dois modos)
+-- =========================================================
+alter table public.auditoria_camadas
+  add column if not exists modo varchar(10) not null default 'DIFF';
+
+alter table public.auditoria_camadas
+  drop constraint if exists auditoria_camadas_modo_check;
+alter table public.auditoria_camadas
+  add constraint auditoria_camadas_modo_check check (modo in ('DIFF','COMPLETO'));
+
+-- Chaves de p_para cujo valor difere de p_de (com o valor de p_para)
+create or replace function public.fn_jsonb_diff(p_de jsonb, p_para jsonb)
+returns jsonb
+language sql
+immutable
+as $$
+  select coalesce(jsonb_object_agg(k.chave, p_para -> k.chave), '{}'::jsonb)
+  from jsonb_object_keys(coalesce(p_de, '{}'::jsonb) || coalesce(p_para, '{}'::jsonb)) as k(chave)
+  where (p_de -> k.chave) is distinct from (p_para -> k.chave);
+$$;
+
+-- =========================================================
+-- 2) fn_audit_trigger: camada + modo
+-- =========================================================
+create or replace function public.fn_audit_trigger()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_usuario text;
+  v_entidade text;
+  v_id_text text;
+  v_camada text;
+  v_modo text;
+  v_antes jsonb;
+  v_depois jsonb;
+begin
+  v_entidade := tg_table_name;
+
+  select c.camada, c.modo into v_camada, v_modo
+  from public.auditoria_camadas c
+  where c.entidade = v_entidade;
+
+  if v_camada = 'APP' then
+    return coalesce(new, old);
+  end if;
+
+  if tg_op = 'UPDATE' then
+    v_antes := to_jsonb(old);
+    v_depois := to_jsonb(new);
+
+    -- UPDATE sem efeito (ex.: recálculo em cascata que não mudou nada)
+    if v_antes = v_depois then
+      return new;
+    end if;
+
+    if coalesce(v_modo, 'DIFF') = 'DIFF' then
+      v_id_text := coalesce((v_depois->>'id'), (v_antes->>'id'));
+      v_depois := public.fn_jsonb_diff(to_jsonb(old), to_jsonb(new));
+      v_antes := public.fn_jsonb_diff(to_jsonb(new), to_jsonb(old));
+    end if;
+  end if;
+
+  -- Nome amigável, se existir
+  select u.usuario into v_usuario
+  from public.usuarios_app u
+  where u.auth_user_id = auth.uid()
+  limit 1;
+
+  if v_usuario is null then
+    v_usuario := coalesce(auth.uid()::text, 'SYSTEM');
+  end if;
+
+  if tg_op = 'INSERT' then
+    v_id_text := (to_jsonb(new)->>'id');
+    insert into public.auditoria(usuario, entidade, entidade_id, acao, antes_json, depois_json)
+    values (v_usuario, v_entidade, v_id_text, 'INSERT', null, to_jsonb(new));
+    return new;
+
+  elsif tg_op = 'UPDATE' then
+    v_id_text := coalesce(v_id_text, (to_jsonb(new)->>'id'), (to_jsonb(old)->>'id'));
+    insert into public.auditoria(usuario, entidade, entidade_id, acao, antes_json, depois_json)
+    values (v_usuario, v_entidade, v_id_text, 'UPDATE', v_antes, v_depois);
+    return new;
+
+  elsif tg_op = 'DELETE' then
+    v_id_text := (to_jsonb(old)->>'id');
+    insert into public.auditoria(usuario, entidade, entidade_id, acao, antes_json, depois_json)
+    values (v_usuario, v_entidade, v_id_text, 'DELETE', to_jsonb(old), null);
+    return old;
+  end if;
+
+  return null;
+end;
+$$;
+
+-- =========================================================
+-- 3) RECONSTRUÇÃO: como o registro estava em p_momento
+-- - aplica o histórico em ordem: INSERT = linha inteira,
+--   UPDATE = estado || depois (diff ou completo), DELETE = null
+-- - histórico que começa num UPDATE (registro anterior à auditoria)
+--   parte do "antes" desse UPDATE: pode vir só com parte das colunas
+-- - roda com RLS de quem chama (só ADMIN lê auditoria)
+-- =========================================================
+create or replace function public.fn_auditoria_registro_em(
+  p_entidade text,
+  p_entidade_id text,
+  p_momento timestamptz default now()
+)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+  r record;
+  v_estado jsonb;
+begin
+  for r in
+    select a.acao, a.antes_json, a.depois_json
+    from public.auditoria a
+    where a.entidade = p_entidade
+      and a.entidade_id = p_entidade_id
+      and a.criado_em <= p_momento
+    order by a.criado_em, a.id
+  loop
+    if r.acao = 'DELETE' then
+      v_estado := null;
+    elsif jsonb_typeof(r.depois_json) = 'object' then
+      if r.acao = 'INSERT' then
+        v_estado := r.depois_json;
+      else
+        v_estado := coalesce(
+          v_estado,
+          case when jsonb_typeof(r.antes_json) = 'object' then r.antes_json end,
+          '{}'::jsonb
+        ) || r.depois_json;
+      end if;
+    end if;
+  end loop;
+
+  return v_estado;
+end;
+$$;
+
+grant execute on function public.fn_jsonb_diff(jsonb, jsonb) to authenticated;
+grant execute on function public.fn_auditoria_registro_em(text, text, timestamptz) to authenticated;
+
+commit;
@@ -0,0 +1,521 @@
+begin;
+
+-- =========================================================
+-- 1) RESUMO FINANCEIRO POR OBRA (tabela mantida por triggers)
+-- Mesmas regras de vw_financeiro_por_obra / vw_desvio_orcamento:
+-- - valor_orcado = valor_total_final do orçamento APROVADO (maior versão)
+-- - recebido = recebimentos PAGO das fases dos orçamentos da obra
+-- - pago = itens de pagamentos PAGO dos apontamentos da obra
+-- - lucro = recebido - pago; desvio = pago - valor_orcado
+-- Leitura O(obras), sem reagregar as tabelas de origem.
+-- =========================================================
+create table if not exists public.obra_financeiro_resumo (
+  obra_id bigint primary key references public.obras(id) on update cascade on delete cascade,
+  valor_orcado numeric(12,2),
+  recebido numeric(12,2) not null default 0,
+  pago numeric(12,2) not null default 0,
+  lucro numeric(12,2) generated always as (recebido - pago) stored,
+  desvio numeric(12,2) generated always as (pago - valor_orcado) stored,
+  atualizado_em timestamptz not null default now()
+);
+
+alter table public.obra_financeiro_resumo enable row level security;
+
+drop policy if exists obra_financeiro_resumo_admin_select on public.obra_financeiro_resumo;
+create policy obra_financeiro_resumo_admin_select
+on public.obra_financeiro_resumo for select
+using (public.fn_is_admin());
+
+-- Escrita só pelas funções abaixo (security definer)
+
+-- =========================================================
+-- 2) RECÁLCULO das obras informadas
+-- - recalcula da origem só as obras afetadas (índices por obra)
+-- - só grava linhas cujo valor muda
+-- =========================================================
+create or replace function public.fn_obra_financeiro_recalcular(p_obra_ids bigint[])
+returns void
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+begin
+  insert into public.obra_financeiro_resumo as s (obra_id, valor_orcado, recebido, pago, atualizado_em)
+  select
+    o.id,
+    (
+      select oc.valor_total_final
+      from public.orcamentos oc
+      where oc.obra_id = o.id
+        and oc.status = 'APROVADO'
+      order by oc.versao desc
+      limit 1
+    ),
+    coalesce((
+      select sum(r.valor)
+      from public.orcamentos oc
+      join public.obra_fases f on f.orcamento_id = oc.id
+      join public.recebimentos r on r.obra_fase_id = f.id
+      where oc.obra_id = o.id
+        and r.status = 'PAGO'
+    ), 0),
+    coalesce((
+      select sum(pi.valor)
+      from public.apontamentos a
+      join public.pagamento_itens pi on pi.apontamento_id = a.id
+      join public.pagamentos p on p.id = pi.pagamento_id
+      where a.obra_id = o.id
+        and p.status = 'PAGO'
+    ), 0),
+    now()
+  from public.obras o
+  where o.id = any(p_obra_ids)
+  on conflict (obra_id) do update
+     set valor_orcado = excluded.valor_orcado,
+         recebido = excluded.recebido,
+         pago = excluded.pago,
+         atualizado_em = excluded.atualizado_em
+   where (s.valor_orcado, s.recebido, s.pago)
+         is distinct from (excluded.valor_orcado, excluded.recebido, excluded.pago);
+end;
+$$;
+
+-- =========================================================
+-- 3) TRIGGERS por statement (transition tables fin_novos/fin_antigos)
+-- - cada tabela junta as obras afetadas e chama o recálculo uma vez
+-- - no UPDATE, só linhas em que as colunas usadas no resumo mudaram
+-- - exclusões em cascata (fase/orçamento/apontamento) são cobertas
+--   pelo trigger da tabela-pai, que já conhece a obra
+-- =========================================================
+
+-- 3.1 Recebimentos (obra via fase -> orçamento)
+create or replace function public.trg_fin_recebimentos_stmt()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_obra_ids bigint[];
+begin
+  if tg_op = 'INSERT' then
+    select array_agg(distinct oc.obra_id) into v_obra_ids
+    from fin_novos n
+    join public.obra_fases f on f.id = n.obra_fase_id
+    join public.orcamentos oc on oc.id = f.orcamento_id;
+
+  elsif tg_op = 'DELETE' then
+    select array_agg(distinct oc.obra_id) into v_obra_ids
+    from fin_antigos o
+    join public.obra_fases f on f.id = o.obra_fase_id
+    join public.orcamentos oc on oc.id = f.orcamento_id;
+
+  else
+    select array_agg(distinct oc.obra_id) into v_obra_ids
+    from (
+      select n.obra_fase_id
+      from fin_novos n
+      join fin_antigos o on o.id = n.id
+      where (o.status, o.valor, o.obra_fase_id) is distinct from (n.status, n.valor, n.obra_fase_id)
+      union
+      select o.obra_fase_id
+      from fin_novos n
+      join fin_antigos o on o.id = n.id
+      where o.obra_fase_id is distinct from n.obra_fase_id
+    ) k
+    join public.obra_fases f on f.id = k.obra_fase_id
+    join public.orcamentos oc on oc.id = f.orcamento_id;
+  end if;
+
+  if v_obra_ids is not null then
+    perform public.fn_obra_financeiro_recalcular(v_obra_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+-- 3.2 Pagamentos (só a troca de status muda o resumo; itens têm trigger próprio)
+create or replace function public.trg_fin_pagamentos_stmt()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_obra_ids bigint[];
+begin
+  select array_agg(distinct a.obra_id) into v_obra_ids
+  from fin_novos n
+  join fin_antigos o on o.id = n.id
+  join public.pagamento_itens pi on pi.pagamento_id = n.id
+  join public.apontamentos a on a.id = pi.apontamento_id
+  where o.status is distinct from n.status
+    and a.obra_id is not null;
+
+  if v_obra_ids is not null then
+    perform public.fn_obra_financeiro_recalcular(v_obra_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+-- 3.3 Itens de pagamento (obra via apontamento)
+create or replace function public.trg_fin_pagamento_itens_stmt()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_obra_ids bigint[];
+begin
+  if tg_op = 'INSERT' then
+    select array_agg(distinct a.obra_id) into v_obra_ids
+    from fin_novos n
+    join public.apontamentos a on a.id = n.apontamento_id
+    where a.obra_id is not null;
+
+  elsif tg_op = 'DELETE' then
+    select array_agg(distinct a.obra_id) into v_obra_ids
+    from fin_antigos o
+    join public.apontamentos a on a.id = o.apontamento_id
+    where a.obra_id is not null;
+
+  else
+    select array_agg(distinct a.obra_id) into v_obra_ids
+    from (
+      select n.apontamento_id, o.apontamento_id as apontamento_id_antigo
+      from fin_novos n
+      join fin_antigos o on o.id = n.id
+      where (o.valor, o.apontamento_id, o.pagamento_id)
+            is distinct from (n.valor, n.apontamento_id, n.pagamento_id)
+    ) k
+    join public.apontamentos a on a.id in (k.apontamento_id, k.apontamento_id_antigo)
+    where a.obra_id is not null;
+  end if;
+
+  if v_obra_ids is not null then
+    perform public.fn_obra_financeiro_recalcular(v_obra_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+-- 3.4 Orçamentos (valor_orcado; exclusão leva fases/recebimentos junto)
+create or replace function public.trg_fin_orcamentos_stmt()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_obra_ids bigint[];
+begin
+  if tg_op = 'INSERT' then
+    select array_agg(distinct n.obra_id) into v_obra_ids
+    from fin_novos n
+    where n.status = 'APROVADO';
+
+  elsif tg_op = 'DELETE' then
+    select array_agg(distinct o.obra_id) into v_obra_ids
+    from fin_antigos o;
+
+  else
+    select array_agg(distinct k.obra_id) into v_obra_ids
+    from (
+      select n.obra_id
+      from fin_novos n
+      join fin_antigos o on o.id = n.id
+      where (o.status, o.valor_total_final, o.versao, o.obra_id)
+            is distinct from (n.status, n.valor_total_final, n.versao, n.obra_id)
+      union
+      select o.obra_id
+      from fin_novos n
+      join fin_antigos o on o.id = n.id
+      where o.obra_id is distinct from n.obra_id
+    ) k;
+  end if;
+
+  if v_obra_ids is not null then
+    perform public.fn_obra_financeiro_recalcular(v_obra_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+-- 3.5 Fases (exclusão leva o recebimento junto; troca de orçamento move o recebimento)
+create or replace function public.trg_fin_obra_fases_stmt()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_obra_ids bigint[];
+begin
+  if tg_op = 'DELETE' then
+    select array_agg(distinct k.obra_id) into v_obra_ids
+    from (
+      select o.obra_id from fin_antigos o
+      union
+      select oc.obra_id
+      from fin_antigos o
+      join public.orcamentos oc on oc.id = o.orcamento_id
+    ) k
+    where k.obra_id is not null;
+
+  else
+    select array_agg(distinct k.obra_id) into v_obra_ids
+    from (
+      select oc.obra_id
+      from fin_novos n
+      join fin_antigos o on o.id = n.id
+      join public.orcamentos oc on oc.id in (n.orcamento_id, o.orcamento_id)
+      where o.orcamento_id is distinct from n.orcamento_id
+    ) k;
+  end if;
+
+  if v_obra_ids is not null then
+    perform public.fn_obra_financeiro_recalcular(v_obra_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+-- 3.6 Apontamentos (troca de obra move os itens pagos; exclusão desvincula itens)
+create or replace function public.trg_fin_apontamentos_stmt()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_obra_ids bigint[];
+begin
+  if tg_op = 'DELETE' then
+    select array_agg(distinct o.obra_id) into v_obra_ids
+    from fin_antigos o
+    where o.obra_id is not null;
+
+  else
+    select array_agg(distinct k.obra_id) into v_obra_ids
+    from (
+      select n.obra_id
+      from fin_novos n
+      join fin_antigos o on o.id = n.id
+      where o.obra_id is distinct from n.obra_id
+      union
+      select o.obra_id
+      from fin_novos n
+      join fin_antigos o on o.id = n.id
+      where o.obra_id is distinct from n.obra_id
+    ) k
+    where k.obra_id is not null;
+  end if;
+
+  if v_obra_ids is not null then
+    perform public.fn_obra_financeiro_recalcular(v_obra_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+-- 3.7 Obras (linha zerada para obra nova; exclusão remove por FK)
+create or replace function public.trg_fin_obras_stmt()
+returns trigger
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_obra_ids bigint[];
+begin
+  select array_agg(n.id) into v_obra_ids
+  from fin_novos n;
+
+  if v_obra_ids is not null then
+    perform public.fn_obra_financeiro_recalcular(v_obra_ids);
+  end if;
+
+  return null;
+end;
+$$;
+
+-- Um trigger por evento (transition tables não aceitam múltiplos eventos)
+drop trigger if exists trg_fin_recebimentos_ins on public.recebimentos;
+create trigger trg_fin_recebimentos_ins
+after insert on public.recebimentos
+referencing new table as fin_novos
+for each statement execute function public.trg_fin_recebimentos_stmt();
+
+drop trigger if exists trg_fin_recebimentos_upd on public.recebimentos;
+create trigger trg_fin_recebimentos_upd
+after update on public.recebimentos
+referencing old table as fin_antigos new table as fin_novos
+for each statement execute function public.trg_fin_recebimentos_stmt();
+
+drop trigger if exists trg_fin_recebimentos_del on public.recebimentos;
+create trigger trg_fin_recebimentos_del
+after delete on public.recebimentos
+referencing old table as fin_antigos
+for each statement execute function public.trg_fin_recebimentos_stmt();
+
+drop trigger if exists trg_fin_pagamentos_upd on public.pagamentos;
+create trigger trg_fin_pagamentos_upd
+after update on public.pagamentos
+referencing old table as fin_antigos new table as fin_novos
+for each statement execute function public.trg_fin_pagamentos_stmt();
+
+drop trigger if exists trg_fin_pagamento_itens_ins on public.pagamento_itens;
+create trigger trg_fin_pagamento_itens_ins
+after insert on public.pagamento_itens
+referencing new table as fin_novos
+for each statement execute function public.trg_fin_pagamento_itens_stmt();
+
+drop trigger if exists trg_fin_pagamento_itens_upd on public.pagamento_itens;
+create trigger trg_fin_pagamento_itens_upd
+after update on public.pagamento_itens
+referencing old table as fin_antigos new table as fin_novos
+for each statement execute function public.trg_fin_pagamento_itens_stmt();
+
+drop trigger if exists trg_fin_pagamento_itens_del on public.pagamento_itens;
+create trigger trg_fin_pagamento_itens_del
+after delete on public.pagamento_itens
+referencing old table as fin_antigos
+for each statement execute function public.trg_fin_pagamento_itens_stmt();
+
+drop trigger if exists trg_fin_orcamentos_ins on public.orcamentos;
+create trigger trg_fin_orcamentos_ins
+after insert on public.orcamentos
+referencing new table as fin_novos
+for each statement execute function public.trg_fin_orcamentos_stmt();
+
+drop trigger if exists trg_fin_orcamentos_upd on public.orcamentos;
+create trigger trg_fin_orcamentos_upd
+after update on public.orcamentos
+referencing old table as fin_antigos new table as fin_novos
+for each statement execute function public.trg_fin_orcamentos_stmt();
+
+drop trigger if exists trg_fin_orcamentos_del on public.orcamentos;
+create trigger trg_fin_orcamentos_del
+after delete on public.orcamentos
+referencing old table as fin_antigos
+for each statement execute function public.trg_fin_orcamentos_stmt();
+
+drop trigger if exists trg_fin_obra_fases_upd on public.obra_fases;
+create trigger trg_fin_obra_fases_upd
+after update on public.obra_fases
+referencing old table as fin_antigos new table as fin_novos
+for each statement execute function public.trg_fin_obra_fases_stmt();
+
+drop trigger if exists trg_fin_obra_fases_del on public.obra_fases;
+create trigger trg_fin_obra_fases_del
+after delete on public.obra_fases
+referencing old table as fin_antigos
+for each statement execute function public.trg_fin_obra_fases_stmt();
+
+drop trigger if exists trg_fin_apontamentos_upd on public.apontamentos;
+create trigger trg_fin_apontamentos_upd
+after update on public.apontamentos
+referencing old table as fin_antigos new table as fin_novos
+for each statement execute function public.trg_fin_apontamentos_stmt();
+
+drop trigger if exists trg_fin_apontamentos_del on public.apontamentos;
+create trigger trg_fin_apontamentos_del
+after delete on public.apontamentos
+referencing old table as fin_antigos
+for each statement execute function public.trg_fin_apontamentos_stmt();
+
+drop trigger if exists trg_fin_obras_ins on public.obras;
+create trigger trg_fin_obras_ins
+after insert on public.obras
+referencing new table as fin_novos
+for each statement execute function public.trg_fin_obras_stmt();
+
+-- =========================================================
+-- 4) RECONSTRUÇÃO completa e VERIFICAÇÃO de consistência
+-- - ADMIN, service_role ou sessão sem JWT (SQL Editor/pg_cron)
+-- - verificação compara com as views de origem (17.2 e 17.4 do sql/001)
+-- =========================================================
+create or replace function public.fn_obra_financeiro_reconstruir()
+returns int
+language plpgsql
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_obra_ids bigint[];
+begin
+  if not (auth.role() is null or auth.role() = 'service_role' or public.fn_is_admin()) then
+    raise exception 'Sem permissão para reconstruir o resumo financeiro.';
+  end if;
+
+  select array_agg(id) into v_obra_ids from public.obras;
+
+  if v_obra_ids is not null then
+    perform public.fn_obra_financeiro_recalcular(v_obra_ids);
+  end if;
+
+  return coalesce(array_length(v_obra_ids, 1), 0);
+end;
+$$;
+
+create or replace function public.fn_obra_financeiro_verificar()
+returns table (obra_id bigint, titulo text, resumo jsonb, esperado jsonb)
+language plpgsql
+stable
+security definer
+set search_path = public, pg_temp
+as $$
+begin
+  if not (auth.role() is null or auth.role() = 'service_role' or public.fn_is_admin()) then
+    raise exception 'Sem permissão para verificar o resumo financeiro.';
+  end if;
+
+  return query
+  select
+    o.id,
+    o.titulo::text,
+    case when s.obra_id is not null then jsonb_build_object(
+      'valor_orcado', s.valor_orcado,
+      'recebido', s.recebido,
+      'pago', s.pago,
+      'lucro', s.lucro,
+      'desvio', s.desvio
+    ) end,
+    jsonb_build_object(
+      'valor_orcado', v.valor_orcado,
+      'recebido', v.recebido_pago,
+      'pago', v.pago_pago,
+      'lucro', v.saldo_real,
+      'desvio', d.desvio
+    )
+  from public.obras o
+  join public.vw_financeiro_por_obra v on v.obra_id = o.id
+  left join public.vw_desvio_orcamento d on d.obra_id = o.id
+  left join public.obra_financeiro_resumo s on s.obra_id = o.id
+  where s.obra_id is null
+     or (s.valor_orcado, s.recebido, s.pago, s.lucro, s.desvio)
+        is distinct from (v.valor_orcado, v.recebido_pago, v.pago_pago, v.saldo_real, d.desvio)
+  order by 1;
+end;
+$$;
+
+-- recalcular (security definer) só é chamada pelos triggers acima: sem
+-- isso, qualquer papel (inclusive anon via /rpc) gravaria no resumo
+revoke all on function public.fn_obra_financeiro_recalcular(bigint[]) from public, anon, authenticated;
+revoke all on function public.fn_obra_financeiro_reconstruir() from public;
+revoke all on function public.fn_obra_financeiro_verificar() from public;
+grant execute on function public.fn_obra_financeiro_reconstruir() to authenticated, service_role;
+grant execute on function public.fn_obra_financeiro_verificar() to authenticated, service_role;
+
+-- Carga inicial
+select public.fn_obra_financeiro_reconstruir();
+
+commit;
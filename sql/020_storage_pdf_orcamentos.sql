@@ -0,0 +1,39 @@
+begin;
+
+-- =========================================================
+-- 1) BUCKET dos PDFs de orçamento (privado)
+-- O app emite o PDF uma vez, envia para orcamentos/obra_<id>/... e grava o
+-- caminho em orcamentos.pdf_url; as próximas cópias vêm do Storage.
+-- =========================================================
+insert into storage.buckets (id, name, public)
+values ('orcamentos', 'orcamentos', false)
+on conflict (id) do nothing;
+
+-- =========================================================
+-- 2) POLICIES: mesmos perfis da tabela orcamentos
+-- =========================================================
+drop policy if exists orcamentos_pdf_select on storage.objects;
+create policy orcamentos_pdf_select
+on storage.objects for select
+using (bucket_id = 'orcamentos' and public.fn_user_perfil() in ('ADMIN','OPERACAO'));
+
+drop policy if exists orcamentos_pdf_insert on storage.objects;
+create policy orcamentos_pdf_insert
+on storage.objects for insert
+with check (bucket_id = 'orcamentos' and public.fn_user_perfil() in ('ADMIN','OPERACAO'));
+
+-- upsert (x-upsert) precisa de update
+drop policy if exists orcamentos_pdf_update on storage.objects;
+create policy orcamentos_pdf_update
+on storage.objects for update
+using (bucket_id = 'orcamentos' and public.fn_user_perfil() in ('ADMIN','OPERACAO'))
+with check (bucket_id = 'orcamentos' and public.fn_user_perfil() in ('ADMIN','OPERACAO'));
+
+-- delete: o app apaga o PDF antigo ao editar e o upload de quem perdeu a
+-- corrida da emissão, para os dois perfis
+drop policy if exists orcamentos_pdf_delete on storage.objects;
+create policy orcamentos_pdf_delete
+on storage.objects for delete
+using (bucket_id = 'orcamentos' and public.fn_user_perfil() in ('ADMIN','OPERACAO'));
+
+commit;
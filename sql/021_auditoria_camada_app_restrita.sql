@@ -0,0 +1,54 @@
+begin;
+
+-- =========================================================
+-- 1) CAMADA APP só para entidades sem trigger de auditoria
+-- O app audita apenas as chamadas explícitas audit_* de um ADMIN (única
+-- permissão de INSERT em auditoria). Entidades com fn_audit_trigger são
+-- escritas também fora delas: perfil OPERACAO, RPCs (ex.:
+-- fn_criar_pagamento_com_itens) e triggers de recálculo. Na camada APP
+-- essas escritas ficariam sem auditoria, então a troca é recusada.
+-- Hoje só usuarios_app (escrita só por ADMIN, pela tela de Configurações)
+-- pode ficar no APP.
+-- =========================================================
+create or replace function public.fn_entidade_tem_trigger_auditoria(p_entidade text)
+returns boolean
+language sql
+stable
+set search_path = public, pg_temp
+as $$
+  select exists (
+    select 1
+    from pg_trigger t
+    join pg_proc p on p.oid = t.tgfoid
+    where t.tgrelid = to_regclass('public.' || quote_ident(p_entidade))
+      and p.proname = 'fn_audit_trigger'
+      and not t.tgisinternal
+  )
+$$;
+
+-- Corrige o que já estiver no APP indevidamente
+update public.auditoria_camadas
+set camada = 'BANCO'
+where camada = 'APP'
+  and public.fn_entidade_tem_trigger_auditoria(entidade);
+
+create or replace function public.fn_auditoria_camadas_validar()
+returns trigger
+language plpgsql
+set search_path = public, pg_temp
+as $$
+begin
+  if new.camada = 'APP' and public.fn_entidade_tem_trigger_auditoria(new.entidade) then
+    raise exception 'A entidade % tem escritas fora do app (OPERACAO, RPCs, triggers) e só pode ser auditada pela camada BANCO', new.entidade
+      using errcode = 'check_violation';
+  end if;
+  return new;
+end;
+$$;
+
+drop trigger if exists trg_auditoria_camadas_validar on public.auditoria_camadas;
+create trigger trg_auditoria_camadas_validar
+before insert or update on public.auditoria_camadas
+for each row execute function public.fn_auditoria_camadas_validar();
+
+commit;
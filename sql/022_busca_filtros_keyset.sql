@@ -0,0 +1,112 @@
+begin;
+
+-- =========================================================
+-- 1) fn_buscar com filtros e keyset
+-- - ativo/status/tipo são aplicados ANTES do limit: antes o app filtrava
+--   os 100 mais relevantes da tabela inteira e perdia linhas ativas
+--   quando inativas (ou de outro status) ocupavam o topo
+-- - paginação por (score desc, id): p_cursor_score/p_cursor_id são os do
+--   último item da página anterior
+-- - empate de score agora desempata por id (estável para o cursor)
+-- =========================================================
+drop function if exists public.fn_buscar(text, text, int);
+
+create or replace function public.fn_buscar(
+  p_entidade text,
+  p_termo text,
+  p_limite int default 100,
+  p_ativo boolean default null,
+  p_status text default null,
+  p_tipo text default null,
+  p_cursor_score real default null,
+  p_cursor_id bigint default null
+)
+returns table (id bigint, score real)
+language plpgsql
+stable
+set search_path = public, extensions
+as $$
+declare
+  v_termo text := public.fn_busca_normalizar(trim(p_termo));
+  v_like text;
+  v_tel_like text;
+begin
+  if v_termo = '' then
+    return;
+  end if;
+
+  v_like := '%' || replace(replace(replace(v_termo, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+  v_tel_like := '%' || replace(replace(replace(trim(p_termo), '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+  if p_entidade = 'clientes' then
+    return query
+    select r.id, r.score
+    from (
+      select c.id,
+             ((public.fn_busca_normalizar(c.nome) like v_like)::int
+              + word_similarity(v_termo, public.fn_busca_normalizar(c.nome)))::real as score
+      from public.clientes c
+      where (public.fn_busca_normalizar(c.nome) like v_like
+             or v_termo <% public.fn_busca_normalizar(c.nome)
+             or c.telefone like v_tel_like)
+        and (p_ativo is null or c.ativo = p_ativo)
+    ) r
+    where p_cursor_id is null
+       or r.score < p_cursor_score
+       or (r.score = p_cursor_score and r.id > p_cursor_id)
+    order by r.score desc, r.id
+    limit p_limite;
+
+  elsif p_entidade = 'pessoas' then
+    return query
+    select r.id, r.score
+    from (
+      select p.id,
+             ((public.fn_busca_normalizar(p.nome) like v_like)::int
+              + word_similarity(v_termo, public.fn_busca_normalizar(p.nome)))::real as score
+      from public.pessoas p
+      where (public.fn_busca_normalizar(p.nome) like v_like
+             or v_termo <% public.fn_busca_normalizar(p.nome))
+        and (p_ativo is null or p.ativo = p_ativo)
+        and (p_tipo is null or p.tipo = p_tipo)
+    ) r
+    where p_cursor_id is null
+       or r.score < p_cursor_score
+       or (r.score = p_cursor_score and r.id > p_cursor_id)
+    order by r.score desc, r.id
+    limit p_limite;
+
+  elsif p_entidade = 'obras' then
+    return query
+    select r.id, r.score
+    from (
+      select o.id,
+             ((public.fn_busca_normalizar(o.titulo) like v_like
+               or public.fn_busca_normalizar(o.endereco_obra) like v_like)::int
+              + greatest(
+                  word_similarity(v_termo, public.fn_busca_normalizar(o.titulo)),
+                  word_similarity(v_termo, public.fn_busca_normalizar(o.endereco_obra))
+                ))::real as score
+      from public.obras o
+      where (public.fn_busca_normalizar(o.titulo) like v_like
+             or public.fn_busca_normalizar(o.endereco_obra) like v_like
+             or v_termo <% public.fn_busca_normalizar(o.titulo)
+             or v_termo <% public.fn_busca_normalizar(o.endereco_obra))
+        and (p_ativo is null or o.ativo = p_ativo)
+        and (p_status is null or o.status = p_status)
+    ) r
+    where p_cursor_id is null
+       or r.score < p_cursor_score
+       or (r.score = p_cursor_score and r.id > p_cursor_id)
+    order by r.score desc, r.id
+    limit p_limite;
+
+  else
+    raise exception 'Entidade de busca inválida: %', p_entidade;
+  end if;
+end;
+$$;
+
+grant execute on function public.fn_buscar(text, text, int, boolean, text, text, real, bigint) to authenticated;
+
+commit;
@@ -0,0 +1,104 @@
+-- ============================================
+-- BENCHMARK (NÃO É MIGRAÇÃO)
+-- Compara o recálculo de fase/orçamento por linha (trigger antigo)
+-- com o recálculo por statement (sql/010_ofs_recalc_statement.sql)
+-- em um INSERT de 500 itens distribuídos em 12 fases.
+--
+-- Rode como dono das tabelas (ex.: SQL Editor do Supabase) depois da
+-- migração 010. Tudo é desfeito no ROLLBACK final.
+-- ============================================
+
+begin;
+
+do $$
+declare
+  v_cliente_id bigint;
+  v_obra_id bigint;
+  v_orc_id bigint;
+  v_fase_ids bigint[];
+  v_inicio timestamptz;
+  v_tempo_linha interval;
+  v_tempo_statement interval;
+  v_total_linha numeric(12,2);
+  v_total_statement numeric(12,2);
+  v_total_esperado numeric(12,2);
+begin
+  -- Dados de teste
+  insert into public.clientes (nome) values ('BENCH cliente')
+  returning id into v_cliente_id;
+
+  insert into public.obras (cliente_id, titulo) values (v_cliente_id, 'BENCH obra')
+  returning id into v_obra_id;
+
+  insert into public.orcamentos (obra_id, versao) values (v_obra_id, 1)
+  returning id into v_orc_id;
+
+  insert into public.obra_fases (obra_id, orcamento_id, nome_fase, ordem)
+  select v_obra_id, v_orc_id, 'BENCH fase ' || g, g
+  from generate_series(1, 12) g;
+
+  select array_agg(id order by ordem) into v_fase_ids
+  from public.obra_fases
+  where orcamento_id = v_orc_id;
+
+  insert into public.servicos (nome)
+  select 'BENCH serviço ' || g
+  from generate_series(1, 500) g;
+
+  create temp table _bench_itens on commit drop as
+  select
+    v_fase_ids[1 + (g % 12)] as obra_fase_id,
+    s.id as servico_id,
+    (1 + g % 7)::numeric(10,2) as quantidade,
+    (10 + g % 90)::numeric(10,2) as valor_unit
+  from generate_series(1, 500) g
+  join public.servicos s on s.nome = 'BENCH serviço ' || g;
+
+  select round(sum(round(quantidade * valor_unit, 2)), 2) into v_total_esperado
+  from _bench_itens;
+
+  -- A) Trigger antigo: FOR EACH ROW
+  alter table public.orcamento_fase_servicos disable trigger trg_ofs_recalc_stmt_ins;
+  alter table public.orcamento_fase_servicos disable trigger trg_ofs_recalc_stmt_del;
+  create trigger trg_bench_ofs_row
+  after insert or update or delete on public.orcamento_fase_servicos
+  for each row execute function public.trg_ofs_recalc_fase_orcamento();
+
+  v_inicio := clock_timestamp();
+  insert into public.orcamento_fase_servicos (obra_fase_id, servico_id, quantidade, valor_unit)
+  select obra_fase_id, servico_id, quantidade, valor_unit from _bench_itens;
+  v_tempo_linha := clock_timestamp() - v_inicio;
+
+  select valor_total into v_total_linha from public.orcamentos where id = v_orc_id;
+
+  drop trigger trg_bench_ofs_row on public.orcamento_fase_servicos;
+  delete from public.orcamento_fase_servicos where obra_fase_id = any(v_fase_ids);
+  update public.obra_fases set valor_fase = 0 where id = any(v_fase_ids);
+  update public.orcamentos set valor_total = 0, valor_total_final = 0 where id = v_orc_id;
+
+  -- B) Trigger novo: FOR EACH STATEMENT
+  alter table public.orcamento_fase_servicos enable trigger trg_ofs_recalc_stmt_ins;
+  alter table public.orcamento_fase_servicos enable trigger trg_ofs_recalc_stmt_del;
+
+  v_inicio := clock_timestamp();
+  insert into public.orcamento_fase_servicos (obra_fase_id, servico_id, quantidade, valor_unit)
+  select obra_fase_id, servico_id, quantidade, valor_unit from _bench_itens;
+  v_tempo_statement := clock_timestamp() - v_inicio;
+
+  select valor_total into v_total_statement from public.orcamentos where id = v_orc_id;
+
+  raise notice 'Itens: 500 | Fases: 12 | Total esperado: %', v_total_esperado;
+  raise notice 'FOR EACH ROW       : % (total=%)', v_tempo_linha, v_total_linha;
+  raise notice 'FOR EACH STATEMENT : % (total=%)', v_tempo_statement, v_total_statement;
+  raise notice 'Ganho: %x',
+    round((extract(epoch from v_tempo_linha) / greatest(extract(epoch from v_tempo_statement), 0.000001))::numeric, 1);
+
+  if v_total_linha is distinct from v_total_esperado
+     or v_total_statement is distinct from v_total_esperado then
+    raise exception 'Totais divergentes: linha=%, statement=%, esperado=%',
+      v_total_linha, v_total_statement, v_total_esperado;
+  end if;
+end;
+$$;
+
+rollback;
@@ -1,11 +1,388 @@
 """
 Módulo de auditoria - Registra ações no banco de dados
+
+Cada entidade é auditada por uma única camada (tabela auditoria_camadas):
+- BANCO: o trigger fn_audit_trigger grava; o app não grava nada
+- APP: o app grava em lote, numa thread de fundo (sem bloquear a tela),
+  com retry e arquivo de spill local quando o banco está fora do ar
+
+O app só grava as chamadas audit_* feitas por um ADMIN. Escritas de OPERACAO,
+RPCs e triggers de recálculo não passam por aqui, então a camada APP só vale
+para entidades sem trigger, escritas apenas pelo ADMIN na tela (hoje,
+usuarios_app); sql/021 recusa APP nas demais.
+
+No modo DIFF (padrão, sql/018) o UPDATE guarda só as chaves que mudaram e
+UPDATE sem mudança não é gravado; o modo COMPLETO guarda a linha inteira.
+
+Cada entrada leva criado_em (UTC) do momento da ação, gravado no INSERT: lotes
+atrasados por retry ou reenviados do spill não mudam a ordem do histórico.
 """
 
+import atexit
 import json
+import os
+import queue
+import threading
+import time
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timezone
 from utils.auth import get_supabase_client, is_admin
+from utils.cache import cache_leitura
+
+# Entidades com trigger de auditoria no banco (sql/001_core.sql)
+ENTIDADES_COM_TRIGGER = frozenset({
+    'clientes', 'pessoas', 'obras', 'orcamentos', 'obra_fases', 'servicos',
+    'orcamento_fase_servicos', 'alocacoes', 'apontamentos',
+    'recebimentos', 'pagamentos', 'pagamento_itens',
+})
+
+# Configuração do escritor (variáveis de ambiente / .env)
+AUDITORIA_LOTE_MAXIMO = int(os.getenv('AUDITORIA_LOTE_MAXIMO', '50'))
+AUDITORIA_INTERVALO_FLUSH = float(os.getenv('AUDITORIA_INTERVALO_FLUSH', '2.0'))  # segundos
+AUDITORIA_FILA_MAXIMA = int(os.getenv('AUDITORIA_FILA_MAXIMA', '5000'))
+AUDITORIA_TENTATIVAS = int(os.getenv('AUDITORIA_TENTATIVAS', '3'))
+AUDITORIA_BACKOFF_INICIAL = float(os.getenv('AUDITORIA_BACKOFF_INICIAL', '0.5'))  # segundos
+AUDITORIA_SPILL_PATH = os.getenv(
+    'AUDITORIA_SPILL_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.auditoria_spill.jsonl')
+)
+AUDITORIA_REJEITADAS_PATH = os.getenv(
+    'AUDITORIA_REJEITADAS_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.auditoria_rejeitadas.jsonl')
+)
+AUDITORIA_INTERVALO_REENVIO = float(os.getenv('AUDITORIA_INTERVALO_REENVIO', '30'))  # segundos
+
+# Classes de SQLSTATE que o PostgREST responde com 5xx (falha transitória);
+# as demais (22 dados, 23 integridade, 42 permissão/RLS...) viram 4xx
+_SQLSTATE_TRANSITORIOS = frozenset({
+    '08', '09', '25', '2D', '38', '39', '3B', '40', '53', '55', '57', '58', 'F0', 'HV', 'P0', 'XX',
+})
+# PGRST000-003: PostgREST sem conexão com o banco (503/504)
+_PGRST_TRANSITORIOS = frozenset({'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003'})
+
+
+def _erro_definitivo(erro: Exception) -> bool:
+    """
+    True se o banco recusou a entrada (4xx: RLS, tamanho, check...)
+    
+    Erro de transporte (sem código) ou 5xx é transitório: vale retry/spill.
+    """
+    codigo = getattr(erro, 'code', None)
+    if codigo is None:
+        return False
+    codigo = str(codigo)
+    if codigo.isdigit() and len(codigo) == 3:
+        # Resposta sem JSON: o código é o status HTTP
+        return 400 <= int(codigo) < 500 and int(codigo) not in (408, 429)
+    if codigo.startswith('PGRST'):
+        return codigo not in _PGRST_TRANSITORIOS
+    if codigo in ('25006', 'P0001'):
+        return True
+    return codigo[:2] not in _SQLSTATE_TRANSITORIOS
+
+
+class _EscritorAuditoria:
+    """
+    Grava entradas de auditoria em lote, numa thread de fundo
+    
+    - fila limitada: se encher, a entrada vai direto para o arquivo de spill
+    - cada lote é um INSERT com array, com retry e backoff exponencial só
+      para falhas transitórias (transporte, 5xx)
+    - backend fora do ar: o lote vai para o arquivo de spill (JSONL) e é
+      reenviado depois de um lote gravado com sucesso (no máximo uma vez a
+      cada intervalo_reenvio segundos)
+    - entrada recusada pelo banco (4xx) não é repetida: vai para o arquivo
+      de rejeitadas, com o erro, e o resto do lote é gravado
+    - no encerramento do processo: esvazia a fila (ou grava no spill)
+    """
+
+    def __init__(self, lote_maximo: int, intervalo: float, fila_maxima: int,
+                 tentativas: int, backoff_inicial: float, spill_path: str,
+                 rejeitadas_path: str, intervalo_reenvio: float):
+        self._fila = queue.Queue(maxsize=fila_maxima)
+        self._lote_maximo = lote_maximo
+        self._intervalo = intervalo
+        self._tentativas = max(1, tentativas)
+        self._backoff_inicial = backoff_inicial
+        self._spill_path = spill_path
+        self._rejeitadas_path = rejeitadas_path
+        self._intervalo_reenvio = intervalo_reenvio
+        self._ultimo_reenvio = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._lock_spill = threading.Lock()
+        self._stats = {
+            'enfileiradas': 0,
+            'gravadas': 0,
+            'lotes': 0,
+            'retentativas': 0,
+            'spill': 0,
+            'reenviadas': 0,
+            'rejeitadas': 0,
+        }
+
+    def enfileirar(self, cliente, dados: dict):
+        """Enfileira uma entrada sem bloquear (o cliente carrega o token do usuário)"""
+        self._iniciar()
+        try:
+            self._fila.put_nowait((cliente, dados))
+            self._contar('enfileiradas')
+        except queue.Full:
+            self._spill([dados])
+
+    def flush(self, timeout: float = 5.0):
+        """Aguarda a fila esvaziar (até timeout segundos)"""
+        prazo = time.monotonic() + timeout
+        while self._fila.unfinished_tasks and time.monotonic() < prazo:
+            time.sleep(0.05)
+
+    def encerrar(self, timeout: float = 5.0):
+        """Esvazia a fila no encerramento; o que sobrar vai para o spill"""
+        self.flush(timeout)
+        restantes = []
+        while True:
+            try:
+                _, dados = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            restantes.append(dados)
+            self._fila.task_done()
+        if restantes:
+            self._spill(restantes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pendentes'] = self._fila.qsize()
+        stats['spill_arquivo'] = self._spill_path if os.path.exists(self._spill_path) else None
+        stats['rejeitadas_arquivo'] = (
+            self._rejeitadas_path if os.path.exists(self._rejeitadas_path) else None
+        )
+        return stats
+
+    def _contar(self, campo: str, n: int = 1):
+        with self._lock:
+            self._stats[campo] += n
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._executar,
+                    name='auditoria-escritor',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _executar(self):
+        while True:
+            lote = self._coletar_lote()
+            if lote:
+                try:
+                    self._gravar(lote)
+                finally:
+                    for _ in lote:
+                        self._fila.task_done()
+
+    def _coletar_lote(self) -> list:
+        lote = []
+        try:
+            lote.append(self._fila.get(timeout=self._intervalo))
+        except queue.Empty:
+            return lote
+
+        prazo = time.monotonic() + self._intervalo
+        while len(lote) < self._lote_maximo:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar(self, lote: list):
+        # Um INSERT por cliente (cada sessão grava com o próprio token/RLS)
+        por_cliente = {}
+        for cliente, dados in lote:
+            por_cliente.setdefault(id(cliente), (cliente, []))[1].append(dados)
+
+        for cliente, linhas in por_cliente.values():
+            pendentes = self._inserir(cliente, linhas)
+            if pendentes:
+                self._spill(pendentes)
+            else:
+                self._reenviar_spill(cliente)
+
+    def _inserir(self, cliente, linhas: list) -> list:
+        """
+        INSERT com array; tenta de novo com backoff exponencial
+        
+        Returns:
+            entradas não gravadas por falha transitória (vão para o spill)
+        """
+        espera = self._backoff_inicial
+        for tentativa in range(self._tentativas):
+            try:
+                cliente.table('auditoria').insert(linhas).execute()
+                self._contar('gravadas', len(linhas))
+                self._contar('lotes')
+                return []
+            except Exception as e:
+                if _erro_definitivo(e):
+                    return self._separar_rejeitadas(cliente, linhas, e)
+                # Não interrompe a operação principal se a auditoria falhar
+                print(f"Erro ao registrar auditoria ({len(linhas)} entradas, "
+                      f"tentativa {tentativa + 1}/{self._tentativas}): {e}")
+                if tentativa + 1 < self._tentativas:
+                    self._contar('retentativas')
+                    time.sleep(espera)
+                    espera *= 2
+        return linhas
+
+    def _separar_rejeitadas(self, cliente, linhas: list, erro: Exception) -> list:
+        """Lote recusado (4xx): grava uma a uma e separa só as recusadas"""
+        if len(linhas) == 1:
+            self._rejeitar(linhas[0], erro)
+            return []
+        pendentes = []
+        for dados in linhas:
+            try:
+                cliente.table('auditoria').insert([dados]).execute()
+                self._contar('gravadas')
+            except Exception as e:
+                if _erro_definitivo(e):
+                    self._rejeitar(dados, e)
+                else:
+                    pendentes.append(dados)
+        return pendentes
+
+    def _rejeitar(self, dados: dict, erro: Exception):
+        """Guarda a entrada recusada pelo banco, com o erro, fora do spill"""
+        print(f"Auditoria recusada pelo banco ({dados.get('entidade')}/{dados.get('acao')}): {erro}")
+        try:
+            with self._lock_spill:
+                with open(self._rejeitadas_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'dados': dados, 'erro': str(erro)}, default=str) + '\n')
+        except Exception as e:
+            print(f"Erro ao gravar auditoria rejeitada (entrada perdida): {e}")
+        self._contar('rejeitadas')
+
+    def _spill(self, linhas: list):
+        """Guarda entradas não gravadas em arquivo local (JSONL)"""
+        try:
+            with self._lock_spill:
+                with open(self._spill_path, 'a', encoding='utf-8') as f:
+                    for dados in linhas:
+                        f.write(json.dumps(dados, default=str) + '\n')
+            self._contar('spill', len(linhas))
+        except Exception as e:
+            print(f"Erro ao gravar spill de auditoria ({len(linhas)} entradas perdidas): {e}")
+
+    def _ler_spill(self) -> list:
+        """Lê e remove o arquivo de spill (as linhas voltam se o reenvio falhar)"""
+        with self._lock_spill:
+            if not os.path.exists(self._spill_path):
+                return []
+            try:
+                with open(self._spill_path, encoding='utf-8') as f:
+                    linhas = [json.loads(l) for l in f if l.strip()]
+                os.remove(self._spill_path)
+                return linhas
+            except Exception as e:
+                print(f"Erro ao ler spill de auditoria: {e}")
+                return []
+
+    def _reenviar_spill(self, cliente):
+        """Backend voltou: reenvia o spill com o cliente que acabou de gravar"""
+        if not os.path.exists(self._spill_path):
+            return
+        agora = time.monotonic()
+        if self._ultimo_reenvio is not None and agora - self._ultimo_reenvio < self._intervalo_reenvio:
+            return
+        self._ultimo_reenvio = agora
+        linhas = self._ler_spill()
+        for i in range(0, len(linhas), self._lote_maximo):
+            parte = linhas[i:i + self._lote_maximo]
+            pendentes = self._inserir(cliente, parte)
+            if pendentes:
+                self._spill(pendentes + linhas[i + self._lote_maximo:])
+                return
+            self._contar('reenviadas', len(parte))
+
+
+_escritor = _EscritorAuditoria(
+    AUDITORIA_LOTE_MAXIMO,
+    AUDITORIA_INTERVALO_FLUSH,
+    AUDITORIA_FILA_MAXIMA,
+    AUDITORIA_TENTATIVAS,
+    AUDITORIA_BACKOFF_INICIAL,
+    AUDITORIA_SPILL_PATH,
+    AUDITORIA_REJEITADAS_PATH,
+    AUDITORIA_INTERVALO_REENVIO,
+)
+atexit.register(_escritor.encerrar)
+
+
+@cache_leitura('auditoria_camadas')
+def get_auditoria_camadas() -> dict:
+    """Retorna {entidade: {'camada': 'BANCO' | 'APP', 'modo': 'DIFF' | 'COMPLETO'}}"""
+    try:
+        supabase = get_supabase_client()
+        response = supabase.table('auditoria_camadas').select('entidade, camada, modo').execute()
+        return {
+            r['entidade']: {'camada': r['camada'], 'modo': r.get('modo') or 'DIFF'}
+            for r in response.data or []
+        }
+    except Exception as e:
+        print(f"Erro ao buscar camadas de auditoria: {e}")
+        return {}
+
+
+def camada_auditoria(entidade: str) -> str:
+    """Camada responsável por auditar a entidade ('BANCO' ou 'APP')"""
+    # Com trigger, sempre BANCO (sql/021): o app não vê todas as escritas
+    if entidade in ENTIDADES_COM_TRIGGER:
+        return 'BANCO'
+    config = get_auditoria_camadas().get(entidade)
+    return config['camada'] if config else 'APP'
+
+
+def modo_auditoria(entidade: str) -> str:
+    """Modo de gravação do UPDATE ('DIFF' ou 'COMPLETO')"""
+    config = get_auditoria_camadas().get(entidade)
+    return config['modo'] if config else 'DIFF'
+
+
+def _para_json(valor):
+    """Converte para tipos JSON (datas/Decimal viram texto), para gravar em jsonb como objeto"""
+    if valor is None:
+        return None
+    return json.loads(json.dumps(valor, default=str))
+
+
+def diff_auditoria(antes: dict, depois: dict) -> tuple[dict, dict]:
+    """
+    Só as chaves de `depois` cujo valor mudou em relação a `antes`
+    
+    Returns:
+        (antes_diff, depois_diff) - vazios se nada mudou
+    """
+    antes = _para_json(antes) or {}
+    depois = _para_json(depois) or {}
+    mudou = [k for k in depois if antes.get(k) != depois[k]]
+    return {k: antes.get(k) for k in mudou}, {k: depois[k] for k in mudou}
+
+
+def flush_auditoria(timeout: float = 5.0):
+    """Aguarda a gravação das entradas pendentes"""
+    _escritor.flush(timeout)
+
+
+def get_auditoria_escritor_stats() -> dict:
+    """Contadores do escritor em segundo plano (fila, lotes, retry, spill)"""
+    return _escritor.stats()
 
 
 def registrar_auditoria(
@@ -16,7 +393,9 @@ def registrar_auditoria(
     depois: dict = None
 ):
     """
-    Registra uma ação de auditoria no banco
+    Registra uma ação de auditoria no banco (em segundo plano)
+    
+    Não faz nada se a entidade é auditada pelo trigger (camada BANCO).
     
     Args:
         entidade: Nome da tabela/entidade (ex: 'clientes', 'obras')
@@ -27,24 +406,34 @@ def registrar_auditoria(
     """
     if not is_admin():
         return
+    if camada_auditoria(entidade) != 'APP':
+        return
     try:
+        if acao == 'UPDATE' and antes and depois and modo_auditoria(entidade) == 'DIFF':
+            antes, depois = diff_auditoria(antes, depois)
+            if not depois:
+                # UPDATE sem mudança: nada a registrar
+                return
+        
         supabase = get_supabase_client()
         
         # Pega o nome do usuário logado
         profile = st.session_state.get('user_profile', {})
         usuario = profile.get('usuario', 'Sistema')
         
-        # Prepara os dados
+        # Prepara os dados (criado_em = momento da ação, não do INSERT: lotes
+        # atrasados por retry ou reenviados do spill mantêm a ordem real)
         dados = {
+            'criado_em': datetime.now(timezone.utc).isoformat(),
             'usuario': usuario,
             'entidade': entidade,
             'entidade_id': str(entidade_id),
             'acao': acao,
-            'antes_json': json.dumps(antes, default=str) if antes else None,
-            'depois_json': json.dumps(depois, default=str) if depois else None,
+            'antes_json': _para_json(antes) if antes else None,
+            'depois_json': _para_json(depois) if depois else None,
         }
         
-        supabase.table('auditoria').insert(dados).execute()
+        _escritor.enfileirar(supabase, dados)
         
     except Exception as e:
         # Não interrompe a operação principal se a auditoria falhar
@@ -2,15 +2,51 @@
 Módulo de autenticação com Supabase
 """
 
+import atexit
+import importlib.util
 import os
+import threading
+import time
+import httpx
 import streamlit as st
 from yarl import URL
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from utils.metricas import registrar_requisicao
+from utils.supabase_local import SUPABASE_LOCAL, criar_cliente_local
+
+try:
+    from supabase.lib.client_options import SyncClientOptions
+except ImportError:  # versões antigas do supabase-py
+    SyncClientOptions = None
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
+# Pool HTTP compartilhado por todas as sessões do processo (keep-alive).
+# O token de cada usuário vai nos headers de cada client, não no pool.
+SUPABASE_POOL_MAX_CONEXOES = int(os.getenv('SUPABASE_POOL_MAX_CONEXOES', '20'))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv('SUPABASE_POOL_MAX_KEEPALIVE', '10'))
+SUPABASE_POOL_KEEPALIVE_EXPIRA = float(os.getenv('SUPABASE_POOL_KEEPALIVE_EXPIRA', '30'))  # segundos
+SUPABASE_HTTP_TIMEOUT = float(os.getenv('SUPABASE_HTTP_TIMEOUT', '120'))  # segundos
+SUPABASE_HTTP2 = os.getenv('SUPABASE_HTTP2', '1').lower() not in ('0', 'false', 'nao', 'não')
+
+_pool_lock = threading.Lock()
+_pool_http: httpx.Client | None = None
+_aviso_sem_pool = False
+_pool_stats = {
+    'sessoes': 0,
+    'requisicoes': 0,
+    'respostas_erro': 0,
+}
+
+# Cache de perfis (por processo): evita consultar usuarios_app a cada rerun
+PERFIL_CACHE_TTL = float(os.getenv('PERFIL_CACHE_TTL', '60'))  # segundos
+
+_perfis_lock = threading.Lock()
+# auth_user_id -> (expira_em, perfil)
+_perfis: dict[str, tuple[float, dict]] = {}
+
 
 def get_supabase_client() -> Client:
     """Retorna o cliente Supabase da sessão"""
@@ -19,11 +55,107 @@ def get_supabase_client() -> Client:
     return st.session_state['supabase']
 
 
+def _contar_pool(campo: str):
+    with _pool_lock:
+        _pool_stats[campo] += 1
+
+
+def _ao_enviar(request):
+    _contar_pool('requisicoes')
+
+
+def _ao_receber(response):
+    if response.status_code >= 400:
+        _contar_pool('respostas_erro')
+    registrar_requisicao(response.request, response)
+
+
+def _get_pool_http() -> httpx.Client:
+    """Cliente httpx único do processo (criado na primeira sessão)"""
+    global _pool_http
+    with _pool_lock:
+        if _pool_http is None:
+            _pool_http = httpx.Client(
+                http2=SUPABASE_HTTP2 and importlib.util.find_spec('h2') is not None,
+                limits=httpx.Limits(
+                    max_connections=SUPABASE_POOL_MAX_CONEXOES,
+                    max_keepalive_connections=SUPABASE_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=SUPABASE_POOL_KEEPALIVE_EXPIRA,
+                ),
+                timeout=SUPABASE_HTTP_TIMEOUT,
+                follow_redirects=True,
+                event_hooks={'request': [_ao_enviar], 'response': [_ao_receber]},
+            )
+            atexit.register(_pool_http.close)
+        return _pool_http
+
+
+def _avisar_sem_pool(motivo: str):
+    """Avisa (uma vez por processo) que as consultas não passam pelo pool"""
+    global _aviso_sem_pool
+    with _pool_lock:
+        if _aviso_sem_pool:
+            return
+        _aviso_sem_pool = True
+    print(
+        f"Aviso: {motivo}; usando um pool HTTP por sessão. As métricas de "
+        "consultas (utils.metricas) e get_pool_stats ficam zeradas."
+    )
+
+
+def _criar_client(url: str, key: str) -> Client:
+    """Cria o client da sessão usando o pool HTTP compartilhado"""
+    if SyncClientOptions is None:
+        _avisar_sem_pool("supabase-py sem SyncClientOptions")
+        return create_client(url, key)
+    try:
+        options = SyncClientOptions(httpx_client=_get_pool_http())
+        return create_client(url, key, options=options)
+    except TypeError as e:
+        # supabase-py sem suporte a httpx_client: pool por sessão
+        _avisar_sem_pool(f"supabase-py sem suporte a httpx_client ({e})")
+    return create_client(url, key)
+
+
+def get_pool_stats() -> dict:
+    """Estatísticas do pool HTTP compartilhado (para monitoramento)"""
+    with _pool_lock:
+        stats = dict(_pool_stats)
+        pool = _pool_http
+
+    stats.update({
+        'compartilhado': pool is not None,
+        'http2': False,
+        'max_conexoes': SUPABASE_POOL_MAX_CONEXOES,
+        'max_keepalive': SUPABASE_POOL_MAX_KEEPALIVE,
+        'conexoes_abertas': None,
+        'conexoes_ociosas': None,
+    })
+    if pool is None:
+        return stats
+
+    try:
+        # httpcore não expõe o estado do pool publicamente
+        conexoes = pool._transport._pool.connections
+        stats['http2'] = pool._transport._pool._http2
+        stats['conexoes_abertas'] = len(conexoes)
+        stats['conexoes_ociosas'] = sum(1 for c in conexoes if c.is_idle())
+    except Exception:
+        pass
+    return stats
+
+
 def init_supabase():
     """Inicializa o cliente Supabase"""
     if 'supabase' in st.session_state:
         return
     
+    # Backend em memória (testes de carga/benchmarks): sem rede nem pool HTTP
+    if SUPABASE_LOCAL:
+        st.session_state['supabase'] = criar_cliente_local()
+        _contar_pool('sessoes')
+        return
+    
     # Tenta carregar das variáveis de ambiente ou secrets do Streamlit
     url = os.getenv('SUPABASE_URL') or st.secrets.get('SUPABASE_URL')
     key = os.getenv('SUPABASE_ANON_KEY') or st.secrets.get('SUPABASE_ANON_KEY')
@@ -42,7 +174,8 @@ def init_supabase():
         """)
         st.stop()
     
-    supabase = create_client(url, key)
+    supabase = _criar_client(url, key)
+    _contar_pool('sessoes')
 
     if storage_url:
         supabase.storage_url = URL(storage_url if storage_url.endswith("/") else f"{storage_url}/")
@@ -112,12 +245,35 @@ def get_user_profile(auth_user_id: str) -> dict | None:
     """
     Busca o perfil do usuário em public.usuarios_app
     
+    Usa cache por PERFIL_CACHE_TTL segundos. Ao expirar, confere só
+    atualizado_em; se não mudou, renova o cache sem buscar o perfil todo.
+    
     Args:
         auth_user_id: UUID do usuário no auth.users
         
     Returns:
         dict com dados do perfil ou None
     """
+    agora = time.monotonic()
+    with _perfis_lock:
+        entrada = _perfis.get(auth_user_id)
+    
+    if entrada and entrada[0] > agora:
+        return dict(entrada[1])
+    
+    if entrada and _perfil_inalterado(auth_user_id, entrada[1]):
+        _guardar_perfil(auth_user_id, entrada[1])
+        return dict(entrada[1])
+    
+    profile = _buscar_perfil(auth_user_id)
+    if profile:
+        _guardar_perfil(auth_user_id, profile)
+    else:
+        invalidar_perfil(auth_user_id=auth_user_id)
+    return profile
+
+
+def _buscar_perfil(auth_user_id: str) -> dict | None:
     try:
         supabase = get_supabase_client()
         
@@ -134,6 +290,45 @@ def get_user_profile(auth_user_id: str) -> dict | None:
         return None
 
 
+def _perfil_inalterado(auth_user_id: str, profile: dict) -> bool:
+    """Revalidação barata: compara só atualizado_em"""
+    atualizado_em = profile.get('atualizado_em')
+    if not atualizado_em:
+        return False
+    try:
+        supabase = get_supabase_client()
+        
+        response = supabase.table('usuarios_app') \
+            .select('atualizado_em') \
+            .eq('auth_user_id', auth_user_id) \
+            .execute()
+        
+        return bool(response.data) and response.data[0].get('atualizado_em') == atualizado_em
+        
+    except Exception as e:
+        print(f"Erro ao revalidar perfil: {e}")
+        return False
+
+
+def _guardar_perfil(auth_user_id: str, profile: dict):
+    with _perfis_lock:
+        _perfis[auth_user_id] = (time.monotonic() + PERFIL_CACHE_TTL, dict(profile))
+
+
+def invalidar_perfil(usuario_id: int | None = None, auth_user_id: str | None = None):
+    """
+    Remove perfis do cache (por id de usuarios_app ou auth_user_id)
+    Sem argumentos, limpa todos.
+    """
+    with _perfis_lock:
+        if usuario_id is None and auth_user_id is None:
+            _perfis.clear()
+            return
+        for chave, (_, profile) in list(_perfis.items()):
+            if chave == auth_user_id or (usuario_id is not None and profile.get('id') == usuario_id):
+                del _perfis[chave]
+
+
 def is_admin() -> bool:
     """Verifica se o usuário atual é ADMIN"""
     profile = st.session_state.get('user_profile')
@@ -154,6 +349,12 @@ def require_auth():
     user = get_current_user()
     profile = st.session_state.get('user_profile')
     
+    # Revalida pelo cache de perfis (sem consulta dentro do TTL)
+    if user and profile:
+        profile = get_user_profile(user['id'])
+        if profile:
+            st.session_state['user_profile'] = profile
+    
     if not user or not profile:
         st.warning("⚠️ Você precisa estar logado para acessar esta página.")
         st.markdown("[👉 Ir para Login](./)")
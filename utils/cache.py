@@ -0,0 +1,274 @@
+"""
+Cache de leituras do banco com TTL por tabela e invalidação nas escritas
+"""
+
+import copy
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+import streamlit as st
+
+# TTL (segundos) por tabela; a entrada usa o menor TTL das tabelas que lê
+CACHE_TTL_PADRAO = 60
+CACHE_TTL_POR_TABELA = {
+    'servicos': 600,
+    'usuarios_app': 300,
+    'auditoria_camadas': 300,
+    'clientes': 300,
+    'pessoas': 300,
+    'obras': 120,
+    'orcamentos': 60,
+    'obra_fases': 60,
+    'orcamento_fase_servicos': 60,
+    'alocacoes': 30,
+    'apontamentos': 30,
+    'recebimentos': 30,
+    'pagamentos': 30,
+    'pagamento_itens': 30,
+    'obra_financeiro_resumo': 30,
+}
+
+CACHE_MAX_ENTRADAS = 2000
+
+# PDFs de orçamento: LRU compartilhado entre sessões, limitado em bytes
+PDF_CACHE_MAX_BYTES = int(float(os.getenv('PDF_CACHE_MAX_MB', '64')) * 1024 * 1024)
+
+_lock = threading.RLock()
+# chave -> (expira_em, tabelas, valor)
+_entradas: dict[tuple, tuple[float, frozenset, object]] = {}
+_estatisticas: dict[str, dict[str, int]] = {}
+_invalidacoes = 0
+
+# (orcamento_id, hash do conteúdo) -> bytes, do menos para o mais recente
+_pdfs: OrderedDict[tuple[int, str], bytes] = OrderedDict()
+_pdfs_gerando: dict[tuple[int, str], threading.Lock] = {}
+_pdfs_bytes = 0
+_pdfs_estatisticas = {'hits': 0, 'misses': 0}
+
+
+def _perfil_atual() -> str | None:
+    """Perfil do usuário logado (RLS depende apenas do perfil)"""
+    try:
+        profile = st.session_state.get('user_profile') or {}
+    except Exception:
+        return None
+    return profile.get('perfil')
+
+
+def _congelar(valor):
+    """Converte argumentos em algo hashable para compor a chave"""
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple, set)):
+        return tuple(_congelar(v) for v in valor)
+    try:
+        hash(valor)
+    except TypeError:
+        return repr(valor)
+    return valor
+
+
+def _contar(funcao: str, campo: str) -> None:
+    contadores = _estatisticas.setdefault(funcao, {'hits': 0, 'misses': 0})
+    contadores[campo] += 1
+
+
+def _ttl_para(tabelas: frozenset) -> float:
+    return min(
+        (CACHE_TTL_POR_TABELA.get(t, CACHE_TTL_PADRAO) for t in tabelas),
+        default=CACHE_TTL_PADRAO
+    )
+
+
+def _podar(agora: float) -> None:
+    """Remove entradas expiradas e, se preciso, as mais antigas"""
+    expiradas = [k for k, (expira_em, _, _) in _entradas.items() if expira_em <= agora]
+    for chave in expiradas:
+        del _entradas[chave]
+
+    excesso = len(_entradas) - CACHE_MAX_ENTRADAS
+    if excesso > 0:
+        mais_antigas = sorted(_entradas.items(), key=lambda item: item[1][0])[:excesso]
+        for chave, _ in mais_antigas:
+            del _entradas[chave]
+
+
+def cache_leitura(*tabelas: str):
+    """
+    Decorator para funções get_* que leem as tabelas informadas
+
+    A chave é (função, perfil, argumentos). Resultados vazios não são
+    guardados, pois os getters também retornam vazio em caso de erro.
+    """
+    tabelas_leitura = frozenset(tabelas)
+    ttl = _ttl_para(tabelas_leitura)
+
+    def decorator(func):
+        nome = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            chave = (nome, _perfil_atual(), _congelar(args), _congelar(kwargs))
+            agora = time.monotonic()
+
+            with _lock:
+                entrada = _entradas.get(chave)
+                if entrada and entrada[0] > agora:
+                    _contar(nome, 'hits')
+                    return copy.deepcopy(entrada[2])
+                _contar(nome, 'misses')
+
+            resultado = func(*args, **kwargs)
+
+            if resultado:
+                with _lock:
+                    if len(_entradas) >= CACHE_MAX_ENTRADAS:
+                        _podar(agora)
+                    _entradas[chave] = (agora + ttl, tabelas_leitura, copy.deepcopy(resultado))
+
+            return resultado
+
+        return wrapper
+
+    return decorator
+
+
+def invalida_cache(*tabelas: str):
+    """
+    Decorator para funções create_*/update_*/delete_* que alteram as tabelas
+    informadas (incluindo as recalculadas por triggers)
+
+    Invalida quando a função retorna (True, ...) ou não retorna tupla.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            resultado = func(*args, **kwargs)
+            if not isinstance(resultado, tuple) or (resultado and resultado[0]):
+                invalidar_tabelas(*tabelas)
+            return resultado
+
+        return wrapper
+
+    return decorator
+
+
+def invalidar_tabelas(*tabelas: str) -> None:
+    """Remove do cache as entradas que dependem de qualquer tabela informada"""
+    global _invalidacoes
+    alvo = set(tabelas)
+    with _lock:
+        chaves = [k for k, (_, deps, _) in _entradas.items() if deps & alvo]
+        for chave in chaves:
+            del _entradas[chave]
+        _invalidacoes += 1
+
+
+def limpar_cache() -> None:
+    """Esvazia todo o cache (leituras e PDFs)"""
+    global _pdfs_bytes
+    with _lock:
+        _entradas.clear()
+        _pdfs.clear()
+        _pdfs_bytes = 0
+
+
+# ============================================
+# PDFs DE ORÇAMENTO
+# ============================================
+
+def _hash_conteudo(conteudo) -> str:
+    texto = json.dumps(conteudo, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def _remover_pdf(chave: tuple[int, str]) -> None:
+    global _pdfs_bytes
+    pdf = _pdfs.pop(chave, None)
+    if pdf is not None:
+        _pdfs_bytes -= len(pdf)
+
+
+def cache_pdf(orcamento_id: int, conteudo, gerar: Callable[[], bytes]) -> tuple[tuple[int, str], bytes]:
+    """
+    Retorna (chave, bytes) do PDF do orçamento, gerando só se o conteúdo mudou
+
+    A chave é o hash dos dados renderizados (orçamento, fases, serviços), então
+    sessões que abrem o mesmo orçamento compartilham os mesmos bytes. Gerações
+    simultâneas da mesma chave esperam a primeira terminar.
+    """
+    global _pdfs_bytes
+    chave = (orcamento_id, _hash_conteudo(conteudo))
+
+    with _lock:
+        if chave in _pdfs:
+            _pdfs.move_to_end(chave)
+            _pdfs_estatisticas['hits'] += 1
+            return chave, _pdfs[chave]
+        trava = _pdfs_gerando.setdefault(chave, threading.Lock())
+
+    with trava:
+        with _lock:
+            if chave in _pdfs:
+                _pdfs.move_to_end(chave)
+                _pdfs_estatisticas['hits'] += 1
+                return chave, _pdfs[chave]
+            _pdfs_estatisticas['misses'] += 1
+
+        try:
+            pdf = gerar()
+        finally:
+            with _lock:
+                _pdfs_gerando.pop(chave, None)
+
+        with _lock:
+            if len(pdf) <= PDF_CACHE_MAX_BYTES:
+                _remover_pdf(chave)
+                _pdfs[chave] = pdf
+                _pdfs_bytes += len(pdf)
+                while _pdfs_bytes > PDF_CACHE_MAX_BYTES:
+                    _remover_pdf(next(iter(_pdfs)))
+        return chave, pdf
+
+
+def obter_pdf(chave: tuple[int, str]) -> bytes | None:
+    """Bytes de um PDF já gerado, ou None se foi invalidado ou saiu do cache"""
+    with _lock:
+        pdf = _pdfs.get(chave)
+        if pdf is not None:
+            _pdfs.move_to_end(chave)
+        return pdf
+
+
+def invalidar_pdf(orcamento_id: int) -> None:
+    """Remove os PDFs guardados de um orçamento (chamado por limpar_pdf_orcamento)"""
+    with _lock:
+        for chave in [c for c in _pdfs if c[0] == orcamento_id]:
+            _remover_pdf(chave)
+
+
+def get_cache_stats() -> dict:
+    """Retorna contadores de hit/miss (total e por função)"""
+    with _lock:
+        por_funcao = {nome: dict(valores) for nome, valores in _estatisticas.items()}
+        hits = sum(v['hits'] for v in por_funcao.values())
+        misses = sum(v['misses'] for v in por_funcao.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'taxa_acerto': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'entradas': len(_entradas),
+            'invalidacoes': _invalidacoes,
+            'por_funcao': por_funcao,
+            'pdf': {
+                **_pdfs_estatisticas,
+                'entradas': len(_pdfs),
+                'bytes': _pdfs_bytes,
+                'max_bytes': PDF_CACHE_MAX_BYTES,
+            },
+        }
@@ -3,10 +3,12 @@ Módulo de acesso ao banco de dados Supabase
 """
 
 import ast
+import os
 import streamlit as st
-from datetime import date, datetime
-from typing import Optional
-from utils.auth import get_supabase_client
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+from utils.auth import get_supabase_client, invalidar_perfil
+from utils.cache import cache_leitura, cache_pdf, invalida_cache, invalidar_pdf
 
 
 def _extract_db_error_message(error: Exception) -> str:
@@ -29,12 +31,137 @@ def _extract_db_error_message(error: Exception) -> str:
     return raw_text
 
 
+# ============================================
+# PAGINAÇÃO (keyset)
+# ============================================
+
+PAGINA_TAMANHO_PADRAO = 50
+
+
+def _valor_postgrest(valor) -> str:
+    """Valor entre aspas para filtros or=(...) do PostgREST"""
+    texto = str(valor).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{texto}"'
+
+
+def _aplicar_keyset(query, coluna: str, cursor: tuple | None, desc: bool = False):
+    """
+    Ordena por (coluna, id) e continua depois do cursor (valor, id)
+    
+    Segue a ordem padrão do Postgres para nulos (DESC: primeiro; ASC: por último).
+    """
+    if cursor:
+        valor, ultimo_id = cursor
+        op = 'lt' if desc else 'gt'
+        if valor is None:
+            if desc:
+                query = query.or_(f"and({coluna}.is.null,id.{op}.{ultimo_id}),{coluna}.not.is.null")
+            else:
+                query = query.is_(coluna, 'null').gt('id', ultimo_id)
+        else:
+            v = _valor_postgrest(valor)
+            filtro = f"{coluna}.{op}.{v},and({coluna}.eq.{v},id.{op}.{ultimo_id})"
+            if not desc:
+                filtro += f",{coluna}.is.null"
+            query = query.or_(filtro)
+    return query.order(coluna, desc=desc).order('id', desc=desc)
+
+
+def _pagina(query, coluna: str, cursor: tuple | None, limite: int, desc: bool = False) -> dict:
+    """
+    Executa a consulta paginada
+    
+    Returns:
+        {'itens': [...], 'proximo_cursor': (valor, id) ou None}
+    """
+    response = _aplicar_keyset(query, coluna, cursor, desc).limit(limite + 1).execute()
+    itens = response.data or []
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = (itens[-1].get(coluna), itens[-1]['id'])
+    return {'itens': itens, 'proximo_cursor': proximo_cursor}
+
+
+# ============================================
+# BUSCA (trigramas, sem acento)
+# ============================================
+
+BUSCA_LIMITE = 100
+
+
+def _buscar_ranqueados(entidade: str, busca: str, limite: int = BUSCA_LIMITE,
+                       cursor: tuple | None = None, ativo: Optional[bool] = None,
+                       status: Optional[str] = None, tipo: Optional[str] = None) -> list | None:
+    """
+    [{'id', 'score'}] de fn_buscar, mais relevante primeiro
+    
+    Os filtros vão para a RPC (aplicados antes do limite); cursor é o
+    (score, id) do último item da página anterior.
+    Returns None se a RPC falhar (o chamador volta ao ILIKE).
+    """
+    cursor_score, cursor_id = cursor if cursor else (None, None)
+    try:
+        supabase = get_supabase_client()
+        response = supabase.rpc('fn_buscar', {
+            'p_entidade': entidade,
+            'p_termo': busca,
+            'p_limite': limite,
+            'p_ativo': ativo,
+            'p_status': status,
+            'p_tipo': tipo,
+            'p_cursor_score': cursor_score,
+            'p_cursor_id': cursor_id
+        }).execute()
+        return response.data or []
+    except Exception as e:
+        print(f"Erro na busca ({entidade}): {e}")
+        return None
+
+
+def _buscar_ids(entidade: str, busca: str, **filtros) -> list | None:
+    """Ids ranqueados por fn_buscar (até BUSCA_LIMITE); None se a RPC falhar"""
+    ranqueados = _buscar_ranqueados(entidade, busca, **filtros)
+    return None if ranqueados is None else [r['id'] for r in ranqueados]
+
+
+def _pagina_busca(query, entidade: str, busca: str, cursor: tuple | None, limite: int,
+                  **filtros) -> dict | None:
+    """
+    Página da busca por relevância (keyset em score desc, id)
+    
+    Returns:
+        {'itens': [...], 'proximo_cursor': (score, id) ou None}, ou None se
+        a RPC falhar
+    """
+    ranqueados = _buscar_ranqueados(entidade, busca, limite + 1, cursor, **filtros)
+    if ranqueados is None:
+        return None
+    proximo_cursor = None
+    if len(ranqueados) > limite:
+        ranqueados = ranqueados[:limite]
+        proximo_cursor = (ranqueados[-1]['score'], ranqueados[-1]['id'])
+    itens = []
+    if ranqueados:
+        ids = [r['id'] for r in ranqueados]
+        response = query.in_('id', ids).execute()
+        itens = _ordenar_por_ids(response.data or [], ids)
+    return {'itens': itens, 'proximo_cursor': proximo_cursor}
+
+
+def _ordenar_por_ids(itens: list, ids: list) -> list:
+    """Reordena itens na ordem de relevância dos ids"""
+    posicao = {item_id: i for i, item_id in enumerate(ids)}
+    return sorted(itens, key=lambda item: posicao.get(item['id'], len(posicao)))
+
+
 # ============================================
 # DASHBOARD / ESTATÍSTICAS
 # ============================================
 
+@cache_leitura('obras', 'orcamentos', 'pessoas', 'clientes', 'recebimentos', 'pagamentos', 'obra_fases')
 def get_dashboard_stats() -> dict:
-    """Retorna estatísticas para o dashboard"""
+    """Retorna estatísticas para o dashboard (uma única chamada RPC)"""
     try:
         supabase = get_supabase_client()
         hoje = date.today()
@@ -43,71 +170,23 @@ def get_dashboard_stats() -> dict:
             inicio_proximo_mes = date(inicio_mes.year + 1, 1, 1)
         else:
             inicio_proximo_mes = date(inicio_mes.year, inicio_mes.month + 1, 1)
-        
-        # Obras ativas
-        obras = supabase.table('obras') \
-            .select('id', count='exact') \
-            .eq('ativo', True) \
-            .in_('status', ['AGUARDANDO', 'INICIADO', 'PAUSADO']) \
-            .execute()
-        
-        # Orçamentos pendentes (RASCUNHO ou EMITIDO)
-        orcamentos = supabase.table('orcamentos') \
-            .select('id', count='exact') \
-            .in_('status', ['RASCUNHO', 'EMITIDO']) \
-            .execute()
-        
-        # Pessoas ativas
-        pessoas = supabase.table('pessoas') \
-            .select('id', count='exact') \
-            .eq('ativo', True) \
-            .execute()
-        
-        # Clientes ativos
-        clientes = supabase.table('clientes') \
-            .select('id', count='exact') \
-            .eq('ativo', True) \
-            .execute()
 
-        # Recebimentos do mês
-        recebimentos_mes = supabase.table('recebimentos') \
-            .select('valor') \
-            .eq('status', 'PAGO') \
-            .gte('recebido_em', inicio_mes.isoformat()) \
-            .lt('recebido_em', inicio_proximo_mes.isoformat()) \
-            .execute()
-
-        total_recebimentos_mes = sum(
-            float(item.get('valor') or 0) for item in (recebimentos_mes.data or [])
-        )
-
-        # Pagamentos do mês
-        pagamentos_mes = supabase.table('pagamentos') \
-            .select('valor_total') \
-            .eq('status', 'PAGO') \
-            .gte('pago_em', inicio_mes.isoformat()) \
-            .lt('pago_em', inicio_proximo_mes.isoformat()) \
-            .execute()
+        response = supabase.rpc('fn_dashboard_stats', {
+            'p_inicio': inicio_mes.isoformat(),
+            'p_fim': inicio_proximo_mes.isoformat()
+        }).execute()
 
-        total_pagamentos_mes = sum(
-            float(item.get('valor_total') or 0) for item in (pagamentos_mes.data or [])
-        )
+        stats = response.data or {}
 
-        # Fases não concluídas
-        fases_nao_concluidas = supabase.table('obra_fases') \
-            .select('id', count='exact') \
-            .neq('status', 'CONCLUIDA') \
-            .execute()
-        
         return {
-            'obras_ativas': obras.count or 0,
-            'orcamentos_pendentes': orcamentos.count or 0,
-            'pessoas_ativas': pessoas.count or 0,
-            'clientes_ativos': clientes.count or 0,
-            'recebimentos_mes': round(total_recebimentos_mes, 2),
-            'pagamentos_mes': round(total_pagamentos_mes, 2),
-            'resultado_mes': round(total_recebimentos_mes - total_pagamentos_mes, 2),
-            'fases_nao_concluidas': fases_nao_concluidas.count or 0
+            'obras_ativas': int(stats.get('obras_ativas') or 0),
+            'orcamentos_pendentes': int(stats.get('orcamentos_pendentes') or 0),
+            'pessoas_ativas': int(stats.get('pessoas_ativas') or 0),
+            'clientes_ativos': int(stats.get('clientes_ativos') or 0),
+            'recebimentos_mes': round(float(stats.get('recebimentos_mes') or 0), 2),
+            'pagamentos_mes': round(float(stats.get('pagamentos_mes') or 0), 2),
+            'resultado_mes': round(float(stats.get('resultado_mes') or 0), 2),
+            'fases_nao_concluidas': int(stats.get('fases_nao_concluidas') or 0)
         }
     except Exception as e:
         print(f"Erro ao buscar estatísticas: {e}")
@@ -118,6 +197,7 @@ def get_dashboard_stats() -> dict:
 # CLIENTES
 # ============================================
 
+@cache_leitura('clientes')
 def get_clientes(busca: str = "", ativo: Optional[bool] = None) -> list:
     """Lista clientes com filtros"""
     try:
@@ -129,7 +209,14 @@ def get_clientes(busca: str = "", ativo: Optional[bool] = None) -> list:
             query = query.eq('ativo', ativo)
         
         if busca:
-            query = query.or_(f"nome.ilike.%{busca}%,telefone.ilike.%{busca}%")
+            ids = _buscar_ids('clientes', busca, ativo=ativo)
+            if ids is None:
+                query = query.or_(f"nome.ilike.%{busca}%,telefone.ilike.%{busca}%")
+            elif not ids:
+                return []
+            else:
+                response = query.in_('id', ids).execute()
+                return _ordenar_por_ids(response.data or [], ids)
         
         response = query.order('nome').execute()
         return response.data or []
@@ -139,6 +226,33 @@ def get_clientes(busca: str = "", ativo: Optional[bool] = None) -> list:
         return []
 
 
+@cache_leitura('clientes')
+def get_clientes_pagina(busca: str = "", ativo: Optional[bool] = None,
+                        cursor: tuple | None = None, limite: int = PAGINA_TAMANHO_PADRAO) -> dict:
+    """Lista clientes com filtros, uma página por vez (keyset em nome, id)"""
+    try:
+        supabase = get_supabase_client()
+        
+        query = supabase.table('clientes').select('*')
+        
+        if ativo is not None:
+            query = query.eq('ativo', ativo)
+        
+        if busca:
+            # Com busca: por relevância, paginada na própria RPC
+            pagina = _pagina_busca(query, 'clientes', busca, cursor, limite, ativo=ativo)
+            if pagina is not None:
+                return pagina
+            query = query.or_(f"nome.ilike.%{busca}%,telefone.ilike.%{busca}%")
+        
+        return _pagina(query, 'nome', cursor, limite)
+        
+    except Exception as e:
+        print(f"Erro ao buscar clientes: {e}")
+        return {}
+
+
+@cache_leitura('clientes')
 def get_cliente(cliente_id: int) -> dict | None:
     """Busca um cliente específico"""
     try:
@@ -153,6 +267,7 @@ def get_cliente(cliente_id: int) -> dict | None:
         return None
 
 
+@invalida_cache('clientes')
 def create_cliente(nome: str, telefone: str, endereco: str) -> tuple[bool, str, dict]:
     """Cria um novo cliente"""
     try:
@@ -171,6 +286,7 @@ def create_cliente(nome: str, telefone: str, endereco: str) -> tuple[bool, str,
         return False, f"Erro ao criar cliente: {e}", {}
 
 
+@invalida_cache('clientes')
 def update_cliente(cliente_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza um cliente"""
     try:
@@ -196,6 +312,7 @@ def toggle_cliente_ativo(cliente_id: int, ativo: bool) -> tuple[bool, str]:
 # PESSOAS / PROFISSIONAIS
 # ============================================
 
+@cache_leitura('pessoas')
 def get_pessoas(busca: str = "", ativo: Optional[bool] = None, tipo: Optional[str] = None) -> list:
     """Lista pessoas com filtros"""
     try:
@@ -210,7 +327,14 @@ def get_pessoas(busca: str = "", ativo: Optional[bool] = None, tipo: Optional[st
             query = query.eq('tipo', tipo)
         
         if busca:
-            query = query.ilike('nome', f'%{busca}%')
+            ids = _buscar_ids('pessoas', busca, ativo=ativo, tipo=tipo)
+            if ids is None:
+                query = query.ilike('nome', f'%{busca}%')
+            elif not ids:
+                return []
+            else:
+                response = query.in_('id', ids).execute()
+                return _ordenar_por_ids(response.data or [], ids)
         
         response = query.order('nome').execute()
         return response.data or []
@@ -220,6 +344,36 @@ def get_pessoas(busca: str = "", ativo: Optional[bool] = None, tipo: Optional[st
         return []
 
 
+@cache_leitura('pessoas')
+def get_pessoas_pagina(busca: str = "", ativo: Optional[bool] = None, tipo: Optional[str] = None,
+                       cursor: tuple | None = None, limite: int = PAGINA_TAMANHO_PADRAO) -> dict:
+    """Lista pessoas com filtros, uma página por vez (keyset em nome, id)"""
+    try:
+        supabase = get_supabase_client()
+        
+        query = supabase.table('pessoas').select('*')
+        
+        if ativo is not None:
+            query = query.eq('ativo', ativo)
+        
+        if tipo:
+            query = query.eq('tipo', tipo)
+        
+        if busca:
+            # Com busca: por relevância, paginada na própria RPC
+            pagina = _pagina_busca(query, 'pessoas', busca, cursor, limite, ativo=ativo, tipo=tipo)
+            if pagina is not None:
+                return pagina
+            query = query.ilike('nome', f'%{busca}%')
+        
+        return _pagina(query, 'nome', cursor, limite)
+        
+    except Exception as e:
+        print(f"Erro ao buscar pessoas: {e}")
+        return {}
+
+
+@cache_leitura('pessoas')
 def get_pessoa(pessoa_id: int) -> dict | None:
     """Busca uma pessoa específica"""
     try:
@@ -234,6 +388,7 @@ def get_pessoa(pessoa_id: int) -> dict | None:
         return None
 
 
+@invalida_cache('pessoas')
 def create_pessoa(dados: dict) -> tuple[bool, str, dict]:
     """Cria uma nova pessoa"""
     try:
@@ -248,6 +403,7 @@ def create_pessoa(dados: dict) -> tuple[bool, str, dict]:
         return False, f"Erro ao cadastrar: {e}", {}
 
 
+@invalida_cache('pessoas')
 def update_pessoa(pessoa_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza uma pessoa"""
     try:
@@ -268,6 +424,7 @@ def update_pessoa(pessoa_id: int, dados: dict) -> tuple[bool, str]:
 # OBRAS
 # ============================================
 
+@cache_leitura('obras', 'clientes')
 def get_obras(busca: str = "", status: Optional[str] = None, ativo: Optional[bool] = None) -> list:
     """Lista obras com filtros"""
     try:
@@ -283,7 +440,14 @@ def get_obras(busca: str = "", status: Optional[str] = None, ativo: Optional[boo
             query = query.eq('status', status)
         
         if busca:
-            query = query.or_(f"titulo.ilike.%{busca}%,endereco_obra.ilike.%{busca}%")
+            ids = _buscar_ids('obras', busca, ativo=ativo, status=status)
+            if ids is None:
+                query = query.or_(f"titulo.ilike.%{busca}%,endereco_obra.ilike.%{busca}%")
+            elif not ids:
+                return []
+            else:
+                response = query.in_('id', ids).execute()
+                return _ordenar_por_ids(response.data or [], ids)
         
         response = query.order('criado_em', desc=True).execute()
         return response.data or []
@@ -293,6 +457,37 @@ def get_obras(busca: str = "", status: Optional[str] = None, ativo: Optional[boo
         return []
 
 
+@cache_leitura('obras', 'clientes')
+def get_obras_pagina(busca: str = "", status: Optional[str] = None, ativo: Optional[bool] = None,
+                     cursor: tuple | None = None, limite: int = PAGINA_TAMANHO_PADRAO) -> dict:
+    """Lista obras com filtros, uma página por vez (keyset em criado_em desc, id)"""
+    try:
+        supabase = get_supabase_client()
+        
+        query = supabase.table('obras') \
+            .select('*, clientes(nome)')
+        
+        if ativo is not None:
+            query = query.eq('ativo', ativo)
+        
+        if status:
+            query = query.eq('status', status)
+        
+        if busca:
+            # Com busca: por relevância, paginada na própria RPC
+            pagina = _pagina_busca(query, 'obras', busca, cursor, limite, ativo=ativo, status=status)
+            if pagina is not None:
+                return pagina
+            query = query.or_(f"titulo.ilike.%{busca}%,endereco_obra.ilike.%{busca}%")
+        
+        return _pagina(query, 'criado_em', cursor, limite, desc=True)
+        
+    except Exception as e:
+        print(f"Erro ao buscar obras: {e}")
+        return {}
+
+
+@cache_leitura('obras', 'clientes')
 def get_obra(obra_id: int) -> dict | None:
     """Busca uma obra específica com dados do cliente"""
     try:
@@ -307,6 +502,7 @@ def get_obra(obra_id: int) -> dict | None:
         return None
 
 
+@invalida_cache('obras')
 def create_obra(dados: dict) -> tuple[bool, str, dict]:
     """Cria uma nova obra"""
     try:
@@ -322,6 +518,7 @@ def create_obra(dados: dict) -> tuple[bool, str, dict]:
         return False, f"Erro ao criar obra: {e}", {}
 
 
+@invalida_cache('obras')
 def update_obra(obra_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza uma obra"""
     try:
@@ -342,6 +539,7 @@ def update_obra(obra_id: int, dados: dict) -> tuple[bool, str]:
 # ORÇAMENTOS
 # ============================================
 
+@cache_leitura('orcamentos')
 def get_orcamentos_por_obra(obra_id: int) -> list:
     """Lista orçamentos de uma obra"""
     try:
@@ -360,6 +558,7 @@ def get_orcamentos_por_obra(obra_id: int) -> list:
         return []
 
 
+@cache_leitura('orcamentos', 'obras', 'clientes')
 def get_orcamento(orcamento_id: int) -> dict | None:
     """Busca um orçamento específico"""
     try:
@@ -374,6 +573,50 @@ def get_orcamento(orcamento_id: int) -> dict | None:
         return None
 
 
+@cache_leitura('orcamentos', 'obras', 'clientes', 'obra_fases', 'orcamento_fase_servicos', 'servicos')
+def get_orcamento_completo(orcamento_id: int) -> dict | None:
+    """
+    Busca orçamento + obra + cliente + fases + serviços de cada fase
+    em uma única consulta (select com embeds)
+
+    Returns:
+        dict do orçamento com 'fases' (ordenadas por ordem), cada fase
+        com 'servicos_fase' (apenas serviços ativos do catálogo)
+    """
+    try:
+        supabase = get_supabase_client()
+        response = supabase.table('orcamentos') \
+            .select(
+                '*, obras(*, clientes(*)), '
+                'obra_fases(*, orcamento_fase_servicos(*, servicos(nome, unidade, ativo)))'
+            ) \
+            .eq('id', orcamento_id) \
+            .single() \
+            .execute()
+
+        orcamento = response.data
+        if not orcamento:
+            return None
+
+        fases = orcamento.pop('obra_fases', None) or []
+        for fase in fases:
+            itens = fase.pop('orcamento_fase_servicos', None) or []
+            fase['servicos_fase'] = sorted(
+                (
+                    item for item in itens
+                    if item.get('servicos') and item['servicos'].get('ativo', True)
+                ),
+                key=lambda item: item['id']
+            )
+        orcamento['fases'] = sorted(fases, key=lambda fase: fase.get('ordem', 0))
+
+        return orcamento
+    except Exception as e:
+        print(f"Erro ao buscar orçamento completo: {e}")
+        return None
+
+
+@invalida_cache('orcamentos')
 def create_orcamento(obra_id: int) -> tuple[bool, str, dict]:
     """Cria novo orçamento com versão incrementada"""
     try:
@@ -406,6 +649,7 @@ def create_orcamento(obra_id: int) -> tuple[bool, str, dict]:
         return False, f"Erro ao criar orçamento: {e}", {}
 
 
+@invalida_cache('orcamentos', 'obra_fases')
 def update_orcamento_status(orcamento_id: int, novo_status: str, campos_extra: dict = None) -> tuple[bool, str]:
     """Atualiza o status de um orçamento"""
     try:
@@ -438,6 +682,7 @@ def update_orcamento_status(orcamento_id: int, novo_status: str, campos_extra: d
         return False, f"Erro ao atualizar orçamento: {e}"
 
 
+@invalida_cache('orcamentos', 'obra_fases')
 def update_orcamento_desconto(orcamento_id: int, desconto: float) -> tuple[bool, str]:
     """Atualiza o desconto do orçamento"""
     try:
@@ -459,6 +704,7 @@ def update_orcamento_desconto(orcamento_id: int, desconto: float) -> tuple[bool,
         return False, f"Erro ao atualizar desconto: {e}"
 
 
+@invalida_cache('orcamentos', 'obra_fases')
 def recalcular_orcamento(orcamento_id: int):
     """Chama a função de recálculo do orçamento"""
     try:
@@ -468,18 +714,113 @@ def recalcular_orcamento(orcamento_id: int):
         print(f"Erro ao recalcular orçamento: {e}")
 
 
+PDF_BUCKET = os.getenv('PDF_BUCKET', 'orcamentos')
+
+
+@invalida_cache('orcamentos')
 def limpar_pdf_orcamento(orcamento_id: int):
-    """Limpa a URL do PDF quando o orçamento é alterado"""
+    """Limpa a URL do PDF quando o orçamento é alterado (e apaga o objeto do Storage)"""
+    invalidar_pdf(orcamento_id)
     try:
         supabase = get_supabase_client()
+        atual = supabase.table('orcamentos') \
+            .select('pdf_url') \
+            .eq('id', orcamento_id) \
+            .execute()
+        caminho = atual.data[0].get('pdf_url') if atual.data else None
+        if not caminho:
+            return
         supabase.table('orcamentos') \
             .update({'pdf_url': None, 'pdf_emitido_em': None}) \
             .eq('id', orcamento_id) \
             .execute()
+        supabase.storage.from_(PDF_BUCKET).remove([caminho])
     except Exception as e:
         print(f"Erro ao limpar PDF do orçamento: {e}")
 
 
+def _baixar_pdf(orcamento_id: int, caminho: str) -> tuple:
+    """Chave no cache de PDFs do objeto do Storage (baixa só na primeira vez)"""
+    bucket = get_supabase_client().storage.from_(PDF_BUCKET)
+    chave, _ = cache_pdf(orcamento_id, ('storage', caminho), lambda: bucket.download(caminho))
+    return chave
+
+
+@invalida_cache('orcamentos')
+def emitir_pdf_orcamento(orcamento: dict, fases: list, servicos_por_fase: dict,
+                         gerar: Callable[[dict, list, dict], bytes]) -> tuple[bool, str, tuple | None]:
+    """
+    Emite o PDF do orçamento uma vez e serve as próximas cópias do Storage
+
+    Se o orçamento já tem pdf_url (caminho no bucket), baixa de lá. Senão gera
+    com gerar(orcamento_pdf, fases, servicos_por_fase), envia ao bucket e grava
+    pdf_url/pdf_emitido_em; edições limpam esses campos (limpar_pdf_orcamento)
+    e a próxima emissão gera de novo. Falha no Storage não impede a entrega do
+    PDF gerado.
+
+    Returns:
+        tuple: (sucesso, mensagem, chave do PDF em utils.cache.obter_pdf)
+    """
+    orcamento_id = orcamento['id']
+    caminho_antigo = orcamento.get('pdf_url')
+    if caminho_antigo:
+        try:
+            return True, "PDF emitido baixado do Storage.", _baixar_pdf(orcamento_id, caminho_antigo)
+        except Exception as e:
+            # Objeto apagado/bucket trocado: gera de novo e substitui o caminho
+            print(f"Erro ao baixar PDF do Storage ({caminho_antigo}): {e}")
+
+    try:
+        orcamento_pdf = dict(orcamento)
+        orcamento_pdf['pdf_emitido_em'] = date.today().isoformat()
+        # Fases e serviços entram na chave: mudam o PDF sem mudar o orçamento
+        chave, pdf_bytes = cache_pdf(
+            orcamento_id,
+            (orcamento_pdf, fases, servicos_por_fase),
+            lambda: gerar(orcamento_pdf, fases, servicos_por_fase)
+        )
+    except Exception as e:
+        return False, f"Erro ao gerar PDF: {e}", None
+
+    caminho = f"obra_{orcamento.get('obra_id')}/orcamento_{orcamento_id}_v{orcamento.get('versao')}_{chave[1][:12]}.pdf"
+    try:
+        supabase = get_supabase_client()
+        bucket = supabase.storage.from_(PDF_BUCKET)
+        bucket.upload(caminho, pdf_bytes, {'content-type': 'application/pdf', 'x-upsert': 'true'})
+        # Só grava se nenhuma edição limpou/emitiu nesse meio tempo
+        query = supabase.table('orcamentos') \
+            .update({'pdf_url': caminho, 'pdf_emitido_em': datetime.now().isoformat()}) \
+            .eq('id', orcamento_id)
+        if caminho_antigo:
+            query = query.eq('pdf_url', caminho_antigo)
+        else:
+            query = query.is_('pdf_url', 'null')
+        response = query.execute()
+        if not response.data:
+            # Outra sessão emitiu primeiro: fica o objeto dela, o nosso sai do bucket
+            atual = supabase.table('orcamentos') \
+                .select('pdf_url') \
+                .eq('id', orcamento_id) \
+                .execute()
+            vencedor = atual.data[0].get('pdf_url') if atual.data else None
+            if vencedor != caminho:
+                bucket.remove([caminho])
+                # O caminho que acabou de falhar no download nunca é o vencedor
+                if vencedor and vencedor != caminho_antigo:
+                    return True, "PDF já emitido por outra sessão.", _baixar_pdf(orcamento_id, vencedor)
+                return True, "PDF gerado (não foi salvo no Storage).", chave
+        elif caminho_antigo and caminho_antigo != caminho:
+            bucket.remove([caminho_antigo])
+        # Próximas sessões baixam pelo caminho: já deixa os bytes no cache
+        cache_pdf(orcamento_id, ('storage', caminho), lambda: pdf_bytes)
+    except Exception as e:
+        print(f"Erro ao salvar PDF no Storage ({PDF_BUCKET}/{caminho}): {e}")
+        return True, "PDF gerado (não foi salvo no Storage).", chave
+
+    return True, "PDF gerado e salvo no Storage.", chave
+
+
+@invalida_cache('orcamentos')
 def update_orcamento_validade(orcamento_id: int, valido_ate: date) -> tuple[bool, str]:
     """Atualiza a validade do orçamento"""
     try:
@@ -509,6 +850,7 @@ FASES_PADRAO = [
 ]
 
 
+@cache_leitura('obra_fases')
 def get_fases_por_orcamento(orcamento_id: int) -> list:
     """Lista fases de um orçamento"""
     try:
@@ -527,6 +869,7 @@ def get_fases_por_orcamento(orcamento_id: int) -> list:
         return []
 
 
+@cache_leitura('recebimentos', 'obra_fases')
 def get_recebimentos_por_orcamento(orcamento_id: int) -> list:
     """Lista recebimentos vinculados a um orçamento"""
     try:
@@ -544,6 +887,7 @@ def get_recebimentos_por_orcamento(orcamento_id: int) -> list:
         return []
 
 
+@invalida_cache('obra_fases', 'orcamentos')
 def create_fase(obra_id: int, orcamento_id: int, nome_fase: str, ordem: int,
                 status: str = 'PENDENTE') -> tuple[bool, str, dict]:
     """Cria uma fase para um orçamento"""
@@ -566,6 +910,7 @@ def create_fase(obra_id: int, orcamento_id: int, nome_fase: str, ordem: int,
         return False, f"Erro ao criar fase: {e}", {}
 
 
+@invalida_cache('obra_fases', 'orcamento_fase_servicos', 'orcamentos')
 def delete_fase(fase_id: int) -> tuple[bool, str]:
     """Remove uma fase e seus serviços"""
     try:
@@ -597,6 +942,7 @@ def delete_fase(fase_id: int) -> tuple[bool, str]:
         return False, f"Erro ao remover fase: {e}"
 
 
+@invalida_cache('obra_fases')
 def create_fases_padrao(obra_id: int, orcamento_id: int) -> tuple[bool, str]:
     """Cria as fases padrão para um orçamento"""
     try:
@@ -621,6 +967,7 @@ def create_fases_padrao(obra_id: int, orcamento_id: int) -> tuple[bool, str]:
         return False, f"Erro ao criar fases: {e}"
 
 
+@invalida_cache('obra_fases', 'orcamentos')
 def update_fase(fase_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza uma fase"""
     try:
@@ -650,6 +997,7 @@ def update_fase(fase_id: int, dados: dict) -> tuple[bool, str]:
 # SERVIÇOS (CATÁLOGO)
 # ============================================
 
+@cache_leitura('servicos')
 def get_servicos(ativo: Optional[bool] = True) -> list:
     """Lista serviços do catálogo"""
     try:
@@ -668,6 +1016,7 @@ def get_servicos(ativo: Optional[bool] = True) -> list:
         return []
 
 
+@invalida_cache('servicos')
 def create_servico(nome: str, unidade: str) -> tuple[bool, str, dict]:
     """Cria um novo serviço"""
     try:
@@ -685,6 +1034,7 @@ def create_servico(nome: str, unidade: str) -> tuple[bool, str, dict]:
         return False, f"Erro ao criar serviço: {e}", {}
 
 
+@invalida_cache('servicos')
 def update_servico(servico_id: int, dados: dict) -> tuple[bool, str, dict]:
     """Atualiza um serviço do catálogo"""
     try:
@@ -699,10 +1049,13 @@ def update_servico(servico_id: int, dados: dict) -> tuple[bool, str, dict]:
 
     except Exception as e:
         return False, f"Erro ao atualizar serviço: {e}", {}
+
+
 # ============================================
 # SERVIÇOS POR FASE
 # ============================================
 
+@cache_leitura('orcamento_fase_servicos', 'servicos')
 def get_servicos_fase(obra_fase_id: int) -> list:
     """Lista serviços de uma fase"""
     try:
@@ -721,6 +1074,7 @@ def get_servicos_fase(obra_fase_id: int) -> list:
         return []
 
 
+@invalida_cache('orcamento_fase_servicos', 'obra_fases', 'orcamentos')
 def add_servico_fase(obra_fase_id: int, servico_id: int, quantidade: float, 
                      valor_unit: float, observacao: str, orcamento_id: int) -> tuple[bool, str]:
     """Adiciona um serviço a uma fase"""
@@ -735,11 +1089,9 @@ def add_servico_fase(obra_fase_id: int, servico_id: int, quantidade: float,
             'observacao': observacao
         }).execute()
 
+        # Fase e orçamento são recalculados pelo trigger (sql/010)
         limpar_pdf_orcamento(orcamento_id)
         
-        # Recalcula o orçamento
-        recalcular_orcamento(orcamento_id)
-        
         return True, "Serviço adicionado!"
         
     except Exception as e:
@@ -748,6 +1100,7 @@ def add_servico_fase(obra_fase_id: int, servico_id: int, quantidade: float,
         return False, f"Erro ao adicionar serviço: {e}"
 
 
+@invalida_cache('orcamento_fase_servicos', 'obra_fases', 'orcamentos')
 def update_servico_fase(item_id: int, dados: dict, orcamento_id: int) -> tuple[bool, str]:
     """Atualiza um serviço de fase"""
     try:
@@ -758,16 +1111,16 @@ def update_servico_fase(item_id: int, dados: dict, orcamento_id: int) -> tuple[b
             .eq('id', item_id) \
             .execute()
 
+        # Fase e orçamento são recalculados pelo trigger (sql/010)
         limpar_pdf_orcamento(orcamento_id)
         
-        recalcular_orcamento(orcamento_id)
-        
         return True, "Serviço atualizado!"
         
     except Exception as e:
         return False, f"Erro ao atualizar: {e}"
 
 
+@invalida_cache('orcamento_fase_servicos', 'obra_fases', 'orcamentos')
 def delete_servico_fase(item_id: int, orcamento_id: int) -> tuple[bool, str]:
     """Remove um serviço de fase"""
     try:
@@ -778,10 +1131,9 @@ def delete_servico_fase(item_id: int, orcamento_id: int) -> tuple[bool, str]:
             .eq('id', item_id) \
             .execute()
 
+        # Fase e orçamento são recalculados pelo trigger (sql/010)
         limpar_pdf_orcamento(orcamento_id)
         
-        recalcular_orcamento(orcamento_id)
-        
         return True, "Serviço removido!"
         
     except Exception as e:
@@ -792,6 +1144,7 @@ def delete_servico_fase(item_id: int, orcamento_id: int) -> tuple[bool, str]:
 # ALOCAÇÕES (AGENDA)
 # ============================================
 
+@cache_leitura('alocacoes', 'pessoas', 'obras', 'orcamentos', 'obra_fases')
 def get_alocacoes_dia(data: date) -> list:
     """Lista alocações de um dia"""
     try:
@@ -810,6 +1163,7 @@ def get_alocacoes_dia(data: date) -> list:
         return []
 
 
+@cache_leitura('alocacoes', 'pessoas', 'orcamentos', 'obra_fases')
 def get_alocacoes_obra(obra_id: int) -> list:
     """Lista alocações de uma obra"""
     try:
@@ -828,6 +1182,7 @@ def get_alocacoes_obra(obra_id: int) -> list:
         return []
 
 
+@invalida_cache('alocacoes')
 def create_alocacao(dados: dict) -> tuple[bool, str, dict]:
     """Cria uma nova alocação"""
     try:
@@ -841,6 +1196,7 @@ def create_alocacao(dados: dict) -> tuple[bool, str, dict]:
         return False, f"Erro ao criar alocação: {e}", {}
 
 
+@invalida_cache('alocacoes', 'apontamentos')
 def update_alocacao(alocacao_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza uma alocação"""
     try:
@@ -862,6 +1218,7 @@ def update_alocacao_confirmada(alocacao_id: int, confirmada: bool = True) -> tup
     return update_alocacao(alocacao_id, {'confirmada': confirmada})
 
 
+@invalida_cache('alocacoes')
 def delete_alocacao(alocacao_id: int) -> tuple[bool, str]:
     """Remove uma alocação"""
     try:
@@ -882,6 +1239,7 @@ def delete_alocacao(alocacao_id: int) -> tuple[bool, str]:
 # APONTAMENTOS
 # ============================================
 
+@cache_leitura('apontamentos', 'pessoas', 'obras', 'obra_fases')
 def get_apontamentos(obra_id: Optional[int] = None, data_inicio: Optional[date] = None, 
                      data_fim: Optional[date] = None) -> list:
     """Lista apontamentos com filtros"""
@@ -908,6 +1266,34 @@ def get_apontamentos(obra_id: Optional[int] = None, data_inicio: Optional[date]
         return []
 
 
+@cache_leitura('apontamentos', 'pessoas', 'obras', 'obra_fases')
+def get_apontamentos_pagina(obra_id: Optional[int] = None, data_inicio: Optional[date] = None,
+                            data_fim: Optional[date] = None, cursor: tuple | None = None,
+                            limite: int = PAGINA_TAMANHO_PADRAO) -> dict:
+    """Lista apontamentos com filtros, uma página por vez (keyset em data desc, id)"""
+    try:
+        supabase = get_supabase_client()
+        
+        query = supabase.table('apontamentos') \
+            .select('*, pessoas(nome), obras(titulo), obra_fases(nome_fase)')
+        
+        if obra_id:
+            query = query.eq('obra_id', obra_id)
+        
+        if data_inicio:
+            query = query.gte('data', data_inicio.isoformat())
+        
+        if data_fim:
+            query = query.lte('data', data_fim.isoformat())
+        
+        return _pagina(query, 'data', cursor, limite, desc=True)
+        
+    except Exception as e:
+        print(f"Erro ao buscar apontamentos: {e}")
+        return {}
+
+
+@invalida_cache('apontamentos')
 def create_apontamento(dados: dict) -> tuple[bool, str, dict]:
     """Cria um novo apontamento"""
     try:
@@ -923,6 +1309,7 @@ def create_apontamento(dados: dict) -> tuple[bool, str, dict]:
         return False, f"Erro ao registrar: {e}", {}
 
 
+@cache_leitura('apontamentos')
 def get_apontamento(apontamento_id: int) -> dict | None:
     """Busca um apontamento específico"""
     try:
@@ -937,6 +1324,7 @@ def get_apontamento(apontamento_id: int) -> dict | None:
         return None
 
 
+@invalida_cache('apontamentos')
 def update_apontamento(apontamento_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza um apontamento"""
     try:
@@ -955,6 +1343,7 @@ def update_apontamento(apontamento_id: int, dados: dict) -> tuple[bool, str]:
         return False, f"Erro ao atualizar: {e}"
 
 
+@invalida_cache('apontamentos')
 def delete_apontamento(apontamento_id: int) -> tuple[bool, str]:
     """Remove um apontamento"""
     try:
@@ -975,6 +1364,7 @@ def delete_apontamento(apontamento_id: int) -> tuple[bool, str]:
 # FINANCEIRO (ADMIN ONLY)
 # ============================================
 
+@cache_leitura('recebimentos', 'obra_fases', 'obras')
 def get_recebimentos(status: Optional[str] = None) -> list:
     """Lista recebimentos"""
     try:
@@ -994,6 +1384,27 @@ def get_recebimentos(status: Optional[str] = None) -> list:
         return []
 
 
+@cache_leitura('recebimentos', 'obra_fases', 'obras')
+def get_recebimentos_pagina(status: Optional[str] = None, cursor: tuple | None = None,
+                            limite: int = PAGINA_TAMANHO_PADRAO) -> dict:
+    """Lista recebimentos, uma página por vez (keyset em vencimento desc, id)"""
+    try:
+        supabase = get_supabase_client()
+        
+        query = supabase.table('recebimentos') \
+            .select('*, obra_fases(nome_fase, obras(titulo))')
+        
+        if status:
+            query = query.eq('status', status)
+        
+        return _pagina(query, 'vencimento', cursor, limite, desc=True)
+        
+    except Exception as e:
+        print(f"Erro ao buscar recebimentos: {e}")
+        return {}
+
+
+@invalida_cache('recebimentos')
 def update_recebimento(recebimento_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza um recebimento"""
     try:
@@ -1010,6 +1421,7 @@ def update_recebimento(recebimento_id: int, dados: dict) -> tuple[bool, str]:
         return False, f"Erro ao atualizar: {e}"
 
 
+@invalida_cache('recebimentos')
 def delete_recebimento(recebimento_id: int) -> tuple[bool, str]:
     """Remove um recebimento"""
     try:
@@ -1026,6 +1438,7 @@ def delete_recebimento(recebimento_id: int) -> tuple[bool, str]:
         return False, f"Erro ao remover: {e}"
 
 
+@invalida_cache('recebimentos')
 def create_recebimento(dados: dict) -> tuple[bool, str, dict]:
     """Cria um novo recebimento"""
     try:
@@ -1039,6 +1452,7 @@ def create_recebimento(dados: dict) -> tuple[bool, str, dict]:
         return False, f"Erro ao criar: {e}", {}
 
 
+@invalida_cache('recebimentos')
 def update_recebimento_status(recebimento_id: int, novo_status: str, recebido_em: Optional[date] = None) -> tuple[bool, str]:
     """Atualiza o status de um recebimento"""
     try:
@@ -1059,6 +1473,7 @@ def update_recebimento_status(recebimento_id: int, novo_status: str, recebido_em
         return False, f"Erro ao atualizar: {e}"
 
 
+@cache_leitura('pagamentos', 'pessoas')
 def get_pagamentos(status: Optional[str] = None) -> list:
     """Lista pagamentos"""
     try:
@@ -1077,6 +1492,29 @@ def get_pagamentos(status: Optional[str] = None) -> list:
         return []
 
 
+@cache_leitura('pagamentos', 'pessoas')
+def get_pagamentos_pagina(status: Optional[str] = None, busca: str = "",
+                          cursor: tuple | None = None, limite: int = PAGINA_TAMANHO_PADRAO) -> dict:
+    """Lista pagamentos, uma página por vez (keyset em criado_em desc, id)"""
+    try:
+        supabase = get_supabase_client()
+        
+        query = supabase.table('pagamentos').select('*, pessoas(nome)')
+        
+        if status:
+            query = query.eq('status', status)
+        
+        if busca:
+            query = query.or_(f"tipo.ilike.%{busca}%,observacao.ilike.%{busca}%")
+        
+        return _pagina(query, 'criado_em', cursor, limite, desc=True)
+        
+    except Exception as e:
+        print(f"Erro ao buscar pagamentos: {e}")
+        return {}
+
+
+@invalida_cache('pagamentos')
 def update_pagamento(pagamento_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza um pagamento"""
     try:
@@ -1093,6 +1531,7 @@ def update_pagamento(pagamento_id: int, dados: dict) -> tuple[bool, str]:
         return False, f"Erro ao atualizar pagamento: {e}"
 
 
+@invalida_cache('pagamentos', 'pagamento_itens')
 def delete_pagamento(pagamento_id: int) -> tuple[bool, str]:
     """Remove um pagamento"""
     try:
@@ -1114,6 +1553,7 @@ def delete_pagamento(pagamento_id: int) -> tuple[bool, str]:
         return False, f"Erro ao remover pagamento: {e}"
 
 
+@cache_leitura('pagamento_itens', 'apontamentos', 'pessoas', 'obras', 'obra_fases')
 def get_pagamento_itens(pagamento_id: int) -> list:
     """Lista itens de um pagamento"""
     try:
@@ -1132,6 +1572,7 @@ def get_pagamento_itens(pagamento_id: int) -> list:
         return []
 
 
+@invalida_cache('pagamentos')
 def create_pagamento(dados: dict) -> tuple[bool, str, dict]:
     """Cria um novo pagamento"""
     try:
@@ -1145,6 +1586,40 @@ def create_pagamento(dados: dict) -> tuple[bool, str, dict]:
         return False, f"Erro ao criar pagamento: {e}", {}
 
 
+@invalida_cache('pagamentos', 'pagamento_itens')
+def create_pagamento_com_itens(dados: dict, itens: list) -> tuple[bool, str, dict]:
+    """
+    Cria um pagamento e todos os seus itens em uma única transação
+
+    Args:
+        dados: Campos do pagamento (tipo, referencia_inicio, ...)
+        itens: Lista de dicts com apontamento_id, valor e observacao (opcional)
+
+    Returns:
+        tuple: (sucesso, mensagem, pagamento com valor_total já recalculado)
+    """
+    try:
+        supabase = get_supabase_client()
+
+        response = supabase.rpc('fn_criar_pagamento_com_itens', {
+            'p_pagamento': dados,
+            'p_itens': [
+                {
+                    'apontamento_id': item['apontamento_id'],
+                    'valor': float(item.get('valor', 0) or 0),
+                    'observacao': item.get('observacao') or ''
+                }
+                for item in itens
+            ]
+        }).execute()
+
+        return True, "Pagamento criado!", response.data or {}
+
+    except Exception as e:
+        return False, f"Erro ao criar pagamento: {_extract_db_error_message(e)}", {}
+
+
+@invalida_cache('pagamentos')
 def update_pagamento_status(pagamento_id: int, novo_status: str, pago_em: Optional[date] = None) -> tuple[bool, str]:
     """Atualiza o status de um pagamento"""
     try:
@@ -1165,6 +1640,7 @@ def update_pagamento_status(pagamento_id: int, novo_status: str, pago_em: Option
         return False, f"Erro ao atualizar pagamento: {e}"
 
 
+@invalida_cache('pagamento_itens', 'pagamentos')
 def create_pagamento_item(pagamento_id: int, apontamento_id: int, valor: float, observacao: str = "") -> tuple[bool, str, dict]:
     """Adiciona um item a um pagamento"""
     try:
@@ -1183,6 +1659,7 @@ def create_pagamento_item(pagamento_id: int, apontamento_id: int, valor: float,
         return False, f"Erro ao adicionar item: {e}", {}
 
 
+@invalida_cache('pagamento_itens', 'pagamentos')
 def delete_pagamento_item(item_id: int) -> tuple[bool, str]:
     """Remove um item de pagamento"""
     try:
@@ -1194,15 +1671,135 @@ def delete_pagamento_item(item_id: int) -> tuple[bool, str]:
             .execute()
         
         return True, "Item removido!"
-        
+
     except Exception as e:
         return False, f"Erro ao remover item: {e}"
 
 
+@cache_leitura('recebimentos', 'obra_fases', 'obras', 'pagamentos')
+def get_relatorio_financeiro(inicio: date, fim: date) -> dict:
+    """
+    Relatório financeiro do período (recebimentos e pagamentos PAGO)
+
+    Filtros e totais são feitos no banco via fn_relatorio_financeiro.
+
+    Args:
+        inicio: Primeiro dia do período (inclusivo)
+        fim: Último dia do período (inclusivo)
+
+    Returns:
+        dict com 'recebimentos' e 'pagamentos' (listas de data_ref,
+        descricao e valor), 'total_recebimentos', 'total_pagamentos' e 'saldo'
+        ({} em caso de erro)
+    """
+    try:
+        supabase = get_supabase_client()
+
+        response = supabase.rpc('fn_relatorio_financeiro', {
+            'p_inicio': inicio.isoformat(),
+            'p_fim': fim.isoformat()
+        }).execute()
+
+        relatorio = response.data or {}
+
+        def _linhas(itens: list) -> list:
+            return [
+                {
+                    'data_ref': item.get('data_ref'),
+                    'descricao': item.get('descricao', '-'),
+                    'valor': float(item.get('valor') or 0)
+                }
+                for item in (itens or [])
+            ]
+
+        return {
+            'recebimentos': _linhas(relatorio.get('recebimentos')),
+            'pagamentos': _linhas(relatorio.get('pagamentos')),
+            'total_recebimentos': float(relatorio.get('total_recebimentos') or 0),
+            'total_pagamentos': float(relatorio.get('total_pagamentos') or 0),
+            'saldo': float(relatorio.get('saldo') or 0)
+        }
+
+    except Exception as e:
+        print(f"Erro ao buscar relatório financeiro: {e}")
+        return {}
+
+
+# ============================================
+# RESUMO FINANCEIRO POR OBRA
+# ============================================
+
+@cache_leitura('obra_financeiro_resumo', 'obras', 'orcamentos', 'obra_fases',
+               'recebimentos', 'pagamentos', 'pagamento_itens', 'apontamentos')
+def get_financeiro_por_obra() -> list:
+    """
+    Resumo financeiro por obra (tabela obra_financeiro_resumo, mantida por triggers)
+    
+    Returns:
+        Lista com obra_id, titulo, status, valor_orcado, recebido, pago,
+        lucro e desvio, ordenada pelo título da obra
+    """
+    try:
+        supabase = get_supabase_client()
+        
+        response = supabase.table('obra_financeiro_resumo') \
+            .select('obra_id, valor_orcado, recebido, pago, lucro, desvio, atualizado_em, obras(titulo, status)') \
+            .execute()
+        
+        resumo = []
+        for linha in response.data or []:
+            obra = linha.pop('obras', None) or {}
+            linha['titulo'] = obra.get('titulo', '-')
+            linha['status'] = obra.get('status')
+            for campo in ('recebido', 'pago', 'lucro'):
+                linha[campo] = float(linha.get(campo) or 0)
+            for campo in ('valor_orcado', 'desvio'):
+                if linha.get(campo) is not None:
+                    linha[campo] = float(linha[campo])
+            resumo.append(linha)
+        
+        return sorted(resumo, key=lambda r: (r['titulo'] or '').lower())
+        
+    except Exception as e:
+        print(f"Erro ao buscar resumo financeiro por obra: {e}")
+        return []
+
+
+def verificar_financeiro_por_obra() -> tuple[bool, str, list]:
+    """
+    Compara o resumo com o cálculo direto nas views (RPC fn_obra_financeiro_verificar)
+    
+    Returns:
+        (sucesso, mensagem, divergencias) - cada divergência traz obra_id,
+        titulo, resumo e esperado
+    """
+    try:
+        supabase = get_supabase_client()
+        response = supabase.rpc('fn_obra_financeiro_verificar', {}).execute()
+        divergencias = response.data or []
+        if divergencias:
+            return True, f"{len(divergencias)} obra(s) com resumo divergente.", divergencias
+        return True, "Resumo consistente com as tabelas de origem.", []
+    except Exception as e:
+        return False, f"Erro ao verificar resumo: {e}", []
+
+
+@invalida_cache('obra_financeiro_resumo')
+def reconstruir_financeiro_por_obra() -> tuple[bool, str]:
+    """Recalcula o resumo de todas as obras a partir das tabelas de origem"""
+    try:
+        supabase = get_supabase_client()
+        response = supabase.rpc('fn_obra_financeiro_reconstruir', {}).execute()
+        return True, f"Resumo reconstruído ({response.data or 0} obras)."
+    except Exception as e:
+        return False, f"Erro ao reconstruir resumo: {e}"
+
+
 # ============================================
 # USUÁRIOS (ADMIN ONLY)
 # ============================================
 
+@cache_leitura('usuarios_app')
 def get_usuarios_app() -> list:
     """Lista usuários do app"""
     try:
@@ -1220,6 +1817,7 @@ def get_usuarios_app() -> list:
         return []
 
 
+@invalida_cache('usuarios_app')
 def update_usuario_app(usuario_id: int, dados: dict) -> tuple[bool, str]:
     """Atualiza um usuário do app"""
     try:
@@ -1230,6 +1828,8 @@ def update_usuario_app(usuario_id: int, dados: dict) -> tuple[bool, str]:
             .eq('id', usuario_id) \
             .execute()
         
+        invalidar_perfil(usuario_id=usuario_id)
+        
         return True, "Usuário atualizado!"
         
     except Exception as e:
@@ -1240,40 +1840,72 @@ def update_usuario_app(usuario_id: int, dados: dict) -> tuple[bool, str]:
 # AUDITORIA
 # ============================================
 
-def get_auditoria(entidade: Optional[str] = None, data_inicio: Optional[date] = None,
-                  data_fim: Optional[date] = None, busca: Optional[str] = None,
-                  busca_texto: Optional[str] = None, limite: int = 10) -> list:
-    """Lista registros de auditoria"""
+# Auditoria sem cache: os triggers e o escritor em lote gravam fora de
+# invalida_cache, e quem investiga quer ver a ação que acabou de acontecer
+def get_auditoria_pagina(texto: Optional[str] = None, entidade: Optional[str] = None,
+                         entidade_id: Optional[str] = None, usuario: Optional[str] = None,
+                         acao: Optional[str] = None, campo: Optional[str] = None,
+                         data_inicio: Optional[date] = None, data_fim: Optional[date] = None,
+                         cursor: tuple | None = None, limite: int = PAGINA_TAMANHO_PADRAO) -> dict:
+    """
+    Busca na auditoria, uma página por vez (RPC fn_auditoria_buscar)
+    
+    Args:
+        texto: busca livre em usuário/entidade/ação e no conteúdo antes/depois
+        campo: só registros em que esse campo mudou (ex: 'valor_total')
+        cursor: (criado_em, id) do último registro da página anterior
+    
+    Returns:
+        {'itens': [...], 'proximo_cursor': (criado_em, id) ou None}
+    """
     try:
         supabase = get_supabase_client()
         
-        query = supabase.table('auditoria').select('*')
+        params = {
+            'p_texto': texto or None,
+            'p_entidade': entidade or None,
+            'p_entidade_id': str(entidade_id) if entidade_id else None,
+            'p_usuario': usuario or None,
+            'p_acao': acao or None,
+            'p_campo': campo or None,
+            'p_inicio': data_inicio.isoformat() if data_inicio else None,
+            'p_fim': (data_fim + timedelta(days=1)).isoformat() if data_fim else None,
+            'p_cursor_criado_em': cursor[0] if cursor else None,
+            'p_cursor_id': cursor[1] if cursor else None,
+            'p_limite': limite + 1,
+        }
         
-        if entidade:
-            query = query.eq('entidade', entidade)
+        response = supabase.rpc('fn_auditoria_buscar', params).execute()
+        itens = response.data or []
         
-        if data_inicio:
-            query = query.gte('criado_em', data_inicio.isoformat())
+        proximo_cursor = None
+        if len(itens) > limite:
+            itens = itens[:limite]
+            proximo_cursor = (itens[-1]['criado_em'], itens[-1]['id'])
         
-        if data_fim:
-            query = query.lte('criado_em', f"{data_fim.isoformat()}T23:59:59")
+        return {'itens': itens, 'proximo_cursor': proximo_cursor}
         
-        if busca:
-            query = query.ilike('usuario', f'%{busca}%')
+    except Exception as e:
+        print(f"Erro ao buscar auditoria: {e}")
+        return {}
 
-        if busca_texto:
-            filtro = (
-                f"entidade.ilike.%{busca_texto}%,"
-                f"acao.ilike.%{busca_texto}%,"
-                f"usuario.ilike.%{busca_texto}%"
-            )
-            if busca_texto.isdigit():
-                filtro = f"{filtro},entidade_id.eq.{int(busca_texto)}"
-            query = query.or_(filtro)
 
-        response = query.order('criado_em', desc=True).limit(limite).execute()
-        return response.data or []
-        
+def get_auditoria_registro_em(entidade: str, entidade_id: str, momento: datetime) -> dict:
+    """
+    Reconstrói um registro como estava em `momento` a partir da auditoria
+    (RPC fn_auditoria_registro_em)
+    
+    Returns:
+        Colunas do registro, ou {} se não existia (ou foi excluído) nesse momento
+    """
+    try:
+        supabase = get_supabase_client()
+        response = supabase.rpc('fn_auditoria_registro_em', {
+            'p_entidade': entidade,
+            'p_entidade_id': str(entidade_id),
+            'p_momento': momento.isoformat(),
+        }).execute()
+        return response.data or {}
     except Exception as e:
-        print(f"Erro ao buscar auditoria: {e}")
-        return []
+        print(f"Erro ao reconstruir registro da auditoria: {e}")
+        return {}
@@ -62,3 +62,41 @@ def render_sidebar(profile: dict) -> None:
             st.rerun()
 
         st.markdown("---")
+
+
+def carregar_paginas(chave: str, buscar_pagina, **filtros) -> tuple[list, bool]:
+    """
+    Carrega as páginas já abertas de uma lista paginada (keyset).
+
+    Guarda na sessão só quantas páginas foram abertas; os itens vêm das
+    funções get_*_pagina (em cache), então escritas aparecem na hora.
+    Trocar os filtros volta para a primeira página.
+
+    Returns:
+        (itens, tem_mais)
+    """
+    assinatura = repr(sorted(filtros.items()))
+    estado = st.session_state.get(chave)
+    if not estado or estado['filtros'] != assinatura:
+        estado = {'filtros': assinatura, 'paginas': 1}
+        st.session_state[chave] = estado
+
+    itens = []
+    cursor = None
+    for _ in range(estado['paginas']):
+        pagina = buscar_pagina(cursor=cursor, **filtros)
+        itens.extend(pagina.get('itens', []))
+        cursor = pagina.get('proximo_cursor')
+        if not cursor:
+            break
+
+    return itens, cursor is not None
+
+
+def render_carregar_mais(chave: str, tem_mais: bool) -> None:
+    """Botão "Carregar mais" para listas de carregar_paginas."""
+    if not tem_mais:
+        return
+    if st.button("⬇️ Carregar mais", key=f"{chave}_carregar_mais", use_container_width=True):
+        st.session_state[chave]['paginas'] += 1
+        st.rerun()
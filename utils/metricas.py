@@ -0,0 +1,613 @@
+"""
+Métricas de latência da camada de dados
+
+Toda requisição ao Supabase (PostgREST, RPC, Storage, Auth) passa pelo pool
+HTTP compartilhado (utils/auth.py), cujo event hook chama registrar_requisicao:
+tabela, operação, filtros (só coluna/operador, sem valores), linhas, bytes e
+tempo.
+
+Agregação por processo:
+- por (página, tabela, operação, filtros): histograma de latência, linhas,
+  bytes e erros
+- por página: histogramas por rerun (tempo total, tempo de banco, nº de consultas)
+
+Cada página marca o próprio rerun com iniciar_rerun/finalizar_rerun.
+
+Profiler de reruns (PROFILER_RERUN=1 ou Configurações > Desempenho):
+- separa o tempo do rerun em banco, PDF (medir/medir_tempo) e renderização
+  (o restante: código da página + Streamlit)
+- identifica o gatilho do rerun (widgets com key que mudaram, ou navegação)
+- mantém um log rotativo dos reruns lentos (>= PROFILER_LIMITE_MS)
+
+Exportação (variáveis de ambiente / .env):
+- METRICAS_ARQUIVO: grava cada consulta em JSON Lines
+- METRICAS_PORTA: expõe /metrics no formato texto do Prometheus
+  (em METRICAS_HOST, padrão 127.0.0.1)
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # fora do Streamlit (scripts, testes)
+    get_script_run_ctx = None
+
+METRICAS_ATIVAS = os.getenv('METRICAS_ATIVAS', '1').lower() not in ('0', 'false', 'nao', 'não')
+METRICAS_ARQUIVO = os.getenv('METRICAS_ARQUIVO', '')
+METRICAS_PORTA = int(os.getenv('METRICAS_PORTA', '0') or 0)
+METRICAS_HOST = os.getenv('METRICAS_HOST', '127.0.0.1')
+
+PROFILER_RERUN = os.getenv('PROFILER_RERUN', '0').lower() not in ('0', 'false', 'nao', 'não')
+PROFILER_LIMITE_MS = float(os.getenv('PROFILER_LIMITE_MS', '1000'))
+PROFILER_LOG_MAXIMO = int(os.getenv('PROFILER_LOG_MAXIMO', '200'))
+
+# Limites dos histogramas (Prometheus: contagem acumulada por "le")
+LIMITES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100)
+
+PAGINA_SEGUNDO_PLANO = '-'
+MAXIMO_SESSOES = 1000
+
+# Parâmetros de URL do PostgREST que não são filtros
+_PARAMETROS_NAO_FILTRO = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+_OPERACOES = {
+    'GET': 'select',
+    'HEAD': 'count',
+    'POST': 'insert',
+    'PATCH': 'update',
+    'PUT': 'upsert',
+    'DELETE': 'delete',
+}
+
+
+class _Histograma:
+    """Histograma com limites fixos (contagens por faixa, soma e total)"""
+
+    __slots__ = ('limites', 'contagens', 'soma', 'total')
+
+    def __init__(self, limites: tuple):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # última faixa: +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        else:
+            self.contagens[-1] += 1
+        self.soma += valor
+        self.total += 1
+
+    def percentil(self, p: float) -> float | None:
+        """Limite superior da faixa que contém o percentil p (0-100)"""
+        if not self.total:
+            return None
+        alvo = self.total * p / 100
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return float(self.limites[i]) if i < len(self.limites) else float('inf')
+        return float('inf')
+
+    def resumo(self) -> dict:
+        return {
+            'total': self.total,
+            'media': round(self.soma / self.total, 2) if self.total else None,
+            'p50': self.percentil(50),
+            'p95': self.percentil(95),
+            'p99': self.percentil(99),
+        }
+
+
+_lock = threading.Lock()
+_lock_arquivo = threading.Lock()
+# (pagina, tabela, operacao, filtros) -> contadores
+_consultas: dict[tuple[str, str, str, str], dict] = {}
+# pagina -> histogramas por rerun
+_paginas: dict[str, dict] = {}
+# sessão -> rerun em andamento
+_reruns: dict[str, dict] = {}
+_servidor = None
+
+# Profiler (ajustável em tempo de execução pela tela de Configurações)
+_profiler = {'ativo': PROFILER_RERUN, 'limite_ms': PROFILER_LIMITE_MS}
+_reruns_lentos: deque = deque(maxlen=PROFILER_LOG_MAXIMO)
+# sessão -> (página, valores dos widgets com key) do rerun anterior
+_estado_widgets: dict[str, tuple[str, dict]] = {}
+
+
+def _sessao_atual() -> str | None:
+    """ID da sessão Streamlit da thread atual (None em threads de fundo)"""
+    if get_script_run_ctx is None:
+        return None
+    try:
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except TypeError:  # versões sem suppress_warning
+        ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+
+def _classificar(request) -> tuple[str, str]:
+    """(tabela, operação) a partir da URL e do método"""
+    partes = [p for p in urlsplit(str(request.url)).path.split('/') if p]
+    metodo = request.method.upper()
+
+    # /rest/v1/<tabela> | /rest/v1/rpc/<funcao> | /storage/v1/object/... | /auth/v1/...
+    if len(partes) >= 3 and partes[0] == 'rest':
+        if partes[2] == 'rpc' and len(partes) >= 4:
+            return partes[3], 'rpc'
+        operacao = _OPERACOES.get(metodo, metodo.lower())
+        if metodo == 'POST' and 'merge-duplicates' in request.headers.get('prefer', ''):
+            operacao = 'upsert'
+        return partes[2], operacao
+
+    if len(partes) >= 3 and partes[0] == 'storage':
+        # /storage/v1/object/<bucket>/...
+        tabela = partes[3] if len(partes) >= 4 and partes[2] == 'object' else partes[2]
+        return f"storage:{tabela}", _OPERACOES.get(metodo, metodo.lower())
+
+    if len(partes) >= 3 and partes[0] == 'auth':
+        return f"auth:{partes[2]}", metodo.lower()
+
+    return '/'.join(partes[:3]) or '-', metodo.lower()
+
+
+def _filtros(request) -> str:
+    """Filtros do PostgREST sem os valores: 'ativo=eq,nome=ilike'"""
+    filtros = []
+    for chave, valor in parse_qsl(urlsplit(str(request.url)).query, keep_blank_values=True):
+        if chave in _PARAMETROS_NAO_FILTRO:
+            continue
+        operador = valor.split('.', 1)[0] if chave not in ('or', 'and') else 'grupo'
+        filtros.append(f"{chave}={operador}")
+    return ','.join(sorted(filtros))
+
+
+def _linhas(response) -> int | None:
+    """Linhas devolvidas pelo PostgREST (Content-Range: 0-49/* ou */0)"""
+    faixa = response.headers.get('content-range')
+    if not faixa:
+        return None
+    intervalo = faixa.split('/', 1)[0]
+    if '-' not in intervalo:
+        return 0
+    try:
+        inicio, fim = intervalo.split('-', 1)
+        return int(fim) - int(inicio) + 1
+    except ValueError:
+        return None
+
+
+def _tamanho(mensagem) -> int:
+    try:
+        return len(mensagem.content or b'')
+    except Exception:  # corpo em streaming não lido
+        return int(mensagem.headers.get('content-length') or 0)
+
+
+def registrar_requisicao(request, response):
+    """
+    Registra uma requisição concluída (chamado pelo event hook do pool HTTP)
+
+    Nunca levanta exceção: métricas não podem quebrar a consulta.
+    """
+    if not METRICAS_ATIVAS:
+        return
+    try:
+        # Lê o corpo aqui para medir o tempo total e o tamanho da resposta
+        response.read()
+        tabela, operacao = _classificar(request)
+        registrar_consulta(
+            tabela, operacao, _filtros(request),
+            duracao_ms=response.elapsed.total_seconds() * 1000,
+            status=response.status_code,
+            linhas=_linhas(response),
+            bytes_enviados=_tamanho(request),
+            bytes_recebidos=_tamanho(response),
+        )
+    except Exception as e:
+        print(f"Erro ao registrar métrica: {e}")
+
+
+def registrar_consulta(tabela: str, operacao: str, filtros: str, duracao_ms: float,
+                       status: int = 200, linhas: int | None = None,
+                       bytes_enviados: int = 0, bytes_recebidos: int = 0):
+    """
+    Registra uma consulta já classificada
+
+    Usado por registrar_requisicao e pelo backend local (utils/supabase_local.py),
+    que não passa pelo pool HTTP.
+    """
+    if not METRICAS_ATIVAS:
+        return
+    try:
+        erro = status >= 400
+        sessao = _sessao_atual()
+
+        with _lock:
+            rerun = _reruns.get(sessao) if sessao else None
+            pagina = rerun['pagina'] if rerun else PAGINA_SEGUNDO_PLANO
+            if rerun:
+                rerun['consultas'] += 1
+                rerun['tempo_db_ms'] += duracao_ms
+
+            chave = (pagina, tabela, operacao, filtros)
+            contadores = _consultas.get(chave)
+            if contadores is None:
+                contadores = _consultas[chave] = {
+                    'latencia_ms': _Histograma(LIMITES_MS),
+                    'linhas': 0,
+                    'bytes_enviados': 0,
+                    'bytes_recebidos': 0,
+                    'erros': 0,
+                }
+            contadores['latencia_ms'].observar(duracao_ms)
+            contadores['linhas'] += linhas or 0
+            contadores['bytes_enviados'] += bytes_enviados
+            contadores['bytes_recebidos'] += bytes_recebidos
+            contadores['erros'] += int(erro)
+
+        _iniciar_servidor()
+
+        if METRICAS_ARQUIVO:
+            _gravar_arquivo({
+                'ts': time.time(),
+                'pagina': pagina,
+                'tabela': tabela,
+                'operacao': operacao,
+                'filtros': filtros,
+                'status': status,
+                'linhas': linhas,
+                'bytes_enviados': bytes_enviados,
+                'bytes_recebidos': bytes_recebidos,
+                'duracao_ms': round(duracao_ms, 3),
+            })
+    except Exception as e:
+        print(f"Erro ao registrar métrica: {e}")
+
+
+def iniciar_rerun(pagina: str):
+    """
+    Marca o início de um rerun da página
+
+    Prefira medir_rerun, que fecha o rerun no mesmo script mesmo com
+    st.rerun, st.stop ou exceção. Um rerun anterior ainda aberto na sessão é
+    descartado: a duração incluiria o tempo ocioso até a próxima interação.
+    """
+    if not METRICAS_ATIVAS:
+        return
+    sessao = _sessao_atual()
+    if sessao is None:
+        return
+
+    rerun = {
+        'pagina': pagina,
+        'inicio': time.perf_counter(),
+        'consultas': 0,
+        'tempo_db_ms': 0.0,
+        'tempos': {},
+        'profiler': _profiler['ativo'],
+    }
+    if rerun['profiler']:
+        rerun['gatilho'], rerun['usuario'] = _contexto_rerun(sessao, pagina)
+
+    with _lock:
+        _reruns.pop(sessao, None)
+        _reruns[sessao] = rerun
+        # Sessão encerrada no meio do script deixa o rerun aberto
+        while len(_reruns) > MAXIMO_SESSOES:
+            del _reruns[next(iter(_reruns))]
+
+
+def finalizar_rerun() -> dict | None:
+    """Marca o fim do rerun da sessão atual; retorna o rerun fechado"""
+    if not METRICAS_ATIVAS:
+        return None
+    sessao = _sessao_atual()
+    if sessao is None:
+        return None
+    with _lock:
+        rerun = _reruns.pop(sessao, None)
+        if rerun:
+            _fechar_rerun(rerun)
+    return rerun
+
+
+@contextmanager
+def medir_rerun(pagina: str):
+    """Mede o script da página inteiro: `with medir_rerun('Obras'):` no topo"""
+    iniciar_rerun(pagina)
+    try:
+        yield
+    finally:
+        # st.rerun/st.stop são exceções: o rerun fecha neste mesmo script
+        finalizar_rerun()
+
+
+def _fechar_rerun(rerun: dict):
+    """Soma o rerun aos histogramas da página (chamar com _lock)"""
+    rerun['duracao_ms'] = (time.perf_counter() - rerun['inicio']) * 1000
+    pagina = _paginas.get(rerun['pagina'])
+    if pagina is None:
+        pagina = _paginas[rerun['pagina']] = {
+            'rerun_ms': _Histograma(LIMITES_MS),
+            'rerun_db_ms': _Histograma(LIMITES_MS),
+            'rerun_consultas': _Histograma(LIMITES_CONSULTAS),
+        }
+    pagina['rerun_ms'].observar(rerun['duracao_ms'])
+    pagina['rerun_db_ms'].observar(rerun['tempo_db_ms'])
+    pagina['rerun_consultas'].observar(rerun['consultas'])
+
+    if not rerun['profiler']:
+        return
+
+    rerun['render_ms'] = max(
+        0.0, rerun['duracao_ms'] - rerun['tempo_db_ms'] - sum(rerun['tempos'].values())
+    )
+    pagina.setdefault('rerun_render_ms', _Histograma(LIMITES_MS)).observar(rerun['render_ms'])
+    for categoria, ms in rerun['tempos'].items():
+        pagina.setdefault(f'rerun_{categoria}_ms', _Histograma(LIMITES_MS)).observar(ms)
+
+    if rerun['duracao_ms'] >= _profiler['limite_ms']:
+        _reruns_lentos.append({
+            'quando': datetime.now().isoformat(timespec='seconds'),
+            'pagina': rerun['pagina'],
+            'usuario': rerun.get('usuario'),
+            'gatilho': rerun.get('gatilho'),
+            'total_ms': round(rerun['duracao_ms'], 1),
+            'db_ms': round(rerun['tempo_db_ms'], 1),
+            'consultas': rerun['consultas'],
+            **{f'{c}_ms': round(ms, 1) for c, ms in rerun['tempos'].items()},
+            'render_ms': round(rerun['render_ms'], 1),
+        })
+
+
+def _contexto_rerun(sessao: str, pagina: str) -> tuple[str, str | None]:
+    """
+    (gatilho, usuário) do rerun que começa
+
+    O Streamlit não informa qual widget disparou o rerun: compara os valores
+    dos widgets com key (em session_state) com os do rerun anterior.
+    """
+    try:
+        import streamlit as st
+        valores = {
+            chave: repr(valor)[:200]
+            for chave, valor in st.session_state.items()
+            if isinstance(valor, (str, int, float, bool, date, type(None)))
+            and not str(chave).startswith(('_', 'FormSubmitter'))
+        }
+        usuario = (st.session_state.get('user_profile') or {}).get('usuario')
+    except Exception:
+        return '-', None
+
+    with _lock:
+        anterior = _estado_widgets.pop(sessao, None)
+        _estado_widgets[sessao] = (pagina, valores)
+        # Sessões encerradas não avisam: descarta as mais antigas
+        while len(_estado_widgets) > MAXIMO_SESSOES:
+            del _estado_widgets[next(iter(_estado_widgets))]
+
+    if anterior is None:
+        return 'primeira carga', usuario
+    pagina_anterior, valores_anteriores = anterior
+    if pagina_anterior != pagina:
+        return f'navegação ({pagina_anterior} → {pagina})', usuario
+    mudaram = sorted(k for k in valores.keys() | valores_anteriores.keys()
+                     if valores.get(k) != valores_anteriores.get(k))
+    if not mudaram:
+        return 'rerun (widget sem key)', usuario
+    return ', '.join(mudaram[:3]) + (f' (+{len(mudaram) - 3})' if len(mudaram) > 3 else ''), usuario
+
+
+@contextmanager
+def medir(categoria: str):
+    """Soma o tempo do bloco à categoria (ex.: 'pdf') no rerun atual, se o profiler estiver ativo"""
+    sessao = _sessao_atual() if _profiler['ativo'] else None
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if sessao is not None:
+            ms = (time.perf_counter() - inicio) * 1000
+            with _lock:
+                rerun = _reruns.get(sessao)
+                if rerun and rerun['profiler']:
+                    rerun['tempos'][categoria] = rerun['tempos'].get(categoria, 0.0) + ms
+
+
+def medir_tempo(categoria: str):
+    """Decorator: mede a função com medir(categoria)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with medir(categoria):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_profiler() -> dict:
+    """Configuração atual do profiler ({'ativo', 'limite_ms'})"""
+    return dict(_profiler)
+
+
+def set_profiler(ativo: bool | None = None, limite_ms: float | None = None):
+    """Liga/desliga o profiler e ajusta o limite de rerun lento (vale para o processo)"""
+    if ativo is not None:
+        _profiler['ativo'] = bool(ativo)
+    if limite_ms is not None:
+        _profiler['limite_ms'] = max(0.0, float(limite_ms))
+
+
+def get_reruns_lentos() -> list:
+    """Log dos reruns lentos, mais recentes primeiro"""
+    with _lock:
+        return list(reversed(_reruns_lentos))
+
+
+def limpar_reruns_lentos():
+    with _lock:
+        _reruns_lentos.clear()
+
+
+def _gravar_arquivo(registro: dict):
+    try:
+        with _lock_arquivo:
+            with open(METRICAS_ARQUIVO, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro) + '\n')
+    except Exception as e:
+        print(f"Erro ao gravar arquivo de métricas: {e}")
+
+
+def get_metricas() -> dict:
+    """
+    Resumo das métricas do processo
+
+    Returns:
+        {'consultas': [...por página/tabela/operação/filtros], 'paginas': [...por página]}
+        com total, média e p50/p95/p99 (limite da faixa do histograma, em ms)
+    """
+    with _lock:
+        consultas = [
+            {
+                'pagina': pagina,
+                'tabela': tabela,
+                'operacao': operacao,
+                'filtros': filtros,
+                **c['latencia_ms'].resumo(),
+                'tempo_total_ms': round(c['latencia_ms'].soma, 2),
+                'linhas': c['linhas'],
+                'bytes_enviados': c['bytes_enviados'],
+                'bytes_recebidos': c['bytes_recebidos'],
+                'erros': c['erros'],
+            }
+            for (pagina, tabela, operacao, filtros), c in _consultas.items()
+        ]
+        paginas = [
+            {
+                'pagina': nome,
+                'reruns': p['rerun_ms'].total,
+                **{campo: h.resumo() for campo, h in p.items()},
+            }
+            for nome, p in _paginas.items()
+        ]
+    consultas.sort(key=lambda c: c['tempo_total_ms'], reverse=True)
+    paginas.sort(key=lambda p: p['pagina'])
+    return {'consultas': consultas, 'paginas': paginas}
+
+
+def limpar_metricas():
+    """Zera os contadores (os reruns em andamento continuam)"""
+    with _lock:
+        _consultas.clear()
+        _paginas.clear()
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(**rotulos) -> str:
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in rotulos.items()) + '}'
+
+
+def _linhas_histograma(nome: str, histograma: _Histograma, **rotulos) -> list:
+    linhas = []
+    acumulado = 0
+    for limite, contagem in zip(list(histograma.limites) + ['+Inf'], histograma.contagens):
+        acumulado += contagem
+        linhas.append(f"{nome}_bucket{_rotulos(**rotulos, le=limite)} {acumulado}")
+    linhas.append(f"{nome}_sum{_rotulos(**rotulos)} {histograma.soma:.3f}")
+    linhas.append(f"{nome}_count{_rotulos(**rotulos)} {histograma.total}")
+    return linhas
+
+
+def exportar_prometheus() -> str:
+    """Métricas no formato texto do Prometheus (exposition format 0.0.4)"""
+    saida = [
+        '# HELP sepol_db_consulta_ms Latência das requisições ao Supabase (ms)',
+        '# TYPE sepol_db_consulta_ms histogram',
+    ]
+    contadores = []
+    with _lock:
+        for (pagina, tabela, operacao, filtros), c in sorted(_consultas.items()):
+            rotulos = {'pagina': pagina, 'tabela': tabela, 'operacao': operacao, 'filtros': filtros}
+            saida.extend(_linhas_histograma('sepol_db_consulta_ms', c['latencia_ms'], **rotulos))
+            contadores.append((rotulos, c))
+
+        for campo, ajuda in (
+            ('linhas', 'Linhas devolvidas'),
+            ('bytes_enviados', 'Bytes enviados'),
+            ('bytes_recebidos', 'Bytes recebidos'),
+            ('erros', 'Respostas com erro (HTTP >= 400)'),
+        ):
+            saida.append(f'# HELP sepol_db_{campo}_total {ajuda}')
+            saida.append(f'# TYPE sepol_db_{campo}_total counter')
+            for rotulos, c in contadores:
+                saida.append(f"sepol_db_{campo}_total{_rotulos(**rotulos)} {c[campo]}")
+
+        ajudas = {
+            'rerun_ms': 'Duração do rerun da página (ms)',
+            'rerun_db_ms': 'Tempo de banco por rerun (ms)',
+            'rerun_consultas': 'Requisições ao Supabase por rerun',
+            'rerun_render_ms': 'Tempo de renderização por rerun (ms, profiler)',
+        }
+        campos = sorted({campo for p in _paginas.values() for campo in p})
+        for campo in campos:
+            ajuda = ajudas.get(campo, f"Tempo de {campo[len('rerun_'):-len('_ms')]} por rerun (ms, profiler)")
+            saida.append(f'# HELP sepol_{campo} {ajuda}')
+            saida.append(f'# TYPE sepol_{campo} histogram')
+            for pagina, p in sorted(_paginas.items()):
+                if campo in p:
+                    saida.extend(_linhas_histograma(f'sepol_{campo}', p[campo], pagina=pagina))
+
+    return '\n'.join(saida) + '\n'
+
+
+class _MetricasHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        corpo = exportar_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _iniciar_servidor():
+    """Sobe o endpoint /metrics uma vez por processo (se METRICAS_PORTA)"""
+    global _servidor
+    if not METRICAS_PORTA or _servidor is not None:
+        return
+    with _lock:
+        if _servidor is not None:
+            return
+        try:
+            _servidor = ThreadingHTTPServer((METRICAS_HOST, METRICAS_PORTA), _MetricasHandler)
+        except OSError as e:
+            # Porta ocupada (outro processo já expõe): não tenta de novo
+            print(f"Erro ao abrir endpoint de métricas na porta {METRICAS_PORTA}: {e}")
+            _servidor = False
+            return
+    threading.Thread(target=_servidor.serve_forever, name='metricas-http', daemon=True).start()
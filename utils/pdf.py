@@ -7,6 +7,7 @@ from fpdf import FPDF
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
+from utils.metricas import medir_tempo
 
 LOGO_PATH = Path(__file__).resolve().parents[1] / "assets" / "logo.png"
 
@@ -134,6 +135,7 @@ def _formatar_data(valor: Optional[object]) -> str:
         return str(valor)
 
 
+@medir_tempo('pdf')
 def gerar_pdf_orcamento(orcamento: dict, fases: list, servicos_por_fase: dict) -> bytes:
     """
     Gera o PDF de um orçamento
@@ -296,6 +298,7 @@ def gerar_pdf_orcamento(orcamento: dict, fases: list, servicos_por_fase: dict) -
     return pdf_bytes
 
 
+@medir_tempo('pdf')
 def gerar_pdf_extrato_financeiro(mes: int, ano: int, recebimentos: list, pagamentos: list, resumo: dict) -> bytes:
     """
     Gera o PDF do extrato financeiro mensal.
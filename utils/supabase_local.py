@@ -0,0 +1,2002 @@
+"""
+Backend Supabase local (em memória, sem rede)
+
+Substitui o client do Supabase quando SUPABASE_LOCAL=1: get_supabase_client()
+devolve um ClienteLocal com a mesma interface usada pelo app:
+
+- table(...).select(...) com embeds (obras(titulo), *, clientes(*)) e filtros
+  em colunas embutidas (obra_fases.orcamento_id)
+- eq, neq, gt, gte, lt, lte, like, ilike, is_, in_, not_, or_ (com and(...))
+- order, limit, range, count='exact', single, maybe_single
+- insert, upsert, update, delete (retornam as linhas, como Prefer: return=representation)
+- rpc das funções do sql/ (dashboard, relatório, busca, recálculos, auditoria,
+  resumo financeiro)
+- auth.sign_in_with_password / sign_out
+- storage.from_(bucket).upload / download / remove / get_public_url (em
+  memória ou numa pasta, para os PDFs de orçamento)
+
+O banco é um só por processo (todas as sessões veem os mesmos dados) e
+reproduz em Python os triggers do sql/: totais de orçamento, rateio de
+apontamentos, total de pagamentos, auditoria (camada/modo), resumo financeiro
+por obra, regras de fases/recebimentos, chaves únicas, FKs (cascade/restrict/
+set null). Cada chamada é atômica (erro desfaz tudo).
+
+Não reproduz: RLS (todo usuário vê tudo), CHECKs de domínio, partições da
+auditoria. A busca textual (fn_buscar, fn_auditoria_buscar) é aproximada.
+
+Feito para testes de carga e benchmarks no notebook; não use em produção.
+
+Variáveis de ambiente / .env:
+- SUPABASE_LOCAL: 1 liga o backend local
+- SUPABASE_LOCAL_DADOS: arquivo .json/.json.gz carregado na criação do banco
+- SUPABASE_LOCAL_LATENCIA_MS: espera por chamada (simula a rede)
+- SUPABASE_LOCAL_STORAGE: pasta dos objetos do Storage (padrão: em memória)
+- SUPABASE_LOCAL_EMAIL / SUPABASE_LOCAL_SENHA: login do ADMIN criado quando
+  não há usuários (padrão admin@sepol.local / admin)
+"""
+
+import copy
+import gzip
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
+from difflib import SequenceMatcher
+from types import SimpleNamespace
+
+from utils.metricas import registrar_consulta
+
+SUPABASE_LOCAL = os.getenv('SUPABASE_LOCAL', '0').lower() not in ('0', 'false', 'nao', 'não', '')
+SUPABASE_LOCAL_DADOS = os.getenv('SUPABASE_LOCAL_DADOS', '')
+SUPABASE_LOCAL_LATENCIA_MS = float(os.getenv('SUPABASE_LOCAL_LATENCIA_MS', '0') or 0)
+SUPABASE_LOCAL_STORAGE = os.getenv('SUPABASE_LOCAL_STORAGE', '')
+SUPABASE_LOCAL_EMAIL = os.getenv('SUPABASE_LOCAL_EMAIL', 'admin@sepol.local')
+SUPABASE_LOCAL_SENHA = os.getenv('SUPABASE_LOCAL_SENHA', 'admin')
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+
+# =========================================================
+# ESQUEMA (espelho de sql/001 a sql/019)
+# =========================================================
+
+# tabela -> coluna -> padrão (callable: calculado na inserção)
+_COLUNAS = {
+    'usuarios_app': {
+        'id': None, 'auth_user_id': None, 'usuario': None, 'perfil': None,
+        'ativo': True, 'criado_em': _agora, 'atualizado_em': _agora,
+    },
+    'auditoria': {
+        'id': None, 'usuario': None, 'entidade': None, 'entidade_id': None, 'acao': None,
+        'antes_json': None, 'depois_json': None, 'criado_em': _agora,
+    },
+    'auditoria_camadas': {'entidade': None, 'camada': 'BANCO', 'modo': 'DIFF'},
+    'clientes': {
+        'id': None, 'nome': None, 'telefone': None, 'endereco': None,
+        'ativo': True, 'criado_em': _agora,
+    },
+    'pessoas': {
+        'id': None, 'nome': None, 'tipo': None, 'telefone': None, 'diaria_base': 0,
+        'observacao': None, 'ativo': True, 'criado_em': _agora,
+    },
+    'obras': {
+        'id': None, 'cliente_id': None, 'titulo': None, 'endereco_obra': None,
+        'status': 'AGUARDANDO', 'ativo': True, 'criado_em': _agora,
+    },
+    'orcamentos': {
+        'id': None, 'obra_id': None, 'versao': 1, 'status': 'RASCUNHO',
+        'valor_total': 0, 'desconto_valor': 0, 'valor_total_final': 0,
+        'aprovado_em': None, 'cancelado_em': None, 'observacao': None,
+        'pdf_url': None, 'pdf_emitido_em': None, 'valido_ate': None, 'criado_em': _agora,
+    },
+    'obra_fases': {
+        'id': None, 'obra_id': None, 'orcamento_id': None, 'nome_fase': None, 'ordem': 1,
+        'status': 'PENDENTE', 'valor_fase': 0, 'criado_em': _agora,
+    },
+    'servicos': {'id': None, 'nome': None, 'unidade': 'UN', 'ativo': True, 'criado_em': _agora},
+    'orcamento_fase_servicos': {
+        'id': None, 'obra_fase_id': None, 'servico_id': None, 'quantidade': 1,
+        'valor_unit': 0, 'valor_total': 0, 'observacao': None, 'criado_em': _agora,
+    },
+    'alocacoes': {
+        'id': None, 'data': None, 'pessoa_id': None, 'obra_id': None, 'orcamento_id': None,
+        'obra_fase_id': None, 'periodo': 'INTEGRAL', 'tipo': 'INTERNO', 'observacao': None,
+        'confirmada': False, 'criado_em': _agora,
+    },
+    'apontamentos': {
+        'id': None, 'obra_id': None, 'orcamento_id': None, 'obra_fase_id': None,
+        'pessoa_id': None, 'data': None, 'tipo_dia': 'NORMAL', 'valor_base': 0,
+        'acrescimo_pct': 0, 'desconto_valor': 0, 'valor_final': 0, 'observacao': None,
+        'criado_em': _agora, 'valor_bruto': 0, 'valor_rateado': 0,
+    },
+    'recebimentos': {
+        'id': None, 'obra_fase_id': None, 'valor': 0, 'vencimento': None,
+        'recebido_em': None, 'status': 'ABERTO', 'observacao': None, 'criado_em': _agora,
+    },
+    'pagamentos': {
+        'id': None, 'tipo': 'SEMANAL', 'referencia_inicio': None, 'referencia_fim': None,
+        'obra_fase_id': None, 'pessoa_id': None, 'valor_total': 0, 'status': 'PENDENTE',
+        'pago_em': None, 'observacao': None, 'criado_em': _agora,
+    },
+    'pagamento_itens': {
+        'id': None, 'pagamento_id': None, 'apontamento_id': None, 'valor': 0,
+        'observacao': None, 'criado_em': _agora,
+    },
+    'obra_financeiro_resumo': {
+        'obra_id': None, 'valor_orcado': None, 'recebido': 0, 'pago': 0,
+        'lucro': None, 'desvio': None, 'atualizado_em': _agora,
+    },
+}
+
+_CHAVE_PRIMARIA = {'auditoria_camadas': 'entidade', 'obra_financeiro_resumo': 'obra_id'}
+
+# Colunas NOT NULL sem padrão (as com padrão não nulo também são NOT NULL)
+_OBRIGATORIAS = {
+    'usuarios_app': ('auth_user_id', 'usuario', 'perfil'),
+    'auditoria': ('entidade', 'acao'),
+    'clientes': ('nome',),
+    'pessoas': ('nome', 'tipo'),
+    'obras': ('titulo',),
+    'orcamentos': ('obra_id',),
+    'obra_fases': ('obra_id', 'orcamento_id', 'nome_fase'),
+    'servicos': ('nome',),
+    'orcamento_fase_servicos': ('obra_fase_id', 'servico_id'),
+    'alocacoes': ('data',),
+    'apontamentos': ('data',),
+    'recebimentos': ('obra_fase_id',),
+    'pagamento_itens': ('pagamento_id',),
+}
+
+# tabela -> coluna -> (tabela referenciada, ação no delete)
+_FKS = {
+    'obras': {'cliente_id': ('clientes', 'restrict')},
+    'orcamentos': {'obra_id': ('obras', 'cascade')},
+    'obra_fases': {'obra_id': ('obras', 'cascade'), 'orcamento_id': ('orcamentos', 'cascade')},
+    'orcamento_fase_servicos': {
+        'obra_fase_id': ('obra_fases', 'cascade'), 'servico_id': ('servicos', 'restrict'),
+    },
+    'alocacoes': {
+        'pessoa_id': ('pessoas', 'restrict'), 'obra_id': ('obras', 'restrict'),
+        'orcamento_id': ('orcamentos', 'set null'), 'obra_fase_id': ('obra_fases', 'set null'),
+    },
+    'apontamentos': {
+        'obra_id': ('obras', 'restrict'), 'orcamento_id': ('orcamentos', 'cascade'),
+        'obra_fase_id': ('obra_fases', 'set null'), 'pessoa_id': ('pessoas', 'restrict'),
+    },
+    'recebimentos': {'obra_fase_id': ('obra_fases', 'cascade')},
+    'pagamentos': {'obra_fase_id': ('obra_fases', 'set null'), 'pessoa_id': ('pessoas', 'set null')},
+    'pagamento_itens': {
+        'pagamento_id': ('pagamentos', 'cascade'), 'apontamento_id': ('apontamentos', 'set null'),
+    },
+    'obra_financeiro_resumo': {'obra_id': ('obras', 'cascade')},
+}
+
+_UNICOS = {
+    'usuarios_app': [('auth_user_id',), ('usuario',)],
+    'orcamentos': [('obra_id', 'versao')],
+    'obra_fases': [('orcamento_id', 'ordem')],
+    'servicos': [('nome',)],
+    'orcamento_fase_servicos': [('obra_fase_id', 'servico_id')],
+    'apontamentos': [('obra_id', 'pessoa_id', 'data', 'orcamento_id')],
+    'recebimentos': [('obra_fase_id',)],
+}
+
+_NUMERICAS = {
+    'diaria_base', 'valor_total', 'desconto_valor', 'valor_total_final', 'valor_fase',
+    'quantidade', 'valor_unit', 'valor_base', 'acrescimo_pct', 'valor_final', 'valor_bruto',
+    'valor_rateado', 'valor', 'valor_orcado', 'recebido', 'pago', 'lucro', 'desvio',
+}
+
+_TIMESTAMPS = {'criado_em', 'atualizado_em', 'aprovado_em', 'cancelado_em', 'pdf_emitido_em'}
+
+# Tabelas com trigger de auditoria (sql/001, 012)
+_AUDITADAS = {
+    'clientes', 'pessoas', 'obras', 'orcamentos', 'obra_fases', 'servicos',
+    'orcamento_fase_servicos', 'alocacoes', 'apontamentos', 'recebimentos',
+    'pagamentos', 'pagamento_itens',
+}
+
+_CAMADAS_PADRAO = [{'entidade': e, 'camada': 'BANCO', 'modo': 'DIFF'} for e in sorted(_AUDITADAS)]
+_CAMADAS_PADRAO.append({'entidade': 'usuarios_app', 'camada': 'APP', 'modo': 'DIFF'})
+
+
+class ErroLocal(Exception):
+    """Erro no formato do APIError do postgrest (message/code/details/hint)"""
+
+    def __init__(self, message: str, code: str = 'P0001', details: str = None, hint: str = None):
+        self.message = message
+        self.code = code
+        self.details = details
+        self.hint = hint
+        super().__init__(message)
+
+    def __str__(self):
+        return str({'message': self.message, 'code': self.code, 'hint': self.hint, 'details': self.details})
+
+
+class ErroAuthLocal(Exception):
+    """Erro de login (mesma mensagem do GoTrue)"""
+
+
+# =========================================================
+# VALORES
+# =========================================================
+
+def _arredondar(valor, casas: int = 2):
+    if valor is None:
+        return None
+    quantum = Decimal(1).scaleb(-casas)
+    return float(Decimal(str(valor)).quantize(quantum, rounding=ROUND_HALF_UP))
+
+
+def _soma(valores) -> float:
+    return _arredondar(sum((Decimal(str(v)) for v in valores if v is not None), Decimal(0)))
+
+
+def _instante(valor) -> datetime | None:
+    """timestamptz a partir de texto/date/datetime (sem fuso = UTC, como no Supabase)"""
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        instante = valor
+    elif isinstance(valor, date):
+        instante = datetime(valor.year, valor.month, valor.day)
+    else:
+        texto = str(valor).strip().replace(' ', 'T', 1)
+        if texto.endswith('Z'):
+            texto = texto[:-1] + '+00:00'
+        instante = datetime.fromisoformat(texto)
+    if instante.tzinfo is None:
+        instante = instante.replace(tzinfo=timezone.utc)
+    return instante
+
+
+def _texto_filtro(valor) -> str:
+    """Valor como vai na URL do PostgREST"""
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    return str(valor)
+
+
+def _sem_aspas(valor: str) -> str:
+    if len(valor) >= 2 and valor[0] == '"' and valor[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', valor[1:-1])
+    return valor
+
+
+def _normalizar_busca(texto) -> str:
+    """Equivalente a fn_busca_normalizar: minúsculas e sem acentos"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def _padrao_like(padrao: str, ignorar_caixa: bool):
+    partes = []
+    for c in padrao:
+        if c in '%*':
+            partes.append('.*')
+        elif c == '_':
+            partes.append('.')
+        else:
+            partes.append(re.escape(c))
+    return re.compile(''.join(partes), re.S | (re.I if ignorar_caixa else 0))
+
+
+def _comparavel(coluna: str, valor_linha, texto: str):
+    """Converte o texto do filtro para o tipo do valor da linha"""
+    if isinstance(valor_linha, bool):
+        return texto.lower() in ('true', 't', '1', 'yes', 'on')
+    if isinstance(valor_linha, (int, float)):
+        return float(texto)
+    if coluna in _TIMESTAMPS:
+        return _instante(texto)
+    return texto
+
+
+def _valor_linha(coluna: str, valor):
+    if coluna in _TIMESTAMPS and valor is not None:
+        return _instante(valor)
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False, sort_keys=True)
+    return valor
+
+
+def _compara(coluna: str, valor, operador: str, criterio):
+    """True/False, ou None quando o SQL daria NULL (linha não entra)"""
+    if operador == 'is':
+        alvo = str(criterio).lower()
+        if alvo == 'null':
+            return valor is None
+        if alvo in ('true', 'false'):
+            return valor is (alvo == 'true')
+        return valor is None if alvo == 'unknown' else None
+
+    if valor is None:
+        return None
+
+    if operador == 'in':
+        return any(_compara(coluna, valor, 'eq', c) for c in criterio)
+
+    if operador in ('like', 'ilike'):
+        return _padrao_like(str(criterio), operador == 'ilike').fullmatch(str(valor)) is not None
+
+    atual = _valor_linha(coluna, valor)
+    try:
+        alvo = _comparavel(coluna, valor, str(criterio))
+    except (TypeError, ValueError):
+        raise ErroLocal(f'invalid input syntax: "{criterio}"', '22P02')
+
+    if operador == 'eq':
+        return atual == alvo
+    if operador == 'neq':
+        return atual != alvo
+    if operador == 'gt':
+        return atual > alvo
+    if operador == 'gte':
+        return atual >= alvo
+    if operador == 'lt':
+        return atual < alvo
+    if operador == 'lte':
+        return atual <= alvo
+    raise ErroLocal(f'operador não suportado no backend local: {operador}', 'PGRST100')
+
+
+# =========================================================
+# FILTROS E SELECT (sintaxe do PostgREST)
+# =========================================================
+
+def _dividir(texto: str) -> list:
+    """Divide por vírgulas de primeiro nível (fora de parênteses e aspas)"""
+    partes, atual, nivel, aspas, escape = [], [], 0, False, False
+    for c in texto:
+        if escape:
+            atual.append(c)
+            escape = False
+            continue
+        if c == '\\' and aspas:
+            atual.append(c)
+            escape = True
+            continue
+        if c == '"':
+            aspas = not aspas
+        elif not aspas and c == '(':
+            nivel += 1
+        elif not aspas and c == ')':
+            nivel -= 1
+        elif not aspas and nivel == 0 and c == ',':
+            partes.append(''.join(atual).strip())
+            atual = []
+            continue
+        atual.append(c)
+    if ''.join(atual).strip():
+        partes.append(''.join(atual).strip())
+    return partes
+
+
+def _filtro(coluna: str, expressao: str) -> tuple:
+    """'not.ilike.%x%' -> ('filtro', coluna, 'ilike', '%x%', True)"""
+    negado = expressao.startswith('not.')
+    if negado:
+        expressao = expressao[4:]
+    operador, _, criterio = expressao.partition('.')
+    if operador == 'in':
+        criterio = [_sem_aspas(v) for v in _dividir(criterio.strip()[1:-1])]
+    else:
+        criterio = _sem_aspas(criterio)
+    return ('filtro', coluna, operador, criterio, negado)
+
+
+def _grupo_logico(texto: str) -> tuple:
+    """'or(a.eq.1,and(b.is.null,c.gt.2))' -> ('or', [...], negado)"""
+    negado = texto.startswith('not.')
+    if negado:
+        texto = texto[4:]
+    tipo, _, resto = texto.partition('(')
+    termos = []
+    for termo in _dividir(resto[:-1]):
+        if re.match(r'^(not\.)?(and|or)\(', termo):
+            termos.append(_grupo_logico(termo))
+        else:
+            coluna, _, expressao = termo.partition('.')
+            termos.append(_filtro(coluna, expressao))
+    return ('grupo', tipo, termos, negado)
+
+
+def _avaliar(linha: dict, condicao: tuple):
+    if condicao[0] == 'filtro':
+        _, coluna, operador, criterio, negado = condicao
+        resultado = _compara(coluna, linha.get(coluna), operador, criterio)
+    else:
+        _, tipo, termos, negado = condicao
+        resultados = [_avaliar(linha, t) for t in termos]
+        if tipo == 'and':
+            resultado = False if False in resultados else (None if None in resultados else True)
+        else:
+            resultado = True if True in resultados else (None if None in resultados else False)
+    if negado and resultado is not None:
+        resultado = not resultado
+    return resultado
+
+
+def _parse_select(texto: str) -> list:
+    """
+    '*, obras(titulo, clientes(*))' -> itens:
+    ('*',) | ('coluna', nome, apelido) | ('embed', apelido, tabela, inner, itens)
+    """
+    itens = []
+    for parte in _dividir(texto or '*'):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if parte == '*':
+            itens.append(('*',))
+            continue
+        apelido = None
+        if ':' in parte.split('(', 1)[0]:
+            apelido, parte = parte.split(':', 1)
+            apelido = apelido.strip()
+            parte = parte.strip()
+        if '(' in parte:
+            nome, _, resto = parte.partition('(')
+            tabela, _, dica = nome.strip().partition('!')
+            itens.append(('embed', apelido or tabela, tabela, dica == 'inner', _parse_select(resto[:-1])))
+        else:
+            nome = parte.split('::', 1)[0].strip()
+            itens.append(('coluna', nome, apelido or nome))
+    return itens
+
+
+def _relacao(origem: str, destino: str) -> tuple:
+    """('um', coluna em origem) ou ('muitos', coluna em destino)"""
+    for coluna, (alvo, _) in _FKS.get(origem, {}).items():
+        if alvo == destino:
+            return 'um', coluna
+    for coluna, (alvo, _) in _FKS.get(destino, {}).items():
+        if alvo == origem:
+            return 'muitos', coluna
+    raise ErroLocal(
+        f"Could not find a relationship between '{origem}' and '{destino}' in the schema cache",
+        'PGRST200'
+    )
+
+
+def _copiar(linha: dict) -> dict:
+    return {k: (copy.deepcopy(v) if isinstance(v, (dict, list)) else v) for k, v in linha.items()}
+
+
+# =========================================================
+# BANCO
+# =========================================================
+
+class BancoLocal:
+    """Tabelas em memória + triggers do sql/ reescritos em Python"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tabelas = {nome: {} for nome in _COLUNAS}
+        self._sequencias = {nome: 0 for nome in _COLUNAS}
+        self._indices_unicos = {
+            nome: {colunas: {} for colunas in _UNICOS.get(nome, [])} for nome in _COLUNAS
+        }
+        self._usuarios_auth = {}  # email -> {'id', 'senha'}
+        self._desfazer = None
+        self._uid = None
+        for camada in _CAMADAS_PADRAO:
+            self._gravar('auditoria_camadas', dict(camada))
+
+    # ---------- infraestrutura ----------
+
+    @contextmanager
+    def transacao(self, uid: str | None = None):
+        """Uma chamada da API: tudo ou nada (como uma transação do PostgREST)"""
+        with self._lock:
+            if self._desfazer is not None:  # aninhada: já está dentro de uma
+                yield
+                return
+            self._desfazer = []
+            self._uid = uid
+            try:
+                yield
+            except BaseException:
+                for tabela, pk, anterior in reversed(self._desfazer):
+                    self._restaurar(tabela, pk, anterior)
+                raise
+            finally:
+                self._desfazer = None
+                self._uid = None
+
+    def _pk(self, tabela: str) -> str:
+        return _CHAVE_PRIMARIA.get(tabela, 'id')
+
+    def _chaves_unicas(self, tabela: str, linha: dict):
+        for colunas in _UNICOS.get(tabela, []):
+            valores = tuple(linha.get(c) for c in colunas)
+            if None not in valores:
+                yield colunas, valores
+
+    def _restaurar(self, tabela: str, pk, linha: dict | None):
+        atual = self._tabelas[tabela].pop(pk, None)
+        if atual is not None:
+            for colunas, valores in self._chaves_unicas(tabela, atual):
+                self._indices_unicos[tabela][colunas].pop(valores, None)
+        if linha is not None:
+            self._tabelas[tabela][pk] = linha
+            for colunas, valores in self._chaves_unicas(tabela, linha):
+                self._indices_unicos[tabela][colunas][valores] = pk
+
+    def _gravar(self, tabela: str, linha: dict):
+        pk = linha[self._pk(tabela)]
+        if self._desfazer is not None:
+            self._desfazer.append((tabela, pk, self._tabelas[tabela].get(pk)))
+        self._restaurar(tabela, pk, linha)
+
+    def _apagar(self, tabela: str, pk):
+        if self._desfazer is not None:
+            self._desfazer.append((tabela, pk, self._tabelas[tabela].get(pk)))
+        self._restaurar(tabela, pk, None)
+
+    def tabela(self, nome: str) -> dict:
+        if nome not in self._tabelas:
+            raise ErroLocal(
+                f"Could not find the table 'public.{nome}' in the schema cache", 'PGRST205'
+            )
+        return self._tabelas[nome]
+
+    def linha(self, tabela: str, pk) -> dict | None:
+        return self._tabelas[tabela].get(pk)
+
+    def _nova_linha(self, tabela: str, dados: dict) -> dict:
+        colunas = _COLUNAS[tabela]
+        for coluna in dados:
+            if coluna not in colunas:
+                raise ErroLocal(
+                    f"Could not find the '{coluna}' column of '{tabela}' in the schema cache",
+                    'PGRST204'
+                )
+        linha = {}
+        for coluna, padrao in colunas.items():
+            if coluna in dados:
+                linha[coluna] = dados[coluna]
+            else:
+                linha[coluna] = padrao() if callable(padrao) else padrao
+        pk = self._pk(tabela)
+        if pk == 'id' and linha.get('id') is None:
+            self._sequencias[tabela] += 1
+            linha['id'] = self._sequencias[tabela]
+        return linha
+
+    def _normalizar(self, tabela: str, linha: dict):
+        for coluna in _NUMERICAS.intersection(linha):
+            valor = linha[coluna]
+            if valor is not None and not isinstance(valor, bool):
+                try:
+                    linha[coluna] = _arredondar(valor)
+                except ArithmeticError:
+                    raise ErroLocal(f'invalid input syntax for type numeric: "{valor}"', '22P02')
+        for coluna in ('id', 'versao', 'ordem') + tuple(_FKS.get(tabela, {})):
+            valor = linha.get(coluna)
+            if isinstance(valor, str) and valor.strip().lstrip('-').isdigit():
+                linha[coluna] = int(valor)
+        if tabela == 'obra_financeiro_resumo':
+            linha['lucro'] = _arredondar(linha['recebido'] - linha['pago'])
+            linha['desvio'] = (
+                _arredondar(linha['pago'] - linha['valor_orcado'])
+                if linha['valor_orcado'] is not None else None
+            )
+
+    def _validar(self, tabela: str, linha: dict):
+        colunas = _COLUNAS[tabela]
+        for coluna, padrao in colunas.items():
+            obrigatoria = coluna in _OBRIGATORIAS.get(tabela, ()) or (padrao is not None)
+            if obrigatoria and linha.get(coluna) is None and coluna not in ('lucro', 'desvio'):
+                raise ErroLocal(
+                    f'null value in column "{coluna}" of relation "{tabela}" violates not-null constraint',
+                    '23502'
+                )
+
+        for coluna, (alvo, _) in _FKS.get(tabela, {}).items():
+            valor = linha.get(coluna)
+            if valor is not None and valor not in self._tabelas[alvo]:
+                raise ErroLocal(
+                    f'insert or update on table "{tabela}" violates foreign key constraint "{tabela}_{coluna}_fkey"',
+                    '23503',
+                    f'Key ({coluna})=({valor}) is not present in table "{alvo}".'
+                )
+
+        pk = linha[self._pk(tabela)]
+        for colunas, valores in self._chaves_unicas(tabela, linha):
+            dono = self._indices_unicos[tabela][colunas].get(valores)
+            if dono is not None and dono != pk:
+                raise ErroLocal(
+                    f'duplicate key value violates unique constraint "{tabela}_{"_".join(colunas)}_key"',
+                    '23505',
+                    f'Key ({", ".join(colunas)})=({", ".join(map(str, valores))}) already exists.'
+                )
+
+        # ux_orcamento_aprovado_por_obra (índice único parcial)
+        if tabela == 'orcamentos' and linha.get('status') == 'APROVADO':
+            for outro in self._tabelas['orcamentos'].values():
+                if (outro['id'] != linha['id'] and outro['obra_id'] == linha['obra_id']
+                        and outro['status'] == 'APROVADO'):
+                    raise ErroLocal(
+                        'duplicate key value violates unique constraint "ux_orcamento_aprovado_por_obra"',
+                        '23505'
+                    )
+
+    def _conflito(self, tabela: str, linha: dict, colunas: tuple):
+        if colunas == (self._pk(tabela),):
+            return self._tabelas[tabela].get(linha.get(colunas[0]))
+        indice = self._indices_unicos[tabela].get(colunas)
+        if indice is None:
+            raise ErroLocal(
+                'there is no unique or exclusion constraint matching the ON CONFLICT specification',
+                '42P10'
+            )
+        pk = indice.get(tuple(linha.get(c) for c in colunas))
+        return self._tabelas[tabela].get(pk) if pk is not None else None
+
+    # ---------- comandos ----------
+
+    def inserir(self, tabela: str, registros: list, on_conflict: tuple | None = None,
+                ignorar_duplicados: bool = False, upsert: bool = False) -> list:
+        """INSERT (ou INSERT ... ON CONFLICT) de um statement; retorna as linhas gravadas"""
+        self.tabela(tabela)
+        alvo = on_conflict or (self._pk(tabela),)
+        inseridas, atualizacoes = [], []
+        for dados in registros:
+            if upsert:
+                existente = self._conflito(tabela, dados, alvo)
+                if existente is not None:
+                    if not ignorar_duplicados:
+                        atualizacoes.append((existente, dados))
+                    continue
+            linha = self._nova_linha(tabela, dados)
+            self._antes_inserir(tabela, linha)
+            self._normalizar(tabela, linha)
+            self._validar(tabela, linha)
+            self._gravar(tabela, linha)
+            inseridas.append(linha)
+
+        resultado = [_copiar(l) for l in inseridas]
+        if inseridas:
+            self._apos(tabela, 'INSERT', [(None, l) for l in inseridas], set())
+        for existente, dados in atualizacoes:
+            valores = {k: v for k, v in dados.items() if k not in alvo}
+            resultado.extend(self.atualizar(tabela, [existente[self._pk(tabela)]], valores))
+        return resultado
+
+    def atualizar(self, tabela: str, pks: list, valores: dict) -> list:
+        """UPDATE ... SET valores WHERE pk = any(pks)"""
+        self.tabela(tabela)
+        for coluna in valores:
+            if coluna not in _COLUNAS[tabela]:
+                raise ErroLocal(
+                    f"Could not find the '{coluna}' column of '{tabela}' in the schema cache",
+                    'PGRST204'
+                )
+        colunas = set(valores)
+        pares = []
+        for pk in pks:
+            antigo = self._tabelas[tabela].get(pk)
+            if antigo is None:
+                continue
+            novo = dict(antigo)
+            novo.update(copy.deepcopy(valores))
+            self._antes_atualizar(tabela, antigo, novo, colunas)
+            self._normalizar(tabela, novo)
+            self._validar(tabela, novo)
+            self._gravar(tabela, novo)
+            pares.append((antigo, novo))
+
+        resultado = [_copiar(n) for _, n in pares]
+        if pares:
+            self._apos(tabela, 'UPDATE', pares, colunas)
+        return resultado
+
+    def remover(self, tabela: str, pks: list) -> list:
+        """DELETE ... WHERE pk = any(pks), com as ações das FKs"""
+        self.tabela(tabela)
+        antigos = [self._tabelas[tabela][pk] for pk in pks if pk in self._tabelas[tabela]]
+        if not antigos:
+            return []
+        ids = {l[self._pk(tabela)] for l in antigos}
+
+        for antigo in antigos:
+            self._antes_remover(tabela, antigo)
+
+        referencias = [
+            (filha, coluna, acao)
+            for filha, fks in _FKS.items()
+            for coluna, (alvo, acao) in fks.items()
+            if alvo == tabela
+        ]
+        for filha, coluna, acao in referencias:
+            if acao == 'restrict' and any(l.get(coluna) in ids for l in self._tabelas[filha].values()):
+                raise ErroLocal(
+                    f'update or delete on table "{tabela}" violates foreign key constraint '
+                    f'"{filha}_{coluna}_fkey" on table "{filha}"',
+                    '23503'
+                )
+
+        for antigo in antigos:
+            self._apagar(tabela, antigo[self._pk(tabela)])
+
+        for filha, coluna, acao in referencias:
+            afetadas = [
+                l[self._pk(filha)] for l in self._tabelas[filha].values() if l.get(coluna) in ids
+            ]
+            if not afetadas:
+                continue
+            if acao == 'cascade':
+                self.remover(filha, afetadas)
+            elif acao == 'set null':
+                self.atualizar(filha, afetadas, {coluna: None})
+
+        resultado = [_copiar(l) for l in antigos]
+        self._apos(tabela, 'DELETE', [(l, None) for l in antigos], set())
+        return resultado
+
+    # ---------- triggers BEFORE (por linha) ----------
+
+    def _camada_valida(self, linha: dict):
+        # sql/021: entidade com trigger de auditoria não vai para a camada APP
+        if linha.get('camada') == 'APP' and linha.get('entidade') in _AUDITADAS:
+            raise ErroLocal(
+                f"A entidade {linha['entidade']} tem escritas fora do app (OPERACAO, RPCs, triggers) "
+                "e só pode ser auditada pela camada BANCO", '23514'
+            )
+
+    def _antes_inserir(self, tabela: str, novo: dict):
+        if tabela == 'auditoria_camadas':
+            self._camada_valida(novo)
+        elif tabela == 'orcamento_fase_servicos':
+            self._ofs_total(novo)
+        elif tabela == 'apontamentos':
+            self._apontamento_antes(novo, None)
+
+    def _antes_atualizar(self, tabela: str, antigo: dict, novo: dict, colunas: set):
+        if tabela == 'usuarios_app':
+            novo['atualizado_em'] = _agora()
+        elif tabela == 'auditoria_camadas':
+            self._camada_valida(novo)
+        elif tabela == 'orcamento_fase_servicos' and colunas & {'quantidade', 'valor_unit'}:
+            self._ofs_total(novo)
+        elif tabela == 'apontamentos':
+            self._apontamento_antes(novo, colunas)
+        elif tabela == 'obra_fases' and 'status' in colunas:
+            if novo['status'] == 'CONCLUIDA' and antigo['status'] != novo['status']:
+                if any(r['obra_fase_id'] == novo['id'] and r['status'] in ('ABERTO', 'VENCIDO')
+                       for r in self._tabelas['recebimentos'].values()):
+                    raise ErroLocal(
+                        'Não é possível CONCLUIR fase com recebimentos ABERTOS/VENCIDOS (cancele ou pague).'
+                    )
+        elif tabela == 'recebimentos' and 'status' in colunas:
+            self._recebimento_regras(antigo, novo)
+
+    def _antes_remover(self, tabela: str, antigo: dict):
+        if tabela == 'obra_fases':
+            if any(a['obra_fase_id'] == antigo['id'] for a in self._tabelas['apontamentos'].values()):
+                raise ErroLocal('Não é possível excluir fase com apontamentos.')
+            if any(r['obra_fase_id'] == antigo['id'] and r['status'] == 'PAGO'
+                   for r in self._tabelas['recebimentos'].values()):
+                raise ErroLocal('Não é possível excluir fase com recebimento PAGO.')
+
+    def _ofs_total(self, novo: dict):
+        novo['valor_total'] = _arredondar(
+            Decimal(str(novo.get('quantidade') or 0)) * Decimal(str(novo.get('valor_unit') or 0))
+        )
+
+    def _apontamento_antes(self, novo: dict, colunas: set | None):
+        """Mesma ordem do Postgres (alfabética): calc_bruto, calcula_valores, guard"""
+        inserindo = colunas is None
+        if inserindo or colunas & {'valor_base', 'acrescimo_pct', 'desconto_valor', 'tipo_dia'}:
+            for coluna in ('acrescimo_pct', 'desconto_valor', 'valor_base'):
+                if novo.get(coluna) is None:
+                    novo[coluna] = 0
+            novo['valor_bruto'] = _arredondar(
+                Decimal(str(novo['valor_base'])) * (1 + Decimal(str(novo['acrescimo_pct'])))
+            )
+        if inserindo or 'tipo_dia' in colunas:
+            novo['acrescimo_pct'] = {'SABADO': 0.25, 'DOMINGO': 1.0, 'FERIADO': 1.0}.get(novo.get('tipo_dia'), 0.0)
+        if inserindo or 'orcamento_id' in colunas:
+            orcamento = self._tabelas['orcamentos'].get(novo.get('orcamento_id'))
+            if orcamento is None:
+                raise ErroLocal(f"Orçamento {novo.get('orcamento_id')} não encontrado")
+            if orcamento['status'] != 'APROVADO':
+                raise ErroLocal(
+                    'Só é permitido lançar apontamento em orçamento APROVADO. '
+                    f"Status atual: {orcamento['status']}"
+                )
+
+    def _recebimento_regras(self, antigo: dict, novo: dict):
+        if novo['status'] == 'PAGO' and antigo['status'] != novo['status']:
+            fase = self._tabelas['obra_fases'].get(novo['obra_fase_id'])
+            if fase is None:
+                raise ErroLocal('Fase inválida para recebimento.')
+            if fase['status'] != 'CONCLUIDA':
+                raise ErroLocal(
+                    'Só é permitido baixar recebimento (PAGO) quando a fase estiver CONCLUIDA. '
+                    f"Fase: {fase['status']}"
+                )
+            if novo.get('recebido_em') is None:
+                novo['recebido_em'] = date.today().isoformat()
+        if novo['status'] == 'CANCELADO' and antigo['status'] != novo['status']:
+            if antigo['status'] == 'PAGO':
+                raise ErroLocal('Não é permitido cancelar recebimento já PAGO.')
+
+    # ---------- triggers AFTER ----------
+
+    def _apos(self, tabela: str, operacao: str, pares: list, colunas: set):
+        """Triggers por linha (na ordem do Postgres) e depois os por statement"""
+        if tabela == 'alocacoes' and operacao == 'UPDATE' and 'confirmada' in colunas:
+            for antigo, novo in pares:
+                if antigo['confirmada'] != novo['confirmada'] and novo['confirmada'] is True:
+                    self._alocacao_gera_apontamento(novo)
+
+        if tabela in _AUDITADAS:
+            for antigo, novo in pares:
+                self._auditar(tabela, operacao, antigo, novo)
+
+        if tabela == 'orcamentos' and operacao == 'UPDATE' and 'desconto_valor' in colunas:
+            for _, novo in pares:
+                self.recalcular_orcamento(novo['id'])
+
+        if tabela == 'orcamento_fase_servicos':
+            fases = {l['obra_fase_id'] for par in pares for l in par if l}
+            self._recalcular_fases(fases, so_mudancas=True)
+            orcamentos = {
+                self._tabelas['obra_fases'][f]['orcamento_id']
+                for f in fases if f in self._tabelas['obra_fases']
+            }
+            self._recalcular_orcamentos_totais(orcamentos)
+
+        elif tabela == 'apontamentos':
+            self._rateio_apos(operacao, pares)
+
+        elif tabela == 'pagamento_itens':
+            pagamentos = {l['pagamento_id'] for par in pares for l in par if l}
+            for pagamento_id in pagamentos:
+                if pagamento_id in self._tabelas['pagamentos']:
+                    total = _soma(
+                        i['valor'] for i in self._tabelas['pagamento_itens'].values()
+                        if i['pagamento_id'] == pagamento_id
+                    )
+                    self.atualizar('pagamentos', [pagamento_id], {'valor_total': total})
+
+        obras = self._obras_do_resumo(tabela, operacao, pares)
+        if obras:
+            self.recalcular_resumo(obras)
+
+    def _auditar(self, tabela: str, operacao: str, antigo: dict | None, novo: dict | None):
+        camada = self._tabelas['auditoria_camadas'].get(tabela) or {}
+        if camada.get('camada') == 'APP':
+            return
+        antes, depois = copy.deepcopy(antigo), copy.deepcopy(novo)
+        if operacao == 'UPDATE':
+            if antes == depois:
+                return
+            if camada.get('modo', 'DIFF') == 'DIFF':
+                chaves = [k for k in depois if antes.get(k) != depois.get(k)]
+                antes = {k: antes.get(k) for k in chaves}
+                depois = {k: depois.get(k) for k in chaves}
+        linha = novo or antigo
+        entidade_id = str(linha['id']) if linha.get('id') is not None else None
+        self.inserir('auditoria', [{
+            'usuario': self._usuario_atual(),
+            'entidade': tabela,
+            'entidade_id': entidade_id,
+            'acao': operacao,
+            'antes_json': antes,
+            'depois_json': depois,
+        }])
+
+    def _usuario_atual(self) -> str:
+        if self._uid:
+            for u in self._tabelas['usuarios_app'].values():
+                if u['auth_user_id'] == self._uid:
+                    return u['usuario']
+            return self._uid
+        return 'SYSTEM'
+
+    def _alocacao_gera_apontamento(self, alocacao: dict):
+        for coluna in ('pessoa_id', 'obra_id', 'orcamento_id', 'obra_fase_id'):
+            if alocacao.get(coluna) is None:
+                raise ErroLocal(f'Alocação sem {coluna} não pode ser confirmada.')
+        pessoa = self._tabelas['pessoas'].get(alocacao['pessoa_id'])
+        if pessoa is None or pessoa.get('diaria_base') is None:
+            raise ErroLocal(f"Profissional sem diaria_base cadastrada. pessoa_id={alocacao['pessoa_id']}")
+        self.inserir('apontamentos', [{
+            'obra_id': alocacao['obra_id'],
+            'orcamento_id': alocacao['orcamento_id'],
+            'obra_fase_id': alocacao['obra_fase_id'],
+            'pessoa_id': alocacao['pessoa_id'],
+            'data': alocacao['data'],
+            'tipo_dia': 'NORMAL',
+            'valor_base': pessoa['diaria_base'],
+            'acrescimo_pct': 0,
+            'desconto_valor': 0,
+        }], on_conflict=('obra_id', 'pessoa_id', 'data', 'orcamento_id'),
+            ignorar_duplicados=True, upsert=True)
+
+    def _rateio_apos(self, operacao: str, pares: list):
+        """trg_apontamentos_rateio_stmt (sql/011)"""
+        chaves = set()
+        for antigo, novo in pares:
+            if operacao == 'INSERT':
+                chaves.add((novo['pessoa_id'], novo['data']))
+            elif operacao == 'DELETE':
+                chaves.add((antigo['pessoa_id'], antigo['data']))
+            else:
+                campos = ('pessoa_id', 'data', 'valor_bruto', 'desconto_valor')
+                if any(antigo[c] != novo[c] for c in campos):
+                    chaves.add((novo['pessoa_id'], novo['data']))
+                if (antigo['pessoa_id'], antigo['data']) != (novo['pessoa_id'], novo['data']):
+                    chaves.add((antigo['pessoa_id'], antigo['data']))
+        chaves = {c for c in chaves if c[0] is not None}
+        if chaves:
+            self.recalcular_rateio(chaves)
+
+    def recalcular_rateio(self, chaves: set):
+        """fn_apontamentos_recalcular_rateio: só grava linhas que mudam"""
+        grupos = {}
+        for a in self._tabelas['apontamentos'].values():
+            chave = (a['pessoa_id'], a['data'])
+            if chave in chaves:
+                grupos.setdefault(chave, []).append(a)
+
+        mudancas = {}
+        for linhas in grupos.values():
+            n = len(linhas)
+            for a in linhas:
+                rateado = Decimal(str(a['valor_bruto'])) / n
+                valor_rateado = _arredondar(rateado)
+                valor_final = max(0.0, _arredondar(rateado - Decimal(str(a['desconto_valor'] or 0))))
+                if (a['valor_rateado'], a['valor_final']) != (valor_rateado, valor_final):
+                    mudancas[a['id']] = (valor_rateado, valor_final)
+
+        # um statement só (como o UPDATE ... FROM do sql/011)
+        pares = []
+        for pk, (valor_rateado, valor_final) in mudancas.items():
+            antigo = self._tabelas['apontamentos'][pk]
+            novo = dict(antigo, valor_rateado=valor_rateado, valor_final=valor_final)
+            self._gravar('apontamentos', novo)
+            pares.append((antigo, novo))
+        if pares:
+            self._apos('apontamentos', 'UPDATE', pares, {'valor_rateado', 'valor_final'})
+
+    def _recalcular_fases(self, fases: set, so_mudancas: bool):
+        totais = {f: [] for f in fases if f in self._tabelas['obra_fases']}
+        for item in self._tabelas['orcamento_fase_servicos'].values():
+            if item['obra_fase_id'] in totais:
+                totais[item['obra_fase_id']].append(item['valor_total'])
+        pares = []
+        for fase_id, valores in totais.items():
+            antigo = self._tabelas['obra_fases'][fase_id]
+            total = _soma(valores)
+            if so_mudancas and antigo['valor_fase'] == total:
+                continue
+            novo = dict(antigo, valor_fase=total)
+            self._gravar('obra_fases', novo)
+            pares.append((antigo, novo))
+        if pares:
+            self._apos('obra_fases', 'UPDATE', pares, {'valor_fase'})
+
+    def _recalcular_orcamentos_totais(self, orcamentos: set, so_mudancas: bool = True):
+        totais = {o: [] for o in orcamentos if o in self._tabelas['orcamentos']}
+        for fase in self._tabelas['obra_fases'].values():
+            if fase['orcamento_id'] in totais:
+                totais[fase['orcamento_id']].append(fase['valor_fase'])
+        pares = []
+        for orcamento_id, valores in totais.items():
+            antigo = self._tabelas['orcamentos'][orcamento_id]
+            total = _soma(valores)
+            final = max(0.0, _arredondar(total - max(0.0, antigo['desconto_valor'] or 0)))
+            if so_mudancas and (antigo['valor_total'], antigo['valor_total_final']) == (total, final):
+                continue
+            novo = dict(antigo, valor_total=total, valor_total_final=final)
+            self._gravar('orcamentos', novo)
+            pares.append((antigo, novo))
+        if pares:
+            self._apos('orcamentos', 'UPDATE', pares, {'valor_total', 'valor_total_final'})
+
+    def recalcular_orcamento(self, orcamento_id: int):
+        """fn_recalcular_orcamento: re-soma todas as fases e o orçamento"""
+        fases = {f['id'] for f in self._tabelas['obra_fases'].values() if f['orcamento_id'] == orcamento_id}
+        self._recalcular_fases(fases, so_mudancas=False)
+        self._recalcular_orcamentos_totais({orcamento_id}, so_mudancas=False)
+
+    # ---------- resumo financeiro (sql/019) ----------
+
+    _EVENTOS_RESUMO = {
+        'recebimentos': {'INSERT', 'UPDATE', 'DELETE'},
+        'pagamentos': {'UPDATE'},
+        'pagamento_itens': {'INSERT', 'UPDATE', 'DELETE'},
+        'orcamentos': {'INSERT', 'UPDATE', 'DELETE'},
+        'obra_fases': {'UPDATE', 'DELETE'},
+        'apontamentos': {'UPDATE', 'DELETE'},
+        'obras': {'INSERT'},
+    }
+
+    def _obras_do_resumo(self, tabela: str, operacao: str, pares: list) -> set:
+        if operacao not in self._EVENTOS_RESUMO.get(tabela, ()):
+            return set()
+        linhas = [l for par in pares for l in par if l]
+        if tabela == 'obras':
+            return {l['id'] for l in linhas}
+        if tabela in ('orcamentos', 'obra_fases', 'apontamentos'):
+            return {l['obra_id'] for l in linhas if l.get('obra_id') is not None}
+        if tabela == 'recebimentos':
+            fases = self._tabelas['obra_fases']
+            return {fases[l['obra_fase_id']]['obra_id'] for l in linhas if l['obra_fase_id'] in fases}
+        if tabela == 'pagamentos':
+            ids = {l['id'] for l in linhas}
+            apontamentos = {
+                i['apontamento_id'] for i in self._tabelas['pagamento_itens'].values()
+                if i['pagamento_id'] in ids
+            }
+        else:
+            apontamentos = {l['apontamento_id'] for l in linhas}
+        return {
+            self._tabelas['apontamentos'][a]['obra_id']
+            for a in apontamentos
+            if a in self._tabelas['apontamentos'] and self._tabelas['apontamentos'][a]['obra_id'] is not None
+        }
+
+    def calcular_resumo(self, obras: set | None = None) -> dict:
+        """obra_id -> {valor_orcado, recebido, pago} a partir das tabelas de origem"""
+        if obras is None:
+            obras = set(self._tabelas['obras'])
+        obras = {o for o in obras if o in self._tabelas['obras']}
+        resumo = {o: {'valor_orcado': None, 'versao': None, 'recebido': [], 'pago': []} for o in obras}
+
+        for oc in self._tabelas['orcamentos'].values():
+            r = resumo.get(oc['obra_id'])
+            if r is not None and oc['status'] == 'APROVADO' and (r['versao'] is None or oc['versao'] > r['versao']):
+                r['versao'] = oc['versao']
+                r['valor_orcado'] = oc['valor_total_final']
+
+        fases = self._tabelas['obra_fases']
+        orcamentos = self._tabelas['orcamentos']
+        for rec in self._tabelas['recebimentos'].values():
+            if rec['status'] != 'PAGO':
+                continue
+            fase = fases.get(rec['obra_fase_id'])
+            oc = orcamentos.get(fase['orcamento_id']) if fase else None
+            if oc and oc['obra_id'] in resumo:
+                resumo[oc['obra_id']]['recebido'].append(rec['valor'])
+
+        apontamentos = self._tabelas['apontamentos']
+        pagamentos = self._tabelas['pagamentos']
+        for item in self._tabelas['pagamento_itens'].values():
+            apontamento = apontamentos.get(item['apontamento_id'])
+            pagamento = pagamentos.get(item['pagamento_id'])
+            if apontamento and pagamento and pagamento['status'] == 'PAGO' and apontamento['obra_id'] in resumo:
+                resumo[apontamento['obra_id']]['pago'].append(item['valor'])
+
+        return {
+            o: {'valor_orcado': r['valor_orcado'], 'recebido': _soma(r['recebido']), 'pago': _soma(r['pago'])}
+            for o, r in resumo.items()
+        }
+
+    def recalcular_resumo(self, obras: set | None = None) -> int:
+        """fn_obra_financeiro_recalcular: upsert só quando os valores mudam"""
+        calculado = self.calcular_resumo(obras)
+        for obra_id, valores in calculado.items():
+            atual = self._tabelas['obra_financeiro_resumo'].get(obra_id)
+            if atual and all(atual[k] == v for k, v in valores.items()):
+                continue
+            linha = dict(atual) if atual else self._nova_linha('obra_financeiro_resumo', {'obra_id': obra_id})
+            linha.update(valores)
+            linha['atualizado_em'] = _agora()
+            self._normalizar('obra_financeiro_resumo', linha)
+            self._gravar('obra_financeiro_resumo', linha)
+        return len(calculado)
+
+    # ---------- carga / exportação ----------
+
+    def criar_usuario(self, email: str, senha: str, usuario: str, perfil: str = 'ADMIN',
+                      auth_user_id: str | None = None) -> str:
+        """Usuário do auth local + linha em usuarios_app"""
+        with self.transacao():
+            auth_user_id = auth_user_id or str(uuid.uuid4())
+            self._usuarios_auth[email.lower()] = {'id': auth_user_id, 'senha': senha}
+            self.inserir('usuarios_app', [{'auth_user_id': auth_user_id, 'usuario': usuario, 'perfil': perfil}])
+        return auth_user_id
+
+    def autenticar(self, email: str, senha: str) -> str | None:
+        with self._lock:
+            usuario = self._usuarios_auth.get((email or '').lower())
+        if usuario and usuario['senha'] == senha:
+            return usuario['id']
+        return None
+
+    def carregar(self, dados: dict):
+        """
+        Carga em massa (como COPY com triggers desligados): grava as linhas
+        como vieram, completa padrões, ajusta as sequências e no fim
+        reconstrói o resumo financeiro. Não gera auditoria.
+        """
+        with self.transacao():
+            for email, usuario in (dados.get('usuarios_auth') or {}).items():
+                self._usuarios_auth[email.lower()] = dict(usuario)
+            for tabela, linhas in (dados.get('tabelas') or {}).items():
+                self.tabela(tabela)
+                for registro in linhas:
+                    linha = self._nova_linha(tabela, registro)
+                    self._normalizar(tabela, linha)
+                    self._gravar(tabela, linha)
+                    if isinstance(linha.get('id'), int):
+                        self._sequencias[tabela] = max(self._sequencias[tabela], linha['id'])
+            if 'obra_financeiro_resumo' not in (dados.get('tabelas') or {}):
+                self.recalcular_resumo()
+
+    def exportar(self) -> dict:
+        with self._lock:
+            return {
+                'usuarios_auth': copy.deepcopy(self._usuarios_auth),
+                'tabelas': {nome: [_copiar(l) for l in linhas.values()] for nome, linhas in self._tabelas.items()},
+            }
+
+    def salvar(self, caminho: str):
+        abrir = gzip.open if caminho.endswith('.gz') else open
+        with abrir(caminho, 'wt', encoding='utf-8') as f:
+            json.dump(self.exportar(), f, ensure_ascii=False)
+
+    def abrir(self, caminho: str):
+        abrir = gzip.open if caminho.endswith('.gz') else open
+        with abrir(caminho, 'rt', encoding='utf-8') as f:
+            self.carregar(json.load(f))
+
+    def contagens(self) -> dict:
+        with self._lock:
+            return {nome: len(linhas) for nome, linhas in self._tabelas.items()}
+
+
+# =========================================================
+# RPCs (funções do sql/)
+# =========================================================
+
+def _rpc_dashboard_stats(banco: BancoLocal, p: dict):
+    t = banco._tabelas
+    inicio, fim = str(p['p_inicio']), str(p['p_fim'])
+    receb = _soma(
+        r['valor'] for r in t['recebimentos'].values()
+        if r['status'] == 'PAGO' and r['recebido_em'] and inicio <= r['recebido_em'] < fim
+    )
+    pag = _soma(
+        x['valor_total'] for x in t['pagamentos'].values()
+        if x['status'] == 'PAGO' and x['pago_em'] and inicio <= x['pago_em'] < fim
+    )
+    return {
+        'obras_ativas': sum(
+            1 for o in t['obras'].values()
+            if o['ativo'] and o['status'] in ('AGUARDANDO', 'INICIADO', 'PAUSADO')
+        ),
+        'orcamentos_pendentes': sum(1 for o in t['orcamentos'].values() if o['status'] in ('RASCUNHO', 'EMITIDO')),
+        'pessoas_ativas': sum(1 for x in t['pessoas'].values() if x['ativo']),
+        'clientes_ativos': sum(1 for c in t['clientes'].values() if c['ativo']),
+        'recebimentos_mes': receb,
+        'pagamentos_mes': pag,
+        'resultado_mes': _arredondar(receb - pag),
+        'fases_nao_concluidas': sum(1 for f in t['obra_fases'].values() if f['status'] != 'CONCLUIDA'),
+    }
+
+
+def _rpc_relatorio_financeiro(banco: BancoLocal, p: dict):
+    t = banco._tabelas
+    inicio, fim = str(p['p_inicio']), str(p['p_fim'])
+
+    recebimentos = []
+    for r in t['recebimentos'].values():
+        data_ref = r['recebido_em'] or r['vencimento']
+        if r['status'] != 'PAGO' or not data_ref or not (inicio <= data_ref <= fim):
+            continue
+        fase = t['obra_fases'].get(r['obra_fase_id'])
+        obra = t['obras'].get(fase['obra_id']) if fase else None
+        recebimentos.append((r['vencimento'], {
+            'data_ref': data_ref,
+            'descricao': f"{obra['titulo'] if obra else '-'} - {fase['nome_fase'] if fase else '-'}",
+            'valor': r['valor'] or 0,
+        }))
+    # order by vencimento desc nulls first
+    recebimentos = (
+        [r for r in recebimentos if r[0] is None]
+        + sorted((r for r in recebimentos if r[0] is not None), key=lambda r: r[0], reverse=True)
+    )
+
+    pagamentos = []
+    for x in t['pagamentos'].values():
+        data_ref = x['pago_em'] or x['referencia_fim'] or x['referencia_inicio']
+        if x['status'] != 'PAGO' or not data_ref or not (inicio <= data_ref <= fim):
+            continue
+        if x['referencia_inicio'] or x['referencia_fim']:
+            descricao = f"{x['tipo']} ({x['referencia_inicio'] or '-'} a {x['referencia_fim'] or '-'})"
+        else:
+            descricao = x['tipo']
+        pagamentos.append((_instante(x['criado_em']), {
+            'data_ref': data_ref, 'descricao': descricao, 'valor': x['valor_total'] or 0,
+        }))
+    pagamentos.sort(key=lambda x: x[0], reverse=True)
+
+    total_receb = _soma(r['valor'] for _, r in recebimentos)
+    total_pag = _soma(x['valor'] for _, x in pagamentos)
+    return {
+        'recebimentos': [r for _, r in recebimentos],
+        'pagamentos': [x for _, x in pagamentos],
+        'total_recebimentos': total_receb,
+        'total_pagamentos': total_pag,
+        'saldo': _arredondar(total_receb - total_pag),
+    }
+
+
+def _rpc_criar_pagamento_com_itens(banco: BancoLocal, p: dict):
+    dados = p.get('p_pagamento') or {}
+    campos = ('tipo', 'referencia_inicio', 'referencia_fim', 'obra_fase_id', 'pessoa_id',
+              'valor_total', 'status', 'pago_em', 'observacao')
+    pagamento = {c: dados.get(c) for c in campos}
+    pagamento['tipo'] = pagamento['tipo'] or 'SEMANAL'
+    pagamento['valor_total'] = pagamento['valor_total'] or 0
+    pagamento['status'] = pagamento['status'] or 'PENDENTE'
+    pagamento_id = banco.inserir('pagamentos', [pagamento])[0]['id']
+
+    itens = [{
+        'pagamento_id': pagamento_id,
+        'apontamento_id': i.get('apontamento_id'),
+        'valor': i.get('valor') or 0,
+        'observacao': i.get('observacao'),
+    } for i in (p.get('p_itens') or [])]
+    if itens:
+        banco.inserir('pagamento_itens', itens)
+    return _copiar(banco.linha('pagamentos', pagamento_id))
+
+
+def _rpc_recalcular_orcamento(banco: BancoLocal, p: dict):
+    banco.recalcular_orcamento(int(p['p_orcamento_id']))
+    return None
+
+
+def _rpc_buscar(banco: BancoLocal, p: dict):
+    """fn_buscar (sql/015, sql/022): LIKE sem acento + similaridade aproximada por palavra"""
+    entidade = p.get('p_entidade')
+    termo_original = (p.get('p_termo') or '').strip()
+    termo = _normalizar_busca(termo_original)
+    limite = int(p.get('p_limite') or 100)
+    if not termo:
+        return []
+    campos = {'clientes': ('nome',), 'pessoas': ('nome',), 'obras': ('titulo', 'endereco_obra')}.get(entidade)
+    if campos is None:
+        raise ErroLocal(f'Entidade de busca inválida: {entidade}')
+    filtros = {
+        coluna: p[parametro]
+        for coluna, parametro in (('ativo', 'p_ativo'), ('status', 'p_status'), ('tipo', 'p_tipo'))
+        if p.get(parametro) is not None and (coluna != 'status' or entidade == 'obras')
+        and (coluna != 'tipo' or entidade == 'pessoas')
+    }
+    cursor_score, cursor_id = p.get('p_cursor_score'), p.get('p_cursor_id')
+
+    def similaridade(texto: str) -> float:
+        palavras = texto.split() or ['']
+        return max(SequenceMatcher(None, termo, w).ratio() for w in palavras)
+
+    resultado = []
+    for linha in banco._tabelas[entidade].values():
+        if any(linha.get(coluna) != valor for coluna, valor in filtros.items()):
+            continue
+        textos = [_normalizar_busca(linha.get(c)) for c in campos]
+        contem = any(termo in t for t in textos)
+        score = max(similaridade(t) for t in textos)
+        telefone = entidade == 'clientes' and termo_original in (linha.get('telefone') or '')
+        if contem or score >= 0.6 or telefone:
+            score = round(int(contem) + score, 6)
+            if cursor_id is not None and (score, -linha['id']) >= (cursor_score, -cursor_id):
+                continue
+            resultado.append((score, linha['id']))
+
+    resultado.sort(key=lambda r: (-r[0], r[1]))
+    return [{'id': i, 'score': s} for s, i in resultado[:limite]]
+
+
+def _texto_auditoria(linha: dict) -> set:
+    """Palavras de busca_tsv (sql/016): colunas + chaves/valores dos JSONs"""
+    partes = [linha.get('usuario'), linha.get('entidade'), linha.get('entidade_id'), linha.get('acao')]
+    for documento in (linha.get('antes_json'), linha.get('depois_json')):
+        if isinstance(documento, dict):
+            for chave, valor in documento.items():
+                partes.append(chave)
+                if isinstance(valor, (str, int, float)) and not isinstance(valor, bool):
+                    partes.append(valor)
+    return set(re.findall(r'\w+', _normalizar_busca(' '.join(str(p) for p in partes if p is not None))))
+
+
+def _casa_texto(palavras: set, consulta: str) -> bool:
+    """websearch_to_tsquery simplificado: termos em E, '-termo' exclui"""
+    for termo in re.findall(r'-?"[^"]*"|-?\S+', consulta or ''):
+        negado = termo.startswith('-')
+        alvo = set(re.findall(r'\w+', _normalizar_busca(termo.lstrip('-').strip('"'))))
+        if not alvo or termo.lower() == 'or':
+            continue
+        presente = alvo <= palavras
+        if presente == negado:
+            return False
+    return True
+
+
+def _rpc_auditoria_buscar(banco: BancoLocal, p: dict):
+    limite = min(max(int(p.get('p_limite') or 50), 1), 500)
+    inicio, fim = _instante(p.get('p_inicio')), _instante(p.get('p_fim'))
+    cursor = None
+    if p.get('p_cursor_criado_em') is not None:
+        cursor = (_instante(p['p_cursor_criado_em']), int(p.get('p_cursor_id') or 0))
+    usuario = (p.get('p_usuario') or '').lower()
+    campo = p.get('p_campo')
+
+    linhas = []
+    for a in banco._tabelas['auditoria'].values():
+        criado_em = _instante(a['criado_em'])
+        if p.get('p_entidade') and a['entidade'] != p['p_entidade']:
+            continue
+        if p.get('p_entidade_id') and a['entidade_id'] != str(p['p_entidade_id']):
+            continue
+        if p.get('p_acao') and a['acao'] != p['p_acao']:
+            continue
+        if usuario and usuario not in (a['usuario'] or '').lower():
+            continue
+        if campo:
+            antes = a['antes_json'].get(campo) if isinstance(a['antes_json'], dict) else None
+            depois = a['depois_json'].get(campo) if isinstance(a['depois_json'], dict) else None
+            if antes == depois:
+                continue
+        if inicio and criado_em < inicio:
+            continue
+        if fim and criado_em >= fim:
+            continue
+        if cursor and not (criado_em, a['id']) < cursor:
+            continue
+        if p.get('p_texto') and not _casa_texto(_texto_auditoria(a), p['p_texto']):
+            continue
+        linhas.append((criado_em, a['id'], a))
+
+    linhas.sort(key=lambda x: (x[0], x[1]), reverse=True)
+    return [_copiar(a) for _, _, a in linhas[:limite]]
+
+
+def _rpc_auditoria_registro_em(banco: BancoLocal, p: dict):
+    momento = _instante(p.get('p_momento')) or datetime.now(timezone.utc)
+    historico = sorted(
+        (
+            (_instante(a['criado_em']), a['id'], a)
+            for a in banco._tabelas['auditoria'].values()
+            if a['entidade'] == p.get('p_entidade') and a['entidade_id'] == str(p.get('p_entidade_id'))
+        ),
+        key=lambda x: (x[0], x[1])
+    )
+    estado = None
+    for criado_em, _, a in historico:
+        if criado_em > momento:
+            break
+        if a['acao'] == 'DELETE':
+            estado = None
+        elif isinstance(a['depois_json'], dict):
+            if a['acao'] == 'INSERT':
+                estado = dict(a['depois_json'])
+            else:
+                base = estado if estado is not None else (
+                    a['antes_json'] if isinstance(a['antes_json'], dict) else {}
+                )
+                estado = {**base, **a['depois_json']}
+    return copy.deepcopy(estado)
+
+
+def _rpc_obra_financeiro_reconstruir(banco: BancoLocal, p: dict):
+    return banco.recalcular_resumo()
+
+
+def _rpc_obra_financeiro_verificar(banco: BancoLocal, p: dict):
+    """Compara o resumo gravado com o recálculo a partir das tabelas de origem"""
+    divergencias = []
+    for obra_id, valores in sorted(banco.calcular_resumo().items()):
+        esperado = dict(valores)
+        esperado['lucro'] = _arredondar(esperado['recebido'] - esperado['pago'])
+        esperado['desvio'] = (
+            _arredondar(esperado['pago'] - esperado['valor_orcado'])
+            if esperado['valor_orcado'] is not None else None
+        )
+        gravado = banco.linha('obra_financeiro_resumo', obra_id)
+        resumo = {k: gravado[k] for k in esperado} if gravado else None
+        if resumo != esperado:
+            divergencias.append({
+                'obra_id': obra_id,
+                'titulo': banco.linha('obras', obra_id)['titulo'],
+                'resumo': resumo,
+                'esperado': esperado,
+            })
+    return divergencias
+
+
+_RPCS = {
+    'fn_dashboard_stats': _rpc_dashboard_stats,
+    'fn_relatorio_financeiro': _rpc_relatorio_financeiro,
+    'fn_criar_pagamento_com_itens': _rpc_criar_pagamento_com_itens,
+    'fn_recalcular_orcamento': _rpc_recalcular_orcamento,
+    'fn_buscar': _rpc_buscar,
+    'fn_auditoria_buscar': _rpc_auditoria_buscar,
+    'fn_auditoria_registro_em': _rpc_auditoria_registro_em,
+    'fn_obra_financeiro_reconstruir': _rpc_obra_financeiro_reconstruir,
+    'fn_obra_financeiro_verificar': _rpc_obra_financeiro_verificar,
+}
+
+
+# =========================================================
+# CLIENT (mesma interface do supabase-py usada pelo app)
+# =========================================================
+
+class RespostaLocal:
+    def __init__(self, data, count: int | None = None):
+        self.data = data
+        self.count = count
+
+
+def _registrar(tabela: str, operacao: str, filtros: str, inicio: float, status: int, data):
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    linhas = len(data) if isinstance(data, list) else (0 if data is None else 1)
+    try:
+        tamanho = len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        tamanho = 0
+    registrar_consulta(tabela, operacao, filtros, duracao_ms, status=status,
+                       linhas=linhas, bytes_recebidos=tamanho)
+
+
+def _simular_rede():
+    if SUPABASE_LOCAL_LATENCIA_MS > 0:
+        time.sleep(SUPABASE_LOCAL_LATENCIA_MS / 1000)
+
+
+class ConsultaLocal:
+    """Equivalente ao query builder do postgrest-py"""
+
+    def __init__(self, cliente: 'ClienteLocal', tabela: str):
+        self._cliente = cliente
+        self._tabela = tabela
+        self._operacao = 'select'
+        self._colunas = '*'
+        self._contar = None
+        self._so_cabecalho = False
+        self._dados = None
+        self._on_conflict = None
+        self._ignorar_duplicados = False
+        self._retorno = 'representation'
+        self._condicoes = []
+        self._ordem = []
+        self._limite = None
+        self._deslocamento = 0
+        self._unico = None
+        self._negar = False
+
+    # ---------- operação ----------
+
+    def select(self, *colunas, count: str | None = None, head: bool = False):
+        self._colunas = ','.join(colunas) if colunas else '*'
+        self._contar = count
+        self._so_cabecalho = head
+        return self
+
+    def _preparar_dados(self, dados) -> list:
+        registros = dados if isinstance(dados, list) else [dados]
+        # mesma serialização do client HTTP (erra com date/datetime/Decimal)
+        return json.loads(json.dumps(registros))
+
+    def insert(self, dados, count: str | None = None, returning: str = 'representation',
+               upsert: bool = False, default_to_null: bool = True):
+        self._operacao = 'upsert' if upsert else 'insert'
+        self._dados = self._preparar_dados(dados)
+        self._contar = count
+        self._retorno = returning
+        return self
+
+    def upsert(self, dados, count: str | None = None, returning: str = 'representation',
+               ignore_duplicates: bool = False, on_conflict: str = '', default_to_null: bool = True):
+        self._operacao = 'upsert'
+        self._dados = self._preparar_dados(dados)
+        self._contar = count
+        self._retorno = returning
+        self._ignorar_duplicados = ignore_duplicates
+        self._on_conflict = tuple(c.strip() for c in on_conflict.split(',') if c.strip()) or None
+        return self
+
+    def update(self, dados: dict, count: str | None = None, returning: str = 'representation'):
+        self._operacao = 'update'
+        self._dados = self._preparar_dados(dados)[0]
+        self._contar = count
+        self._retorno = returning
+        return self
+
+    def delete(self, count: str | None = None, returning: str = 'representation'):
+        self._operacao = 'delete'
+        self._contar = count
+        self._retorno = returning
+        return self
+
+    # ---------- filtros ----------
+
+    @property
+    def not_(self):
+        self._negar = True
+        return self
+
+    def _adicionar(self, coluna: str, operador: str, criterio):
+        self._condicoes.append(('filtro', coluna, operador, criterio, self._negar))
+        self._negar = False
+        return self
+
+    def eq(self, coluna: str, valor):
+        return self._adicionar(coluna, 'eq', _texto_filtro(valor))
+
+    def neq(self, coluna: str, valor):
+        return self._adicionar(coluna, 'neq', _texto_filtro(valor))
+
+    def gt(self, coluna: str, valor):
+        return self._adicionar(coluna, 'gt', _texto_filtro(valor))
+
+    def gte(self, coluna: str, valor):
+        return self._adicionar(coluna, 'gte', _texto_filtro(valor))
+
+    def lt(self, coluna: str, valor):
+        return self._adicionar(coluna, 'lt', _texto_filtro(valor))
+
+    def lte(self, coluna: str, valor):
+        return self._adicionar(coluna, 'lte', _texto_filtro(valor))
+
+    def like(self, coluna: str, padrao: str):
+        return self._adicionar(coluna, 'like', padrao)
+
+    def ilike(self, coluna: str, padrao: str):
+        return self._adicionar(coluna, 'ilike', padrao)
+
+    def is_(self, coluna: str, valor):
+        return self._adicionar(coluna, 'is', 'null' if valor is None else _texto_filtro(valor))
+
+    def in_(self, coluna: str, valores):
+        return self._adicionar(coluna, 'in', [_texto_filtro(v) for v in valores])
+
+    def match(self, consulta: dict):
+        for coluna, valor in consulta.items():
+            self.eq(coluna, valor)
+        return self
+
+    def filter(self, coluna: str, operador: str, criterio):
+        condicao = _filtro(coluna, f'{operador}.{criterio}')
+        self._condicoes.append(condicao[:4] + (condicao[4] != self._negar,))
+        self._negar = False
+        return self
+
+    def or_(self, filtros: str, reference_table: str | None = None):
+        if reference_table:
+            raise ErroLocal('or_ em tabela embutida não é suportado no backend local', 'PGRST100')
+        grupo = _grupo_logico(f'or({filtros})')
+        self._condicoes.append(grupo[:3] + (self._negar,))
+        self._negar = False
+        return self
+
+    # ---------- modificadores ----------
+
+    def order(self, coluna: str, desc: bool = False, nullsfirst: bool | None = None,
+              foreign_table: str | None = None):
+        if foreign_table:
+            raise ErroLocal('order em tabela embutida não é suportado no backend local', 'PGRST100')
+        self._ordem.append((coluna, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, tamanho: int, foreign_table: str | None = None):
+        if foreign_table:
+            raise ErroLocal('limit em tabela embutida não é suportado no backend local', 'PGRST100')
+        self._limite = int(tamanho)
+        return self
+
+    def offset(self, deslocamento: int):
+        self._deslocamento = int(deslocamento)
+        return self
+
+    def range(self, inicio: int, fim: int, foreign_table: str | None = None):
+        self._deslocamento = int(inicio)
+        self._limite = int(fim) - int(inicio) + 1
+        return self
+
+    def single(self):
+        self._unico = 'single'
+        return self
+
+    def maybe_single(self):
+        self._unico = 'maybe'
+        return self
+
+    # ---------- execução ----------
+
+    def _filtros_metrica(self) -> str:
+        nomes = []
+        for c in self._condicoes:
+            nomes.append(f'{c[1]}={c[2]}' if c[0] == 'filtro' else f'{c[1]}=grupo')
+        return ','.join(sorted(nomes))
+
+    def _separar_condicoes(self) -> tuple[list, dict]:
+        """Condições da tabela principal x das embutidas ('obras.status')"""
+        proprias, embutidas = [], {}
+        for c in self._condicoes:
+            if c[0] == 'filtro' and '.' in c[1]:
+                caminho, _, coluna = c[1].rpartition('.')
+                embutidas.setdefault(caminho, []).append((c[0], coluna) + c[2:])
+            else:
+                proprias.append(c)
+        return proprias, embutidas
+
+    def _selecionar_linhas(self, banco: BancoLocal, condicoes: list) -> list:
+        linhas = banco.tabela(self._tabela).values()
+        ids = [c[3] for c in condicoes if c[0] == 'filtro' and c[1] == banco._pk(self._tabela)
+               and c[2] == 'eq' and not c[4]]
+        if ids:  # atalho: filtro por chave primária
+            tabela = banco.tabela(self._tabela)
+            try:
+                chave = int(ids[0]) if banco._pk(self._tabela) == 'id' else ids[0]
+            except ValueError:
+                raise ErroLocal(f'invalid input syntax for type bigint: "{ids[0]}"', '22P02')
+            linhas = [tabela[chave]] if chave in tabela else []
+        return [l for l in linhas if all(_avaliar(l, c) is True for c in condicoes)]
+
+    def _ordenar(self, linhas: list) -> list:
+        for coluna, desc, nulos_primeiro in reversed(self._ordem):
+            com_valor = [l for l in linhas if l.get(coluna) is not None]
+            nulos = [l for l in linhas if l.get(coluna) is None]
+            com_valor.sort(key=lambda l: _valor_linha(coluna, l[coluna]), reverse=desc)
+            linhas = nulos + com_valor if nulos_primeiro else com_valor + nulos
+        return linhas
+
+    def _projetar(self, banco: BancoLocal, tabela: str, linha: dict, itens: list,
+                  embutidas: dict, prefixo: str = '') -> dict | None:
+        """Aplica o select; None quando um embed !inner não casou"""
+        resultado = {}
+        for item in itens:
+            if item[0] == '*':
+                resultado.update(_copiar(linha))
+            elif item[0] == 'coluna':
+                _, nome, apelido = item
+                if nome not in _COLUNAS[tabela]:
+                    raise ErroLocal(f'column {tabela}.{nome} does not exist', '42703')
+                valor = linha.get(nome)
+                resultado[apelido] = copy.deepcopy(valor) if isinstance(valor, (dict, list)) else valor
+            else:
+                _, apelido, destino, inner, subitens = item
+                banco.tabela(destino)
+                caminho = f'{prefixo}{apelido}'
+                condicoes = embutidas.get(caminho, [])
+                tipo, coluna = _relacao(tabela, destino)
+                if tipo == 'um':
+                    alvo = banco.linha(destino, linha.get(coluna))
+                    valor = None
+                    if alvo is not None and all(_avaliar(alvo, c) is True for c in condicoes):
+                        valor = self._projetar(banco, destino, alvo, subitens, embutidas, f'{caminho}.')
+                    if valor is None and inner:
+                        return None
+                else:
+                    valor = []
+                    for filha in banco.tabela(destino).values():
+                        if filha.get(coluna) == linha.get('id') and all(_avaliar(filha, c) is True for c in condicoes):
+                            projetada = self._projetar(banco, destino, filha, subitens, embutidas, f'{caminho}.')
+                            if projetada is not None:
+                                valor.append(projetada)
+                    if not valor and inner:
+                        return None
+                resultado[apelido] = valor
+        return resultado
+
+    def _executar_select(self, banco: BancoLocal):
+        itens = _parse_select(self._colunas)
+        proprias, embutidas = self._separar_condicoes()
+        linhas = self._ordenar(self._selecionar_linhas(banco, proprias))
+
+        projetadas = []
+        for linha in linhas:
+            projetada = self._projetar(banco, self._tabela, linha, itens, embutidas)
+            if projetada is not None:
+                projetadas.append(projetada)
+
+        total = len(projetadas)
+        fim = None if self._limite is None else self._deslocamento + self._limite
+        dados = projetadas[self._deslocamento:fim]
+        if self._so_cabecalho:
+            dados = []
+        return dados, (total if self._contar else None)
+
+    def _executar_escrita(self, banco: BancoLocal):
+        if self._operacao in ('insert', 'upsert'):
+            dados = banco.inserir(
+                self._tabela, self._dados,
+                on_conflict=self._on_conflict,
+                ignorar_duplicados=self._ignorar_duplicados,
+                upsert=self._operacao == 'upsert',
+            )
+        else:
+            proprias, embutidas = self._separar_condicoes()
+            if embutidas:
+                raise ErroLocal('filtro em tabela embutida não é permitido em escrita', 'PGRST100')
+            pk = banco._pk(self._tabela)
+            pks = [l[pk] for l in self._selecionar_linhas(banco, proprias)]
+            if self._operacao == 'update':
+                dados = banco.atualizar(self._tabela, pks, self._dados)
+            else:
+                dados = banco.remover(self._tabela, pks)
+
+        total = len(dados) if self._contar else None
+        if self._colunas != '*' and dados:
+            itens = _parse_select(self._colunas)
+            dados = [self._projetar(banco, self._tabela, l, itens, {}) for l in dados]
+        if self._retorno == 'minimal':
+            dados = []
+        return dados, total
+
+    def execute(self) -> RespostaLocal:
+        _simular_rede()
+        inicio = time.perf_counter()
+        banco = self._cliente.banco
+        status = 200
+        dados = None
+        try:
+            with banco.transacao(self._cliente.auth.uid):
+                if self._operacao == 'select':
+                    dados, total = self._executar_select(banco)
+                else:
+                    dados, total = self._executar_escrita(banco)
+
+            if self._unico:
+                if len(dados) == 1:
+                    dados = dados[0]
+                elif not dados and self._unico == 'maybe':
+                    dados = None
+                else:
+                    raise ErroLocal(
+                        'JSON object requested, multiple (or no) rows returned', 'PGRST116',
+                        f'The result contains {len(dados)} rows'
+                    )
+            return RespostaLocal(dados, total)
+        except Exception as e:
+            status = 400 if isinstance(e, ErroLocal) else 500
+            raise
+        finally:
+            _registrar(self._tabela, self._operacao, self._filtros_metrica(), inicio, status, dados)
+
+
+class RpcLocal:
+    def __init__(self, cliente: 'ClienteLocal', funcao: str, parametros: dict | None):
+        self._cliente = cliente
+        self._funcao = funcao
+        self._parametros = json.loads(json.dumps(parametros or {}))
+
+    def execute(self) -> RespostaLocal:
+        _simular_rede()
+        inicio = time.perf_counter()
+        status = 200
+        dados = None
+        try:
+            implementacao = _RPCS.get(self._funcao)
+            if implementacao is None:
+                raise ErroLocal(
+                    f'Could not find the function public.{self._funcao} in the schema cache', 'PGRST202'
+                )
+            banco = self._cliente.banco
+            with banco.transacao(self._cliente.auth.uid):
+                dados = implementacao(banco, self._parametros)
+            return RespostaLocal(dados)
+        except Exception as e:
+            status = 400 if isinstance(e, ErroLocal) else 500
+            raise
+        finally:
+            _registrar(self._funcao, 'rpc', '', inicio, status, dados)
+
+
+class AuthLocal:
+    """Subconjunto do supabase.auth: login por e-mail/senha e logout"""
+
+    def __init__(self, banco: BancoLocal):
+        self._banco = banco
+        self.uid = None
+        self._email = None
+
+    def sign_in_with_password(self, credenciais: dict):
+        uid = self._banco.autenticar(credenciais.get('email'), credenciais.get('password'))
+        if uid is None:
+            raise ErroAuthLocal('Invalid login credentials')
+        self.uid = uid
+        self._email = credenciais.get('email')
+        user = SimpleNamespace(id=uid, email=self._email)
+        session = SimpleNamespace(access_token=f'local-{uuid.uuid4().hex}', user=user)
+        return SimpleNamespace(user=user, session=session)
+
+    def get_user(self):
+        if self.uid is None:
+            return None
+        return SimpleNamespace(user=SimpleNamespace(id=self.uid, email=self._email))
+
+    def sign_out(self):
+        self.uid = None
+        self._email = None
+
+
+class BucketLocal:
+    """Subconjunto do storage.from_(bucket) do supabase-py"""
+
+    def __init__(self, storage: 'StorageLocal', nome: str):
+        self._storage = storage
+        self._nome = nome
+
+    def _medir(self, operacao: str, inicio: float, status: int, enviados: int = 0, recebidos: int = 0):
+        registrar_consulta(f'storage:{self._nome}', operacao, '', (time.perf_counter() - inicio) * 1000,
+                           status=status, linhas=1 if status < 400 else 0,
+                           bytes_enviados=enviados, bytes_recebidos=recebidos)
+
+    def upload(self, path: str, file, file_options: dict | None = None):
+        _simular_rede()
+        inicio = time.perf_counter()
+        if isinstance(file, (bytes, bytearray)):
+            conteudo = file
+        else:
+            with open(file, 'rb') as f:
+                conteudo = f.read()
+        opcoes = {k.lower(): str(v).lower() for k, v in (file_options or {}).items()}
+        sobrescrever = 'true' in (opcoes.get('x-upsert'), opcoes.get('upsert'))
+        if not sobrescrever and self._storage.existe(self._nome, path):
+            self._medir('insert', inicio, 409)
+            raise ErroLocal('The resource already exists', '409')
+        self._storage.gravar(self._nome, path, bytes(conteudo))
+        self._medir('insert', inicio, 200, enviados=len(conteudo))
+        return SimpleNamespace(path=path, full_path=f'{self._nome}/{path}')
+
+    def download(self, path: str) -> bytes:
+        _simular_rede()
+        inicio = time.perf_counter()
+        conteudo = self._storage.ler(self._nome, path)
+        if conteudo is None:
+            self._medir('select', inicio, 404)
+            raise ErroLocal('Object not found', '404')
+        self._medir('select', inicio, 200, recebidos=len(conteudo))
+        return conteudo
+
+    def remove(self, paths: list) -> list:
+        _simular_rede()
+        inicio = time.perf_counter()
+        removidos = [{'name': p} for p in paths if self._storage.apagar(self._nome, p)]
+        self._medir('delete', inicio, 200)
+        return removidos
+
+    def get_public_url(self, path: str) -> str:
+        return f'local://{self._nome}/{path}'
+
+
+class StorageLocal:
+    """
+    Objetos do Storage do processo: em memória ou em SUPABASE_LOCAL_STORAGE
+    (<pasta>/<bucket>/<caminho>)
+    """
+
+    def __init__(self, pasta: str = ''):
+        self._pasta = pasta
+        self._objetos: dict[tuple[str, str], bytes] = {}
+        self._lock = threading.Lock()
+
+    def from_(self, bucket: str) -> BucketLocal:
+        return BucketLocal(self, bucket)
+
+    def _arquivo(self, bucket: str, path: str) -> str:
+        partes = [p for p in f'{bucket}/{path}'.split('/') if p not in ('', '.', '..')]
+        return os.path.join(self._pasta, *partes)
+
+    def existe(self, bucket: str, path: str) -> bool:
+        if self._pasta:
+            return os.path.exists(self._arquivo(bucket, path))
+        return (bucket, path) in self._objetos
+
+    def gravar(self, bucket: str, path: str, conteudo: bytes):
+        if self._pasta:
+            arquivo = self._arquivo(bucket, path)
+            os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+            with open(arquivo, 'wb') as f:
+                f.write(conteudo)
+            return
+        with self._lock:
+            self._objetos[(bucket, path)] = conteudo
+
+    def ler(self, bucket: str, path: str) -> bytes | None:
+        if self._pasta:
+            try:
+                with open(self._arquivo(bucket, path), 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        return self._objetos.get((bucket, path))
+
+    def apagar(self, bucket: str, path: str) -> bool:
+        if self._pasta:
+            try:
+                os.remove(self._arquivo(bucket, path))
+                return True
+            except FileNotFoundError:
+                return False
+        with self._lock:
+            return self._objetos.pop((bucket, path), None) is not None
+
+
+class ClienteLocal:
+    """Client de uma sessão: auth próprio, banco e Storage compartilhados"""
+
+    def __init__(self, banco: BancoLocal):
+        self.banco = banco
+        self.auth = AuthLocal(banco)
+        self.storage = get_storage_local()
+
+    def table(self, nome: str) -> ConsultaLocal:
+        return ConsultaLocal(self, nome)
+
+    from_ = table
+
+    def rpc(self, funcao: str, parametros: dict | None = None) -> RpcLocal:
+        return RpcLocal(self, funcao, parametros)
+
+
+# =========================================================
+# BANCO DO PROCESSO
+# =========================================================
+
+_banco_lock = threading.Lock()
+_banco: BancoLocal | None = None
+_storage: StorageLocal | None = None
+
+
+def get_banco_local() -> BancoLocal:
+    """Banco único do processo (carrega SUPABASE_LOCAL_DADOS na criação)"""
+    global _banco
+    with _banco_lock:
+        if _banco is None:
+            _banco = _novo_banco()
+        return _banco
+
+
+def _novo_banco(caminho: str | None = None, dados: dict | None = None) -> BancoLocal:
+    banco = BancoLocal()
+    caminho = SUPABASE_LOCAL_DADOS if caminho is None and dados is None else caminho
+    if dados is not None:
+        banco.carregar(dados)
+    elif caminho:
+        banco.abrir(caminho)
+    if not banco._usuarios_auth:
+        banco.criar_usuario(SUPABASE_LOCAL_EMAIL, SUPABASE_LOCAL_SENHA, 'admin', 'ADMIN')
+    return banco
+
+
+def reiniciar_banco_local(caminho: str | None = None, dados: dict | None = None) -> BancoLocal:
+    """
+    Descarta o banco do processo e cria outro (vazio, do arquivo ou de um
+    dict no formato de exportar(), sem reler o JSON a cada reinício)
+    """
+    global _banco
+    with _banco_lock:
+        _banco = _novo_banco(caminho, dados)
+        return _banco
+
+
+def get_storage_local() -> StorageLocal:
+    """Storage único do processo (não é apagado por reiniciar_banco_local)"""
+    global _storage
+    with _banco_lock:
+        if _storage is None:
+            _storage = StorageLocal(SUPABASE_LOCAL_STORAGE)
+        return _storage
+
+
+def criar_cliente_local() -> ClienteLocal:
+    return ClienteLocal(get_banco_local())